@@ -4,11 +4,11 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import os
+import queue
+import threading
 import time
 from datetime import date, timedelta
-from typing import Any, Dict, Optional
-
-import requests
+from typing import Any, Dict, Iterator, Optional
 
 
 def getenv(name: str, default: Optional[str] = None) -> str:
@@ -18,38 +18,157 @@ def getenv(name: str, default: Optional[str] = None) -> str:
     return v
 
 
+_api_calls = 0
+_api_calls_lock = threading.Lock()
+
+
+def api_call_count() -> int:
+    """Successful provider GETs made by this process (jobs diff it before/after)."""
+    return _api_calls
+
+
+def _count_api_call():
+    global _api_calls
+    with _api_calls_lock:
+        _api_calls += 1
+
+
+class RateLimiter:
+    """
+    Spaces calls at least 60/per_minute seconds apart across threads.
+    per_minute <= 0 disables limiting.
+    """
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    @classmethod
+    def from_env(cls, name: str, default: str = "0") -> "RateLimiter":
+        return cls(float(os.getenv(name) or default))
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
 def requests_get_json(url: str, params: Dict[str, Any], api_key: str, max_retries: int = 6) -> Dict[str, Any]:
-    """GET JSON with basic retry/backoff for rate limits and transient errors."""
+    """
+    GET JSON with basic retry/backoff for rate limits and transient errors.
+    Served from the local response cache when it has a fresh copy
+    (src/providers/response_cache.py); cache hits are not API calls.
+    Requests are paced by the shared rate governor
+    (src/providers/rate_governor.py). Error classification, deadlines,
+    circuit breaking and hedging live in src/providers/resilience.py;
+    permanent 4xx errors raise PermanentProviderError without retrying.
+    Within a run scope each request is fetched once and shared by every
+    job and thread asking for it (src/providers/broker.py).
+    """
+    from src.providers.broker import fetch_shared
+
+    return fetch_shared(url, params, lambda: _get_json_cached(url, params, api_key, max_retries))
+
+
+def _get_json_cached(url: str, params: Dict[str, Any], api_key: str, max_retries: int) -> Dict[str, Any]:
+    from src.providers.response_cache import read_through
+
+    return read_through(url, params, lambda: _get_json(url, params, api_key, max_retries))
+
+
+def _get_json(url: str, params: Dict[str, Any], api_key: str, max_retries: int) -> Dict[str, Any]:
+    from src.providers import resilience
+
     headers = {"Authorization": f"Bearer {api_key}"}
-    backoff = 1.0
-    last_err = None
+    body = resilience.get_json(url, params, headers, max_retries=max_retries)
+    _count_api_call()
+    return body
 
-    for _ in range(max_retries):
-        try:
-            r = requests.get(url, params=params, headers=headers, timeout=30)
-            if r.status_code == 429:
-                ra = r.headers.get("Retry-After")
-                sleep_s = float(ra) if ra else backoff
-                time.sleep(sleep_s)
-                backoff = min(backoff * 2, 30.0)
-                continue
-            if 500 <= r.status_code < 600:
-                time.sleep(backoff)
-                backoff = min(backoff * 2, 30.0)
+
+def page_prefetch_depth() -> int:
+    return int(os.getenv("PAGE_PREFETCH", "2"))
+
+
+def iter_pages(
+    url: str,
+    params: Dict[str, Any],
+    api_key: str,
+    prefetch: Optional[int] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield each page of a next_url chain via requests_get_json.
+
+    A background thread follows the chain up to `prefetch` pages ahead
+    (PAGE_PREFETCH, default 2), so page k+1 is in flight and decoded while
+    the caller handles page k. Every request still goes through the rate
+    governor. A cursor is only known from the previous page, so a chain
+    is never fetched concurrently with itself. prefetch=0 fetches inline.
+    """
+    depth = page_prefetch_depth() if prefetch is None else prefetch
+
+    if depth <= 0:
+        while url:
+            j = requests_get_json(url, params=params, api_key=api_key)
+            yield j
+            url, params = j.get("next_url"), {}
+        return
+
+    pages: "queue.Queue" = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
                 continue
-            r.raise_for_status()
-            return r.json()
-        except Exception as e:
-            last_err = e
-            time.sleep(backoff)
-            backoff = min(backoff * 2, 30.0)
+        return False
+
+    def produce(url, params):
+        try:
+            while url and not stop.is_set():
+                j = requests_get_json(url, params=params, api_key=api_key)
+                if not put(j):
+                    return
+                url, params = j.get("next_url"), {}
+            put(done)
+        except BaseException as e:
+            put(e)
+
+    threading.Thread(target=produce, args=(url, params), name="page-prefetch", daemon=True).start()
+    try:
+        while True:
+            item = pages.get()
+            if item is done:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        # caller finished or stopped early: let the producer exit
+        stop.set()
+
 
-    raise RuntimeError(f"Failed after retries. url={url} params={params} last_err={last_err}")
+def as_of_date() -> date:
+    """
+    Today, or INGEST_AS_OF when set (replaying a recorded run needs the
+    recording's date windows to hit the response cache).
+    """
+    v = os.getenv("INGEST_AS_OF")
+    return date.fromisoformat(v) if v else date.today()
 
 
 def iso_today() -> str:
-    return date.today().isoformat()
+    return as_of_date().isoformat()
 
 
 def iso_years_ago(years: int) -> str:
-    return (date.today() - timedelta(days=365 * years)).isoformat()
+    return (as_of_date() - timedelta(days=365 * years)).isoformat()
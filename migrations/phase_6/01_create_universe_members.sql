@@ -0,0 +1,26 @@
+-- Phase 6: versioned universe snapshots
+-- A snapshot is one stocks_research.universes row (name = '<family>@<built_at>',
+-- rules + build stats in rules_json) plus its members below.
+-- Built by src/ingest/universe_builder.py; read by load_tickers() for UNIVERSE_MODE=all.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS stocks_research.universe_members (
+    universe_id      BIGINT NOT NULL
+        REFERENCES stocks_research.universes(universe_id)
+        ON UPDATE CASCADE ON DELETE CASCADE,
+    ticker           TEXT   NOT NULL,
+    composite_figi   TEXT,
+    ticker_type      TEXT,
+    primary_exchange TEXT,
+    name             TEXT,
+    PRIMARY KEY (universe_id, ticker)
+);
+
+CREATE INDEX IF NOT EXISTS universes_created_at_idx
+    ON stocks_research.universes (created_at DESC);
+
+COMMENT ON TABLE stocks_research.universe_members IS
+'Tickers of a versioned universe snapshot (Phase 6 inclusion/exclusion rules applied).';
+
+COMMIT;
@@ -0,0 +1,26 @@
+-- Phase 6: trading calendar
+-- One row per calendar day and exchange, generated locally from the
+-- exchange holiday rules by src/ingest/trading_calendar.py:
+--   python -m src.ingest.trading_calendar
+-- Lets gap planning and coverage checks tell a missing bar from a
+-- market holiday (src/ingest/gap_planner.py).
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS stocks_research.trading_calendar (
+    exchange     TEXT    NOT NULL,          -- MIC, e.g. XNYS
+    cal_date     DATE    NOT NULL,
+    is_open      BOOLEAN NOT NULL,
+    early_close  BOOLEAN NOT NULL DEFAULT FALSE,
+    holiday      TEXT,                      -- set on weekday closures
+    PRIMARY KEY (exchange, cal_date)
+);
+
+CREATE INDEX IF NOT EXISTS trading_calendar_sessions_idx
+    ON stocks_research.trading_calendar (exchange, cal_date)
+    WHERE is_open;
+
+COMMENT ON TABLE stocks_research.trading_calendar IS
+'Exchange sessions and holidays, generated from holiday rules (src/ingest/trading_calendar.py).';
+
+COMMIT;
@@ -0,0 +1,145 @@
+"""
+Validation timing benchmark for adjustment_factors_daily.
+
+Times the per-check query layout the AFD validator used before the
+single-pass rewrite (one COUNT per invariant, plus a sample query per
+failing invariant) against the current single-pass scan, and checks that
+both report the same violation counts.
+
+Usage (after run_bench.py has populated the bench database):
+  BENCH_PG_DSN=postgresql://postgres@localhost:5433/stocks_bench \\
+    python scripts/bench/bench_validation.py --repeat 3
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+repo_root = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(repo_root))
+
+import argparse
+import os
+import statistics
+import time
+from typing import Dict, List, Tuple
+
+import psycopg2
+
+from src.ingest.validate.adjustment_factors_daily import validate_adjustment_factors_daily
+
+T = "stocks_research.adjustment_factors_daily"
+P = "stocks_research.prices_daily"
+S = "stocks_research.securities"
+
+# check_id -> (count_sql, sample_sql): the pre-rewrite layout, one scan each
+PER_CHECK_QUERIES: Dict[str, Tuple[str, str]] = {
+    "AFD_02_NO_DUPLICATES": (
+        f"SELECT COUNT(*) FROM (SELECT security_id, trade_date FROM {T} GROUP BY 1, 2 HAVING COUNT(*) > 1) t",
+        f"SELECT security_id, trade_date, COUNT(*) FROM {T} GROUP BY 1, 2 HAVING COUNT(*) > 1 ORDER BY 3 DESC, 1, 2",
+    ),
+    "AFD_03_FK_SECURITIES": (
+        f"SELECT COUNT(*) FROM {T} f LEFT JOIN {S} s ON s.security_id = f.security_id WHERE s.security_id IS NULL",
+        f"SELECT f.security_id, COUNT(*) FROM {T} f LEFT JOIN {S} s ON s.security_id = f.security_id "
+        f"WHERE s.security_id IS NULL GROUP BY 1 ORDER BY 2 DESC, 1",
+    ),
+    "AFD_04_SUBSET_OF_PRICES": (
+        f"SELECT COUNT(*) FROM {T} f LEFT JOIN {P} p ON p.security_id = f.security_id "
+        f"AND p.trade_date = f.trade_date WHERE p.security_id IS NULL",
+        f"SELECT f.security_id, f.trade_date FROM {T} f LEFT JOIN {P} p ON p.security_id = f.security_id "
+        f"AND p.trade_date = f.trade_date WHERE p.security_id IS NULL ORDER BY 1, 2",
+    ),
+    "AFD_05_COVERAGE_PARITY": (
+        f"SELECT COUNT(*) FROM (SELECT security_id, COUNT(*) n FROM {P} GROUP BY 1) p "
+        f"LEFT JOIN (SELECT security_id, COUNT(*) n FROM {T} GROUP BY 1) f USING (security_id) "
+        f"WHERE COALESCE(f.n, 0) <> p.n",
+        f"SELECT p.security_id, p.n, COALESCE(f.n, 0) FROM (SELECT security_id, COUNT(*) n FROM {P} GROUP BY 1) p "
+        f"LEFT JOIN (SELECT security_id, COUNT(*) n FROM {T} GROUP BY 1) f USING (security_id) "
+        f"WHERE COALESCE(f.n, 0) <> p.n ORDER BY 1",
+    ),
+    "AFD_06_FACTOR_POSITIVE": (
+        f"SELECT COUNT(*) FROM {T} WHERE price_factor IS NULL OR price_factor <= 0",
+        f"SELECT security_id, trade_date, price_factor FROM {T} WHERE price_factor IS NULL OR price_factor <= 0 ORDER BY 1, 2",
+    ),
+    "AFD_07_ANCHOR_NORMALIZED": (
+        f"WITH l AS (SELECT security_id, MAX(trade_date) d FROM {T} GROUP BY 1) "
+        f"SELECT COUNT(*) FROM l JOIN {T} f ON f.security_id = l.security_id AND f.trade_date = l.d "
+        f"WHERE ABS(f.price_factor - 1.0) > 1e-12",
+        f"WITH l AS (SELECT security_id, MAX(trade_date) d FROM {T} GROUP BY 1) "
+        f"SELECT f.security_id, f.trade_date, f.price_factor FROM l JOIN {T} f "
+        f"ON f.security_id = l.security_id AND f.trade_date = l.d WHERE ABS(f.price_factor - 1.0) > 1e-12 ORDER BY 1",
+    ),
+    "AFD_08_PIECEWISE_CONSTANT_HEURISTIC": (
+        f"WITH d AS (SELECT price_factor, LAG(price_factor) OVER (PARTITION BY security_id ORDER BY trade_date) prev "
+        f"FROM {T}) SELECT CASE WHEN (SELECT COUNT(*) FROM {T}) = 0 THEN 0 "
+        f"WHEN (SELECT COUNT(*) FROM d WHERE prev IS NOT NULL AND ABS(price_factor - prev) > 1e-12)::float "
+        f"/ (SELECT COUNT(*) FROM {T}) > 0.05 THEN 1 ELSE 0 END",
+        f"WITH d AS (SELECT security_id, trade_date, price_factor, "
+        f"LAG(price_factor) OVER (PARTITION BY security_id ORDER BY trade_date) prev FROM {T}) "
+        f"SELECT * FROM d WHERE prev IS NOT NULL AND ABS(price_factor - prev) > 1e-12 ORDER BY 1, 2",
+    ),
+}
+
+
+def run_per_check(conn, max_samples: int) -> Dict[str, int]:
+    counts = {}
+    with conn.cursor() as cur:
+        for check_id, (count_sql, sample_sql) in PER_CHECK_QUERIES.items():
+            cur.execute(count_sql)
+            counts[check_id] = int(cur.fetchone()[0] or 0)
+            if counts[check_id]:
+                cur.execute(sample_sql + f" LIMIT {max_samples}")
+                cur.fetchall()
+    return counts
+
+
+def run_single_pass(conn, max_samples: int) -> Dict[str, int]:
+    results = validate_adjustment_factors_daily(conn, max_samples=max_samples)
+    return {r.check_id: r.violations for r in results if r.check_id in PER_CHECK_QUERIES}
+
+
+def timed(fn, conn, repeat: int, max_samples: int) -> Tuple[List[float], Dict[str, int]]:
+    times, counts = [], {}
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        counts = fn(conn, max_samples)
+        times.append(time.perf_counter() - t0)
+    return times, counts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dsn", default=os.getenv("BENCH_PG_DSN"))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-samples", type=int, default=20)
+    args = parser.parse_args()
+
+    if not args.dsn:
+        raise RuntimeError("Set BENCH_PG_DSN (or --dsn) to a throwaway local database")
+
+    conn = psycopg2.connect(args.dsn)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT COUNT(*) FROM {T}")
+            n_rows = cur.fetchone()[0]
+
+        before, before_counts = timed(run_per_check, conn, args.repeat, args.max_samples)
+        after, after_counts = timed(run_single_pass, conn, args.repeat, args.max_samples)
+    finally:
+        conn.close()
+
+    print(f"adjustment_factors_daily rows: {n_rows}")
+    print(f"per-check (before): median {statistics.median(before):.3f}s  runs={[round(t, 3) for t in before]}")
+    print(f"single pass (after): median {statistics.median(after):.3f}s  runs={[round(t, 3) for t in after]}")
+
+    mismatched = {k: (before_counts[k], after_counts.get(k)) for k in before_counts if before_counts[k] != after_counts.get(k)}
+    if mismatched:
+        print(f"❌ violation counts differ (before, after): {mismatched}")
+        sys.exit(2)
+    print(f"✔ violation counts match: {after_counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+In-process fake Massive HTTP server for offline benchmarks.
+
+Serves the endpoints the jobs and bootstrap call, backed by a
+SyntheticUniverse:
+
+  /v2/aggs/ticker/{ticker}/range/1/day/{from}/{to}
+  /v2/aggs/grouped/locale/us/market/stocks/{date}
+  /v3/reference/tickers               (paginated, filterable)
+  /v3/reference/tickers/{ticker}
+  /stocks/v1/splits
+  /stocks/v1/dividends
+  /stocks/financials/v1/{income-statements|balance-sheets|cash-flow-statements}
+
+List endpoints honour `limit`, `sort`, equality filters and
+`<field>.gte|gt|lte|lt` range filters, and paginate with an opaque `cursor`
+embedded in `next_url`, like the real API.
+
+Injection knobs:
+  latency_ms / latency_jitter : per-request sleep (mean, +/- fraction)
+  p429 / retry_after          : probability of a 429 and its Retry-After value
+  page_size                   : caps `limit` to force multi-page responses
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from synthetic_universe import SyntheticUniverse
+
+FINANCIALS_PREFIX = "/stocks/financials/v1/"
+FINANCIALS_STATEMENTS = {
+    "income-statements": "income",
+    "balance-sheets": "balance",
+    "cash-flow-statements": "cashflow",
+}
+
+AGGS_RE = re.compile(r"^/v2/aggs/ticker/([^/]+)/range/1/day/([^/]+)/([^/]+)$")
+GROUPED_RE = re.compile(r"^/v2/aggs/grouped/locale/us/market/stocks/([^/]+)$")
+OVERVIEW_RE = re.compile(r"^/v3/reference/tickers/([^/]+)$")
+
+
+def _encode_cursor(offset: int, params: Dict[str, str]) -> str:
+    raw = json.dumps({"offset": offset, "params": params}).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[int, Dict[str, str]]:
+    state = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return int(state["offset"]), state["params"]
+
+
+def _apply_filters(rows: List[Dict[str, Any]], params: Dict[str, str], fields: List[str]) -> List[Dict[str, Any]]:
+    for f in fields:
+        if f in params:
+            want = params[f]
+            rows = [r for r in rows if str(r.get(f)).lower() == want.lower()]
+        for op in ("gte", "gt", "lte", "lt"):
+            key = f"{f}.{op}"
+            if key not in params:
+                continue
+            v = params[key]
+            if op == "gte":
+                rows = [r for r in rows if str(r.get(f)) >= v]
+            elif op == "gt":
+                rows = [r for r in rows if str(r.get(f)) > v]
+            elif op == "lte":
+                rows = [r for r in rows if str(r.get(f)) <= v]
+            else:
+                rows = [r for r in rows if str(r.get(f)) < v]
+    return rows
+
+
+def _apply_sort(rows: List[Dict[str, Any]], sort: Optional[str]) -> List[Dict[str, Any]]:
+    if not sort:
+        return rows
+    key, _, direction = sort.partition(".")
+    return sorted(rows, key=lambda r: str(r.get(key, "")), reverse=(direction == "desc"))
+
+
+class FakeMassive:
+    def __init__(
+        self,
+        universe: SyntheticUniverse,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_ms: float = 0.0,
+        latency_jitter: float = 0.5,
+        p429: float = 0.0,
+        retry_after: str = "0.2",
+        page_size: Optional[int] = None,
+        seed: int = 0,
+    ):
+        self.universe = universe
+        self.latency_ms = latency_ms
+        self.latency_jitter = latency_jitter
+        self.p429 = p429
+        self.retry_after = retry_after
+        self.page_size = page_size
+
+        self.calls: Counter = Counter()
+        self.throttled = 0
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+
+        handler = type("FakeMassiveHandler", (_Handler,), {"fake": self})
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-massive", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def total_calls(self) -> int:
+        with self._lock:
+            return sum(self.calls.values())
+
+    def start(self) -> "FakeMassive":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    # -------------------------
+    # Request handling
+    # -------------------------
+
+    def _inject(self) -> bool:
+        """Sleep for the configured latency; return True if this call should 429."""
+        with self._lock:
+            jitter = self._rng.uniform(-self.latency_jitter, self.latency_jitter)
+            throttle = self._rng.random() < self.p429
+            if throttle:
+                self.throttled += 1
+        if self.latency_ms:
+            time.sleep(max(0.0, self.latency_ms * (1 + jitter)) / 1000)
+        return throttle
+
+    def handle(self, path: str, params: Dict[str, str]) -> Tuple[int, Dict[str, Any]]:
+        offset = 0
+        if "cursor" in params:
+            offset, params = _decode_cursor(params["cursor"])
+
+        m = AGGS_RE.match(path)
+        if m:
+            ticker, from_date, to_date = m.groups()
+            self._count("aggs")
+            rows = self.universe.bars(ticker) if self.universe.has_ticker(ticker) else []
+            lo = self._date_ms(from_date)
+            hi = self._date_ms(to_date) + 86_400_000 - 1
+            rows = [r for r in rows if lo <= r["t"] <= hi]
+            if params.get("sort") == "desc":
+                rows = list(reversed(rows))
+            return self._page(path, params, rows, offset, extra={"ticker": ticker, "adjusted": False})
+
+        m = GROUPED_RE.match(path)
+        if m:
+            self._count("grouped")
+            ts = self._date_ms(m.group(1))
+            rows = []
+            for t in self.universe.tickers:
+                for b in self.universe.bars(t):
+                    if ts <= b["t"] < ts + 86_400_000:
+                        rows.append({"T": t, **b})
+                        break
+            return 200, {"status": "OK", "adjusted": False, "results": rows, "resultsCount": len(rows)}
+
+        m = OVERVIEW_RE.match(path)
+        if m:
+            self._count("ticker_overview")
+            ticker = m.group(1)
+            if not self.universe.has_ticker(ticker):
+                return 404, {"status": "NOT_FOUND", "message": f"Ticker not found: {ticker}"}
+            return 200, {"status": "OK", "results": self.universe.ticker_overview(ticker)}
+
+        if path == "/v3/reference/tickers":
+            self._count("tickers")
+            rows = [self.universe.ticker_overview(t) for t in self.universe.tickers]
+            rows = _apply_filters(rows, params, ["ticker", "type", "market", "exchange", "active"])
+            return self._page(path, params, _apply_sort(rows, params.get("sort")), offset)
+
+        if path == "/stocks/v1/splits":
+            self._count("splits")
+            rows = self._per_ticker(params, self.universe.splits)
+            rows = _apply_filters(rows, params, ["execution_date"])
+            return self._page(path, params, _apply_sort(rows, params.get("sort")), offset)
+
+        if path == "/stocks/v1/dividends":
+            self._count("dividends")
+            rows = self._per_ticker(params, self.universe.dividends)
+            rows = _apply_filters(rows, params, ["ex_dividend_date"])
+            return self._page(path, params, _apply_sort(rows, params.get("sort")), offset)
+
+        if path.startswith(FINANCIALS_PREFIX):
+            statement = FINANCIALS_STATEMENTS.get(path[len(FINANCIALS_PREFIX):])
+            if statement is None:
+                return 404, {"status": "NOT_FOUND", "message": path}
+            self._count(f"financials_{statement}")
+            raw = params.get("tickers") or params.get("tickers.any_of") or ""
+            tickers = [t for t in raw.split(",") if self.universe.has_ticker(t)]
+            rows = [r for t in tickers for r in self.universe.financials(t, statement)]
+            rows = _apply_filters(rows, params, ["period_end", "fiscal_year"])
+            return self._page(path, params, _apply_sort(rows, params.get("sort")), offset)
+
+        return 404, {"status": "NOT_FOUND", "message": path}
+
+    def _count(self, endpoint: str):
+        with self._lock:
+            self.calls[endpoint] += 1
+
+    def _per_ticker(self, params: Dict[str, str], source) -> List[Dict[str, Any]]:
+        ticker = params.get("ticker")
+        if ticker:
+            return list(source(ticker)) if self.universe.has_ticker(ticker) else []
+        return [r for t in self.universe.tickers for r in source(t)]
+
+    @staticmethod
+    def _date_ms(s: str) -> int:
+        if s.isdigit():
+            return int(s)
+        d = date.fromisoformat(s)
+        return int(datetime(d.year, d.month, d.day, tzinfo=timezone.utc).timestamp() * 1000)
+
+    def _page(
+        self,
+        path: str,
+        params: Dict[str, str],
+        rows: List[Dict[str, Any]],
+        offset: int,
+        extra: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[int, Dict[str, Any]]:
+        limit = int(params.get("limit", 1000))
+        if self.page_size:
+            limit = min(limit, self.page_size)
+
+        page = rows[offset:offset + limit]
+        body: Dict[str, Any] = {
+            "status": "OK",
+            "request_id": f"fake-{offset}",
+            "results": page,
+            "resultsCount": len(page),
+            "count": len(page),
+        }
+        if extra:
+            body.update(extra)
+        if offset + limit < len(rows):
+            body["next_url"] = f"{self.base_url}{path}?" + urlencode(
+                {"cursor": _encode_cursor(offset + limit, params)}
+            )
+        return 200, body
+
+
+class _Handler(BaseHTTPRequestHandler):
+    fake: FakeMassive
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        params = {k: v for k, v in parse_qsl(parts.query) if k != "apiKey"}
+
+        if self.fake._inject():
+            self._send(429, {"status": "ERROR", "error": "rate limited"}, {"Retry-After": self.fake.retry_after})
+            return
+
+        status, body = self.fake.handle(parts.path, params)
+        self._send(status, body)
+
+    def _send(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
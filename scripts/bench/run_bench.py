@@ -0,0 +1,282 @@
+"""
+Offline benchmark runner.
+
+Starts the fake Massive server on a synthetic universe, then runs each job
+in its own subprocess against a local (throwaway) Postgres and reports
+wall time, rows/sec, API calls/sec and peak RSS per job.
+
+Usage:
+  BENCH_PG_DSN=postgresql://postgres@localhost:5433/stocks_bench \\
+    python scripts/bench/run_bench.py --securities 200 --years 5 \\
+      --latency-ms 40 --p429 0.01 --page-size 5000 --reset
+
+The target database must already have the stocks_research schema applied
+(see docs/SCHEMA_REBUILD.md). --reset TRUNCATEs every stocks_research table
+first; never point BENCH_PG_DSN at a real database.
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+# Resolve repo root: scripts/bench/run_bench.py → repo root
+repo_root = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(repo_root))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import argparse
+import csv
+import importlib
+import json
+import os
+import runpy
+import subprocess
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import psycopg2
+
+from fake_massive import FakeMassive
+from synthetic_universe import SyntheticUniverse
+
+SCHEMA = "stocks_research"
+
+# job name -> (entrypoint, table whose row delta is reported when the job
+# does not return rows_upserted)
+BENCH_JOBS: Dict[str, tuple] = {
+    "bootstrap": ("script:scripts/bootstrap/00_bootstrap_universe.py", "securities"),
+    "prices_daily": ("src.ingest.jobs.prices_daily:run", "prices_daily"),
+    "corporate_actions": ("src.ingest.jobs.corporate_actions:main", "corporate_actions"),
+    "adjustment_factors": ("src.ingest.jobs.adjustment_factors:run", "adjustment_factors_daily"),
+    "fundamentals_quarterly_raw": ("src.ingest.jobs.fundamentals_quarterly_raw:run", "fundamentals_quarterly_raw"),
+}
+
+
+# -------------------------
+# Worker side (one job per process)
+# -------------------------
+
+def run_worker(job: str):
+    entry, _ = BENCH_JOBS[job]
+    result: Dict[str, Any] = {}
+
+    if entry.startswith("script:"):
+        runpy.run_path(str(repo_root / entry[len("script:"):]), run_name="__main__")
+    else:
+        module_name, fn_name = entry.split(":")
+        fn = getattr(importlib.import_module(module_name), fn_name)
+        if fn_name == "main":
+            result = fn() or {}
+        else:
+            conn = psycopg2.connect(os.environ["PG_DSN"])
+            try:
+                result = fn(conn, None) or {}
+            finally:
+                conn.close()
+
+    with open(os.environ["BENCH_RESULT_PATH"], "w", encoding="utf-8") as f:
+        json.dump(result, f, default=str)
+
+
+# -------------------------
+# Parent side
+# -------------------------
+
+def table_count(dsn: str, table: str) -> int:
+    conn = psycopg2.connect(dsn)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT COUNT(*) FROM {SCHEMA}.{table}")
+            return int(cur.fetchone()[0])
+    finally:
+        conn.close()
+
+
+def reset_database(dsn: str):
+    conn = psycopg2.connect(dsn)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT table_name
+                FROM information_schema.tables
+                WHERE table_schema = %s
+                  AND table_type = 'BASE TABLE'
+                """,
+                (SCHEMA,),
+            )
+            tables = [r[0] for r in cur.fetchall()]
+            if tables:
+                cur.execute(
+                    "TRUNCATE " + ", ".join(f"{SCHEMA}.{t}" for t in tables) + " RESTART IDENTITY CASCADE"
+                )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def job_env(args, fake: FakeMassive, universe: SyntheticUniverse, workdir: Path) -> Dict[str, str]:
+    universe_csv = workdir / "universe.csv"
+    with universe_csv.open("w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["ticker"])
+        for t in universe.tickers:
+            w.writerow([t])
+
+    env = dict(os.environ)
+    env.update({
+        "PG_DSN": args.dsn,
+        "MASSIVE_API_KEY": "bench",
+        "MASSIVE_BASE_URL": fake.base_url,
+        "MASSIVE_FINANCIALS_BASE_URL": fake.base_url,
+        "MASSIVE_INCOME_STATEMENTS_PATH": "/stocks/financials/v1/income-statements",
+        "MASSIVE_BALANCE_SHEET_STATEMENTS_PATH": "/stocks/financials/v1/balance-sheets",
+        "MASSIVE_CASH_FLOW_STATEMENTS_PATH": "/stocks/financials/v1/cash-flow-statements",
+        "UNIVERSE_MODE": "explicit",
+        "UNIVERSE_CSV": str(universe_csv),
+        "BOOTSTRAP_TICKERS_JSON": str(workdir / "top_tickers.json"),
+        "TICKERS": ",".join(universe.tickers),
+        "TOP_N": str(len(universe.tickers)),
+        "FINVIZ_ENRICH": "0",
+        "YEARS": str(args.years),
+        "START_FISCAL_YEAR": str(universe.start_date.year),
+        "END_FISCAL_YEAR": str(universe.end_date.year),
+        "STOCKS_SCHEMA": SCHEMA,
+        "PYTHONPATH": str(repo_root),
+    })
+    return env
+
+
+def run_job(job: str, args, fake: FakeMassive, env: Dict[str, str], workdir: Path) -> Dict[str, Any]:
+    _, table = BENCH_JOBS[job]
+    result_path = workdir / f"{job}.result.json"
+    log_path = workdir / f"{job}.log"
+
+    rows_before = table_count(args.dsn, table)
+    calls_before = fake.total_calls
+
+    t0 = time.perf_counter()
+    with log_path.open("w", encoding="utf-8") as log:
+        p = subprocess.Popen(
+            [sys.executable, str(Path(__file__).resolve()), "--worker", job],
+            cwd=str(repo_root),
+            env={**env, "BENCH_RESULT_PATH": str(result_path)},
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+        peak_rss_mb: Optional[float] = None
+        if hasattr(os, "wait4"):
+            _, status, usage = os.wait4(p.pid, 0)
+            p.returncode = os.waitstatus_to_exitcode(status)
+            peak_rss_mb = round(usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+        else:
+            p.wait()
+    wall_s = time.perf_counter() - t0
+
+    api_calls = fake.total_calls - calls_before
+    result: Dict[str, Any] = {}
+    if result_path.exists():
+        result = json.loads(result_path.read_text(encoding="utf-8"))
+
+    rows = result.get("rows_upserted")
+    if rows is None:
+        rows = table_count(args.dsn, table) - rows_before
+
+    return {
+        "job": job,
+        "ok": p.returncode == 0,
+        "wall_s": round(wall_s, 2),
+        "rows": rows,
+        "rows_per_s": round(rows / wall_s, 1) if wall_s else None,
+        "api_calls": api_calls,
+        "api_calls_per_s": round(api_calls / wall_s, 1) if wall_s else None,
+        "peak_rss_mb": peak_rss_mb,
+    }
+
+
+def print_report(rows: List[Dict[str, Any]]):
+    cols = ["job", "ok", "wall_s", "rows", "rows_per_s", "api_calls", "api_calls_per_s", "peak_rss_mb"]
+    widths = {c: max(len(c), *(len(str(r[c])) for r in rows)) for c in cols}
+    print("  ".join(c.ljust(widths[c]) for c in cols))
+    for r in rows:
+        print("  ".join(str(r[c]).ljust(widths[c]) for c in cols))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--dsn", default=os.getenv("BENCH_PG_DSN"))
+    parser.add_argument("--securities", type=int, default=100)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--jobs", default=",".join(BENCH_JOBS.keys()))
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--p429", type=float, default=0.0)
+    parser.add_argument("--retry-after", default="0.2")
+    parser.add_argument("--page-size", type=int)
+    parser.add_argument("--reset", action="store_true", help="TRUNCATE all stocks_research tables first")
+    parser.add_argument("--json", help="Also write the report to this path")
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker)
+        return
+
+    if not args.dsn:
+        raise RuntimeError("Set BENCH_PG_DSN (or --dsn) to a throwaway local database")
+
+    jobs = [j.strip() for j in args.jobs.split(",") if j.strip()]
+    unknown = [j for j in jobs if j not in BENCH_JOBS]
+    if unknown:
+        raise ValueError(f"Unknown bench jobs {unknown}. Valid: {sorted(BENCH_JOBS.keys())}")
+
+    if args.reset:
+        reset_database(args.dsn)
+    elif table_count(args.dsn, "securities") and "bootstrap" in jobs:
+        raise RuntimeError("Bench database is not empty; pass --reset to truncate it")
+
+    universe = SyntheticUniverse(n_securities=args.securities, years=args.years, seed=args.seed)
+    fake = FakeMassive(
+        universe,
+        latency_ms=args.latency_ms,
+        p429=args.p429,
+        retry_after=args.retry_after,
+        page_size=args.page_size,
+        seed=args.seed,
+    ).start()
+
+    report: List[Dict[str, Any]] = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="stocks_bench_") as tmp:
+            workdir = Path(tmp)
+            env = job_env(args, fake, universe, workdir)
+            for job in jobs:
+                print(f"Running {job}...")
+                r = run_job(job, args, fake, env, workdir)
+                if not r["ok"]:
+                    print((workdir / f"{job}.log").read_text(encoding="utf-8")[-4000:])
+                report.append(r)
+    finally:
+        fake.stop()
+
+    print(
+        f"\nUniverse: {args.securities} securities x {args.years}y | "
+        f"latency={args.latency_ms}ms p429={args.p429} page_size={args.page_size} | "
+        f"429s injected: {fake.throttled}\n"
+    )
+    print_report(report)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(
+                {"args": vars(args), "calls_by_endpoint": dict(fake.calls), "jobs": report},
+                f,
+                indent=2,
+                default=str,
+            )
+
+
+if __name__ == "__main__":
+    main()
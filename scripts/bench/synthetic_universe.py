@@ -0,0 +1,238 @@
+"""
+Deterministic synthetic universe for offline benchmarks.
+
+Every payload is generated lazily per ticker from (seed, ticker), so the same
+arguments always produce the same bars, splits, dividends and fundamentals,
+and a 5,000-security universe costs nothing until a ticker is requested.
+
+Shapes mirror the Massive responses the jobs consume:
+  - aggregates : {"t", "o", "h", "l", "c", "v", "vw", "n"}   (raw / unadjusted)
+  - splits     : {"id", "ticker", "execution_date", "split_from", "split_to"}
+  - dividends  : {"id", "ticker", "ex_dividend_date", "cash_amount", "currency", ...}
+  - financials : {"tickers", "fiscal_year", "fiscal_quarter", "period_end", ...}
+  - overview   : {"ticker", "composite_figi", "name", "primary_exchange", ...}
+"""
+
+from __future__ import annotations
+
+import math
+import random
+import string
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Dict, List
+
+# Roughly what the US common-stock universe looks like
+SPLIT_RATE_PER_YEAR = 0.02
+DIVIDEND_PAYER_FRACTION = 0.4
+SPLIT_RATIOS = [(1, 2), (1, 3), (2, 3), (1, 4), (10, 1)]  # (split_from, split_to)
+EXCHANGES = ["XNYS", "XNAS", "XASE", "ARCX"]
+
+
+def _ticker(i: int) -> str:
+    letters = string.ascii_uppercase
+    out = ""
+    n = i
+    for _ in range(4):
+        out = letters[n % 26] + out
+        n //= 26
+    return out
+
+
+def _business_days(start: date, end: date) -> List[date]:
+    out = []
+    d = start
+    while d <= end:
+        if d.weekday() < 5:
+            out.append(d)
+        d += timedelta(days=1)
+    return out
+
+
+def _ts_ms(d: date) -> int:
+    # Massive stamps daily bars at midnight America/New_York (04:00/05:00 UTC)
+    return int(datetime.combine(d, time(5, 0), tzinfo=timezone.utc).timestamp() * 1000)
+
+
+@dataclass(frozen=True)
+class SyntheticUniverse:
+    n_securities: int
+    years: int
+    seed: int = 42
+    end_date: date = field(default_factory=date.today)
+
+    @property
+    def start_date(self) -> date:
+        return self.end_date - timedelta(days=365 * self.years)
+
+    @property
+    def tickers(self) -> List[str]:
+        return [_ticker(i) for i in range(self.n_securities)]
+
+    def _rng(self, ticker: str, stream: str) -> random.Random:
+        return random.Random(f"{self.seed}:{ticker}:{stream}")
+
+    def has_ticker(self, ticker: str) -> bool:
+        return ticker in self._ticker_index()
+
+    @lru_cache(maxsize=None)
+    def _ticker_index(self) -> Dict[str, int]:
+        return {t: i for i, t in enumerate(self.tickers)}
+
+    # -------------------------
+    # Reference data
+    # -------------------------
+
+    def ticker_overview(self, ticker: str) -> Dict[str, Any]:
+        i = self._ticker_index()[ticker]
+        rng = self._rng(ticker, "overview")
+        return {
+            "ticker": ticker,
+            "name": f"Synthetic {ticker} Inc.",
+            "market": "stocks",
+            "locale": "us",
+            "type": "CS",
+            "active": True,
+            "primary_exchange": EXCHANGES[i % len(EXCHANGES)],
+            "currency_name": "usd",
+            "composite_figi": f"BBGSYN{i:06d}",
+            "share_class_figi": f"BBGSYS{i:06d}",
+            "market_cap": round(rng.lognormvariate(22, 1.5), 2),
+            "list_date": self.start_date.isoformat(),
+        }
+
+    # -------------------------
+    # Corporate actions
+    # -------------------------
+
+    @lru_cache(maxsize=4096)
+    def splits(self, ticker: str) -> List[Dict[str, Any]]:
+        rng = self._rng(ticker, "splits")
+        days = _business_days(self.start_date, self.end_date)
+        out = []
+        for year in range(self.years):
+            if rng.random() >= SPLIT_RATE_PER_YEAR:
+                continue
+            d = days[min(len(days) - 1, int((year + rng.random()) * 252))]
+            split_from, split_to = rng.choice(SPLIT_RATIOS)
+            out.append({
+                "id": f"SSYN{ticker}{d:%Y%m%d}",
+                "ticker": ticker,
+                "execution_date": d.isoformat(),
+                "split_from": split_from,
+                "split_to": split_to,
+            })
+        return out
+
+    @lru_cache(maxsize=4096)
+    def dividends(self, ticker: str) -> List[Dict[str, Any]]:
+        rng = self._rng(ticker, "dividends")
+        if rng.random() >= DIVIDEND_PAYER_FRACTION:
+            return []
+
+        closes = {b["t"]: b["c"] for b in self.bars(ticker)}
+        yield_q = rng.uniform(0.002, 0.012)
+        out = []
+        d = self.start_date + timedelta(days=rng.randint(0, 90))
+        while d <= self.end_date:
+            while d.weekday() >= 5:
+                d += timedelta(days=1)
+            close = closes.get(_ts_ms(d))
+            if close:
+                out.append({
+                    "id": f"DSYN{ticker}{d:%Y%m%d}",
+                    "ticker": ticker,
+                    "ex_dividend_date": d.isoformat(),
+                    "pay_date": (d + timedelta(days=14)).isoformat(),
+                    "record_date": (d + timedelta(days=1)).isoformat(),
+                    "cash_amount": round(close * yield_q, 4),
+                    "currency": "USD",
+                    "frequency": 4,
+                    "dividend_type": "CD",
+                })
+            d += timedelta(days=91)
+        return out
+
+    # -------------------------
+    # Daily bars (raw, split-unadjusted)
+    # -------------------------
+
+    @lru_cache(maxsize=4096)
+    def bars(self, ticker: str) -> List[Dict[str, Any]]:
+        rng = self._rng(ticker, "bars")
+        split_dates = [
+            (date.fromisoformat(s["execution_date"]), s["split_to"] / s["split_from"])
+            for s in self.splits(ticker)
+        ]
+
+        price = rng.uniform(10, 300)
+        mean_volume = rng.lognormvariate(13, 1.2)
+        out = []
+        for d in _business_days(self.start_date, self.end_date):
+            price *= math.exp(rng.gauss(0.0003, 0.02))
+            ratio = 1.0
+            for sd, r in split_dates:
+                if d >= sd:
+                    ratio *= r
+            c = price / ratio
+            o = c * math.exp(rng.gauss(0, 0.005))
+            h = max(o, c) * (1 + abs(rng.gauss(0, 0.01)))
+            low = min(o, c) * (1 - abs(rng.gauss(0, 0.01)))
+            v = int(mean_volume * rng.lognormvariate(0, 0.4) * ratio)
+            out.append({
+                "t": _ts_ms(d),
+                "o": round(o, 4),
+                "h": round(h, 4),
+                "l": round(low, 4),
+                "c": round(c, 4),
+                "v": v,
+                "vw": round((o + h + low + c) / 4, 4),
+                "n": max(1, v // 150),
+            })
+        return out
+
+    # -------------------------
+    # Quarterly financial statements
+    # -------------------------
+
+    @lru_cache(maxsize=4096)
+    def financials(self, ticker: str, statement: str) -> List[Dict[str, Any]]:
+        rng = self._rng(ticker, f"financials:{statement}")
+        revenue = rng.lognormvariate(19, 1.5)
+        shares = rng.lognormvariate(18, 1.0)
+        out = []
+        for fy in range(self.start_date.year, self.end_date.year + 1):
+            for fq in range(1, 5):
+                period_end = date(fy, fq * 3, 30 if fq in (2, 3) else 31)
+                if period_end > self.end_date:
+                    break
+                revenue *= math.exp(rng.gauss(0.01, 0.05))
+                net_income = revenue * rng.uniform(-0.05, 0.25)
+                row: Dict[str, Any] = {
+                    "tickers": [ticker],
+                    "cik": f"{self._ticker_index()[ticker]:010d}",
+                    "fiscal_year": fy,
+                    "fiscal_quarter": fq,
+                    "timeframe": "quarterly",
+                    "period_end": period_end.isoformat(),
+                    "filing_date": (period_end + timedelta(days=35)).isoformat(),
+                }
+                if statement == "income":
+                    row.update({
+                        "revenue": round(revenue, 2),
+                        "net_income_loss_attributable_common_shareholders": round(net_income, 2),
+                        "basic_earnings_per_share": round(net_income / shares, 4),
+                        "diluted_earnings_per_share": round(net_income / (shares * 1.02), 4),
+                    })
+                elif statement == "balance":
+                    row.update({
+                        "total_assets": round(revenue * 4, 2),
+                        "total_liabilities": round(revenue * 2.5, 2),
+                    })
+                else:
+                    row.update({
+                        "net_cash_from_operating_activities": round(net_income * 1.1, 2),
+                    })
+                out.append(row)
+        return out
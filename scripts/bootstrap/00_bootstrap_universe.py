@@ -10,24 +10,38 @@ sys.path.insert(0, str(repo_root))
 
 import os
 import json
-from typing import Any, Dict, List, Tuple
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import csv
 import psycopg2
-from psycopg2.extras import execute_batch
+from psycopg2.extras import execute_values
 
-from common import getenv, requests_get_json
+from common import RateLimiter, getenv, requests_get_json
 from dotenv import load_dotenv
 
 load_dotenv()
 
-BASE_URL = "https://api.massive.com"
+BASE_URL = os.getenv("MASSIVE_BASE_URL", "https://api.massive.com")
 SCHEMA = os.getenv("STOCKS_SCHEMA", "stocks_research")
 TOP_N = int(os.getenv("TOP_N", "50"))
 FINVIZ_ENRICH = os.getenv("FINVIZ_ENRICH", "1") == "1"
 
 TICKER_OVERVIEW_PATH = "/v3/reference/tickers/{ticker}"
 
+# Enrichment runs on a bounded pool; each source has its own rate limit
+# (calls/minute, 0 = unlimited) and results are cached locally per
+# (ticker, source) so re-bootstrapping only fetches new or expired tickers.
+BOOTSTRAP_WORKERS = int(os.getenv("BOOTSTRAP_WORKERS", "8"))
+CACHE_PATH = os.getenv("BOOTSTRAP_CACHE_PATH", ".cache/bootstrap_enrichment.sqlite")
+CACHE_TTL_DAYS = {
+    "overview": float(os.getenv("BOOTSTRAP_OVERVIEW_TTL_DAYS", "7")),
+    "finviz": float(os.getenv("BOOTSTRAP_FINVIZ_TTL_DAYS", "30")),
+}
+
 
 from pathlib import Path
 
@@ -65,24 +79,151 @@ def load_universe_tickers_from_csv() -> List[str]:
 
 
 
+class EnrichmentCache:
+    """
+    Local sqlite cache: (ticker, source) -> JSON payload with fetch time.
+    Shared by the worker threads behind one lock; failed fetches are never
+    stored.
+    """
+
+    def __init__(self, path: str):
+        full = (repo_root / path).resolve()
+        full.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(full), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS enrichment (
+                ticker     TEXT NOT NULL,
+                source     TEXT NOT NULL,
+                payload    TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (ticker, source)
+            )
+            """
+        )
+        self._db.commit()
+
+    def get(self, ticker: str, source: str, ttl_days: float) -> Optional[Any]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT payload, fetched_at FROM enrichment WHERE ticker = ? AND source = ?",
+                (ticker, source),
+            ).fetchone()
+        if row is None or time.time() - row[1] > ttl_days * 86400:
+            return None
+        return json.loads(row[0])
+
+    def put(self, ticker: str, source: str, payload: Any):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO enrichment (ticker, source, payload, fetched_at) VALUES (?, ?, ?, ?)",
+                (ticker, source, json.dumps(payload), time.time()),
+            )
+            self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+
 def get_ticker_overview(api_key: str, ticker: str) -> Dict[str, Any]:
     url = BASE_URL + TICKER_OVERVIEW_PATH.format(ticker=ticker)
     return requests_get_json(url, params={}, api_key=api_key)
 
 
-def finviz_sector_industry(ticker: str) -> Tuple[str, str]:
-    try:
-        from pyfinviz.quote import Quote  # type: ignore
-        q = Quote(ticker=ticker)
-        return (q.sector or "").strip(), (q.industry or "").strip()
-    except Exception:
-        return "", ""
+def fetch_finviz_sector_industry(ticker: str) -> Tuple[str, str]:
+    from pyfinviz.quote import Quote  # type: ignore
+    q = Quote(ticker=ticker)
+    return (q.sector or "").strip(), (q.industry or "").strip()
 
 
-def upsert_companies_securities(conn, rows: List[Dict[str, Any]]):
+def cached_fetch(
+    cache: EnrichmentCache,
+    ticker: str,
+    source: str,
+    limiter: RateLimiter,
+    fetch: Callable[[], Any],
+) -> Tuple[Any, bool]:
+    """
+    (payload, from_cache). Exceptions from fetch propagate uncached.
+    """
+    hit = cache.get(ticker, source, CACHE_TTL_DAYS[source])
+    if hit is not None:
+        return hit, True
+    limiter.acquire()
+    payload = fetch()
+    cache.put(ticker, source, payload)
+    return payload, False
+
+
+def enrich_ticker(
+    api_key: str,
+    ticker: str,
+    cache: EnrichmentCache,
+    limiters: Dict[str, RateLimiter],
+) -> Tuple[Optional[Dict[str, Any]], int]:
+    """
+    (enriched row or None when the ticker has no composite_figi, fetches made)
+    """
+    fetched = 0
+    res, hit = cached_fetch(
+        cache, ticker, "overview", limiters["overview"],
+        lambda: get_ticker_overview(api_key, ticker).get("results") or {},
+    )
+    fetched += not hit
+
+    composite_figi = res.get("composite_figi") or ""
+    if not composite_figi:
+        return None, fetched
+
+    mc = res.get("market_cap") or 0
+    sector = ""
+    industry = ""
+    if FINVIZ_ENRICH:
+        try:
+            (sector, industry), hit = cached_fetch(
+                cache, ticker, "finviz", limiters["finviz"],
+                lambda: list(fetch_finviz_sector_industry(ticker)),
+            )
+            fetched += not hit
+        except Exception as e:
+            # Sector/industry are optional; retried on the next bootstrap
+            print(f"Warn: finviz enrichment failed for {ticker}: {e}")
+
+    return {
+        "ticker": ticker,
+        "market_cap": float(mc) if mc else 0.0,
+        "composite_figi": composite_figi,
+        "name": res.get("name") or ticker,
+        "primary_exchange": res.get("primary_exchange") or "",
+        "currency": res.get("currency_name") or "",
+        "active": bool(res.get("active", True)),
+        "sector": sector,
+        "industry": industry,
+        "country": "US",
+    }, fetched
+
+
+def upsert_companies_securities(conn, rows: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Load companies, securities and ticker_history in a fixed number of
+    statements, independent of the row count:
+
+      1. companies upsert (one multi-row INSERT)
+      2. rows staged into a temp table
+      3. one statement inserts missing securities and ticker_history rows
+         and returns the ticker -> security_id mapping
+
+    An existing security is reused by composite_figi (lowest security_id),
+    as before.
+    """
+    if not rows:
+        return {}
+
     sql_company = f"""
     INSERT INTO {SCHEMA}.companies (composite_figi, name, country, sector, industry)
-    VALUES (%s, %s, %s, %s, %s)
+    VALUES %s
     ON CONFLICT (composite_figi) DO UPDATE SET
       name=EXCLUDED.name,
       country=COALESCE(EXCLUDED.country, {SCHEMA}.companies.country),
@@ -90,46 +231,89 @@ def upsert_companies_securities(conn, rows: List[Dict[str, Any]]):
       industry=COALESCE(NULLIF(EXCLUDED.industry,''), {SCHEMA}.companies.industry);
     """
 
-    sql_security_insert = f"""
-    INSERT INTO {SCHEMA}.securities (composite_figi, primary_exchange, currency, start_date, end_date, is_active)
-    VALUES (%s, %s, %s, NULL, NULL, %s)
-    RETURNING security_id;
+    sql_stage = """
+    CREATE TEMP TABLE bootstrap_stage (
+      ticker           TEXT NOT NULL,
+      composite_figi   TEXT NOT NULL,
+      primary_exchange TEXT,
+      currency         TEXT,
+      is_active        BOOLEAN NOT NULL
+    ) ON COMMIT DROP;
     """
 
-    sql_security_find = f"""
-    SELECT security_id FROM {SCHEMA}.securities
-    WHERE composite_figi = %s
-    ORDER BY security_id
-    LIMIT 1;
+    # The CTEs share one snapshot: `existing` does not see `new_securities`,
+    # so the two id sets are disjoint.
+    sql_load = f"""
+    WITH new_securities AS (
+      INSERT INTO {SCHEMA}.securities (composite_figi, primary_exchange, currency, start_date, end_date, is_active)
+      SELECT DISTINCT ON (s.composite_figi)
+        s.composite_figi, s.primary_exchange, s.currency, NULL::date, NULL::date, s.is_active
+      FROM bootstrap_stage s
+      WHERE NOT EXISTS (
+        SELECT 1 FROM {SCHEMA}.securities x WHERE x.composite_figi = s.composite_figi
+      )
+      ORDER BY s.composite_figi, s.ticker
+      RETURNING security_id, composite_figi
+    ),
+    existing AS (
+      SELECT DISTINCT ON (x.composite_figi) x.composite_figi, x.security_id
+      FROM {SCHEMA}.securities x
+      WHERE x.composite_figi IN (SELECT composite_figi FROM bootstrap_stage)
+      ORDER BY x.composite_figi, x.security_id
+    ),
+    ids AS (
+      SELECT composite_figi, security_id, TRUE AS is_new FROM new_securities
+      UNION ALL
+      SELECT composite_figi, security_id, FALSE FROM existing
+    ),
+    new_history AS (
+      INSERT INTO {SCHEMA}.ticker_history (security_id, ticker, exchange, start_date, end_date, reason)
+      SELECT ids.security_id, s.ticker, COALESCE(NULLIF(s.primary_exchange, ''), 'UNKNOWN'), CURRENT_DATE, NULL, 'bootstrap'
+      FROM bootstrap_stage s
+      JOIN ids ON ids.composite_figi = s.composite_figi
+      ON CONFLICT (security_id, ticker, exchange, start_date) DO NOTHING
+      RETURNING ticker
+    )
+    SELECT
+      s.ticker,
+      ids.security_id,
+      ids.is_new,
+      EXISTS (SELECT 1 FROM new_history h WHERE h.ticker = s.ticker)
+    FROM bootstrap_stage s
+    JOIN ids ON ids.composite_figi = s.composite_figi;
     """
 
-    sql_ticker_hist = f"""
-    INSERT INTO {SCHEMA}.ticker_history (security_id, ticker, exchange, start_date, end_date, reason)
-    VALUES (%s, %s, %s, CURRENT_DATE, NULL, 'bootstrap')
-    ON CONFLICT (security_id, ticker, exchange, start_date) DO NOTHING;
-    """
+    # One statement cannot upsert the same company twice; the last row wins,
+    # as it did with per-row upserts.
+    companies = {
+        r["composite_figi"]: (r["composite_figi"], r["name"], r.get("country"), r.get("sector",""), r.get("industry",""))
+        for r in rows
+    }
 
     with conn.cursor() as cur:
-        execute_batch(
+        execute_values(cur, sql_company, list(companies.values()), page_size=1000)
+
+        cur.execute(sql_stage)
+        execute_values(
             cur,
-            sql_company,
-            [(r["composite_figi"], r["name"], r.get("country"), r.get("sector",""), r.get("industry","")) for r in rows],
-            page_size=200,
+            "INSERT INTO bootstrap_stage (ticker, composite_figi, primary_exchange, currency, is_active) VALUES %s",
+            [
+                (r["ticker"], r["composite_figi"], r.get("primary_exchange"), r.get("currency"), bool(r.get("active", True)))
+                for r in rows
+            ],
+            page_size=5000,
         )
 
-        for r in rows:
-            cur.execute(sql_security_find, (r["composite_figi"],))
-            found = cur.fetchone()
-            if found:
-                security_id = found[0]
-            else:
-                cur.execute(sql_security_insert, (r["composite_figi"], r.get("primary_exchange"), r.get("currency"), r.get("active", True)))
-                security_id = cur.fetchone()[0]
-
-            cur.execute(sql_ticker_hist, (security_id, r["ticker"], r.get("primary_exchange") or "UNKNOWN"))
+        cur.execute(sql_load)
+        mapping = cur.fetchall()
 
     conn.commit()
 
+    new_securities = len({sid for _, sid, is_new, _ in mapping if is_new})
+    new_history = sum(1 for *_, h in mapping if h)
+    print(f"securities: {new_securities} new; ticker_history: {new_history} new rows")
+    return {ticker: sid for ticker, sid, _, _ in mapping}
+
 
 def main():
     api_key = getenv("MASSIVE_API_KEY")
@@ -140,38 +324,37 @@ def main():
     print(f"Loaded {len(tickers)} tickers from universe_dev.csv")
 
 
+    cache = EnrichmentCache(CACHE_PATH)
+    limiters = {
+        "overview": RateLimiter.from_env("MASSIVE_RATE_LIMIT_PER_MIN"),
+        "finviz": RateLimiter.from_env("FINVIZ_RATE_LIMIT_PER_MIN", "60"),
+    }
+
     enriched: List[Dict[str, Any]] = []
-    for i, t in enumerate(tickers, 1):
-        try:
-            j = get_ticker_overview(api_key, t)
-            res = j.get("results") or {}
-            composite_figi = res.get("composite_figi") or ""
-            if not composite_figi:
-                continue
-
-            mc = res.get("market_cap") or 0
-            sector = ""
-            industry = ""
-            if FINVIZ_ENRICH:
-                sector, industry = finviz_sector_industry(t)
-
-            enriched.append({
-                "ticker": t,
-                "market_cap": float(mc) if mc else 0.0,
-                "composite_figi": composite_figi,
-                "name": res.get("name") or t,
-                "primary_exchange": res.get("primary_exchange") or "",
-                "currency": res.get("currency_name") or "",
-                "active": bool(res.get("active", True)),
-                "sector": sector,
-                "industry": industry,
-                "country": "US",
-            })
-
-            if i % 50 == 0:
-                print(f"Processed {i}/{len(tickers)}...")
-        except Exception as e:
-            print(f"Warn: failed ticker overview for {t}: {e}")
+    fetched = 0
+    t0 = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=BOOTSTRAP_WORKERS, thread_name_prefix="bootstrap") as pool:
+            futures = {pool.submit(enrich_ticker, api_key, t, cache, limiters): t for t in tickers}
+            for i, fut in enumerate(as_completed(futures), 1):
+                t = futures[fut]
+                try:
+                    row, n = fut.result()
+                    fetched += n
+                    if row is not None:
+                        enriched.append(row)
+                except Exception as e:
+                    print(f"Warn: failed ticker overview for {t}: {e}")
+
+                if i % 50 == 0:
+                    print(f"Processed {i}/{len(tickers)}...")
+    finally:
+        cache.close()
+
+    print(
+        f"Enriched {len(enriched)}/{len(tickers)} tickers in {time.perf_counter() - t0:.1f}s "
+        f"({fetched} fetches, the rest from {CACHE_PATH})"
+    )
 
     if not enriched:
         raise RuntimeError("No tickers enriched. Check API key and connectivity.")
@@ -180,7 +363,7 @@ def main():
     top = enriched[:TOP_N]
     print(f"Selected top {TOP_N} by market cap. Example: {top[0]['ticker']} (${top[0]['market_cap']:.0f})")
 
-    out_json = os.path.join(os.path.dirname(__file__), "top50_tickers.json")
+    out_json = os.getenv("BOOTSTRAP_TICKERS_JSON") or os.path.join(os.path.dirname(__file__), "top50_tickers.json")
     with open(out_json, "w", encoding="utf-8") as f:
         json.dump([r["ticker"] for r in top], f, indent=2)
     print(f"Wrote {out_json}")
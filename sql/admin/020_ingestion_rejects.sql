@@ -0,0 +1,44 @@
+/* ============================================================
+   Ingestion Rejects
+   ------------------------------------------------------------
+   Purpose:
+     - Quarantine provider records that fail in-pipeline checks
+       (bad bars, malformed corporate actions) instead of writing
+       them to stocks_research
+     - Record soft warnings (price/volume spikes) for review
+   ============================================================ */
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS ingestion.rejects (
+    reject_id   BIGSERIAL PRIMARY KEY,
+    job_name    TEXT NOT NULL,
+    job_id      UUID
+        REFERENCES ingestion.ingestion_job (job_id)
+        ON DELETE SET NULL,
+
+    entity      TEXT NOT NULL,      -- target table, e.g. 'prices_daily'
+    symbol      TEXT,
+    key_date    DATE,
+    reason      TEXT NOT NULL,      -- comma-separated check names
+
+    severity    TEXT NOT NULL
+        CHECK (severity IN ('reject', 'warn')),
+
+    payload     JSONB NOT NULL,
+    created_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_rejects_entity_created
+    ON ingestion.rejects (entity, created_at);
+
+CREATE INDEX IF NOT EXISTS idx_rejects_symbol_date
+    ON ingestion.rejects (symbol, key_date);
+
+COMMENT ON TABLE ingestion.rejects IS
+'Provider records quarantined (severity = reject) or flagged (severity = warn) by in-pipeline checks.';
+
+COMMENT ON COLUMN ingestion.rejects.payload IS
+'Provider record exactly as received.';
+
+COMMIT;
@@ -0,0 +1,29 @@
+/* ============================================================
+   Validation Cache
+   ------------------------------------------------------------
+   Purpose:
+     - Persist validator results with a fingerprint of the
+       tables each check reads
+     - Let validate_runner skip checks whose inputs are unchanged
+   ============================================================ */
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS ingestion.validation_cache (
+    check_name  TEXT NOT NULL,
+    scope_key   TEXT NOT NULL,      -- 'global', a scope hash, ':sample' suffix
+
+    fingerprint TEXT NOT NULL,      -- sha256 over the input tables' fingerprints
+    tables      TEXT[] NOT NULL,
+
+    result_json JSONB NOT NULL,     -- list of ValidationCheck
+    passed      BOOLEAN NOT NULL,
+    checked_at  TIMESTAMPTZ NOT NULL DEFAULT now(),
+
+    PRIMARY KEY (check_name, scope_key)
+);
+
+COMMENT ON TABLE ingestion.validation_cache IS
+'Cached validation results keyed by check, scope and input-table fingerprint (src/ingest/validate_cache.py).';
+
+COMMIT;
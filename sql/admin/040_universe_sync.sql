@@ -0,0 +1,52 @@
+/* ============================================================
+   Universe Sync
+   ------------------------------------------------------------
+   Purpose:
+     - Per-ticker attribute fingerprints of the last synced
+       provider universe (unchanged tickers are skipped)
+     - Change set of identity updates applied by the
+       universe_sync job, for downstream jobs and audit
+     - Rule exclusions of still-listed tickers (recorded only;
+       their ticker_history stays open)
+   ============================================================ */
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS ingestion.universe_fingerprints (
+    ticker          TEXT PRIMARY KEY,
+    composite_figi  TEXT,
+    attrs           JSONB NOT NULL,     -- fingerprinted provider attributes
+    attrs_hash      TEXT NOT NULL,
+    first_seen_at   TIMESTAMPTZ NOT NULL DEFAULT now(),
+    last_changed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS ingestion.universe_changes (
+    change_id   BIGSERIAL PRIMARY KEY,
+    job_id      UUID
+        REFERENCES ingestion.ingestion_job (job_id)
+        ON DELETE SET NULL,
+
+    change_type TEXT NOT NULL
+        CHECK (change_type IN (
+            'listing', 'relisting', 'delisting',
+            'ticker_change', 'exchange_move', 'figi_change',
+            'excluded'
+        )),
+    ticker      TEXT NOT NULL,
+    security_id BIGINT,
+    old_value   JSONB,
+    new_value   JSONB,
+    detected_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_universe_changes_job
+    ON ingestion.universe_changes (job_id);
+
+CREATE INDEX IF NOT EXISTS idx_universe_changes_security
+    ON ingestion.universe_changes (security_id, detected_at);
+
+COMMENT ON TABLE ingestion.universe_changes IS
+'Identity changes (listings, delistings, ticker changes, exchange moves) applied by src/ingest/jobs/universe_sync.py.';
+
+COMMIT;
@@ -0,0 +1,227 @@
+"""
+Gap planner for prices_daily: compares each security's stored bars with
+the trading calendar and emits the minimal date ranges to fetch.
+
+A security's expected sessions in [start, end] are bounded by:
+  below  securities.start_date (the listing date) when known, otherwise
+         its first stored bar: earlier sessions are pre-listing, not holes.
+         ticker_history.start_date is when this pipeline first saw a
+         ticker (bootstrap / universe_sync), not a listing date, so it is
+         not used. PRICES_GAPS_BEFORE_FIRST_BAR=1 counts them as holes
+         (extending history backwards).
+  above  its last ticker_history end_date once every row is closed
+         (delisted); otherwise `end`.
+Securities with no bars at all are one hole over the whole range.
+
+Missing sessions are grouped into consecutive runs (gaps-and-islands on
+the calendar's session numbers). Runs separated by at most
+PRICES_GAP_MERGE_SESSIONS stored sessions (default 20) are merged into one
+fetch range: one request for both costs less than two.
+
+    python -m src.ingest.gap_planner                 # coverage report, universe
+    python -m src.ingest.gap_planner AAPL MSFT --start 2021-01-01
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, List, Optional
+
+from .trading_calendar import NYSE, require_calendar
+
+SCHEMA = os.getenv("STOCKS_SCHEMA", "stocks_research")
+
+GAPS_SQL = f"""
+WITH sessions AS (
+    SELECT cal_date, row_number() OVER (ORDER BY cal_date) AS sn
+    FROM {SCHEMA}.trading_calendar
+    WHERE exchange = %(exchange)s AND is_open AND cal_date BETWEEN %(start)s AND %(end)s
+),
+current_ticker AS (
+    SELECT DISTINCT ON (ticker) ticker, security_id
+    FROM {SCHEMA}.ticker_history
+    WHERE ticker = ANY(%(tickers)s)
+    ORDER BY ticker, start_date DESC
+),
+bounds AS (
+    SELECT
+        c.ticker,
+        c.security_id,
+        GREATEST(
+            %(start)s::date,
+            COALESCE(
+                s.start_date,
+                CASE WHEN %(before_first_bar)s THEN NULL
+                     ELSE (SELECT MIN(p.trade_date) FROM {SCHEMA}.prices_daily p WHERE p.security_id = c.security_id)
+                END,
+                %(start)s::date
+            )
+        ) AS lo,
+        LEAST(
+            %(end)s::date,
+            (SELECT CASE WHEN bool_and(th.end_date IS NOT NULL) THEN MAX(th.end_date) END
+             FROM {SCHEMA}.ticker_history th WHERE th.security_id = c.security_id),
+            %(end)s::date
+        ) AS hi
+    FROM current_ticker c
+    JOIN {SCHEMA}.securities s ON s.security_id = c.security_id
+),
+missing AS (
+    SELECT
+        b.ticker, b.security_id, x.cal_date, x.sn,
+        x.sn - row_number() OVER (PARTITION BY b.ticker ORDER BY x.sn) AS grp
+    FROM bounds b
+    JOIN sessions x ON x.cal_date BETWEEN b.lo AND b.hi
+    WHERE NOT EXISTS (
+        SELECT 1 FROM {SCHEMA}.prices_daily p
+        WHERE p.security_id = b.security_id AND p.trade_date = x.cal_date
+    )
+)
+SELECT ticker, security_id, MIN(cal_date), MAX(cal_date), MIN(sn), MAX(sn), COUNT(*)
+FROM missing
+GROUP BY ticker, security_id, grp
+ORDER BY ticker, MIN(sn)
+"""
+
+COVERAGE_SQL = f"""
+WITH current_ticker AS (
+    SELECT DISTINCT ON (ticker) ticker, security_id
+    FROM {SCHEMA}.ticker_history
+    WHERE ticker = ANY(%(tickers)s)
+    ORDER BY ticker, start_date DESC
+)
+SELECT
+    c.ticker,
+    c.security_id,
+    (SELECT COUNT(*) FROM {SCHEMA}.trading_calendar t
+      WHERE t.exchange = %(exchange)s AND t.is_open AND t.cal_date BETWEEN %(start)s AND %(end)s) AS sessions,
+    (SELECT COUNT(*) FROM {SCHEMA}.prices_daily p
+      JOIN {SCHEMA}.trading_calendar t
+        ON t.exchange = %(exchange)s AND t.cal_date = p.trade_date AND t.is_open
+      WHERE p.security_id = c.security_id AND p.trade_date BETWEEN %(start)s AND %(end)s) AS bars_on_sessions,
+    (SELECT COUNT(*) FROM {SCHEMA}.prices_daily p
+      LEFT JOIN {SCHEMA}.trading_calendar t
+        ON t.exchange = %(exchange)s AND t.cal_date = p.trade_date
+      WHERE p.security_id = c.security_id AND p.trade_date BETWEEN %(start)s AND %(end)s
+        AND NOT COALESCE(t.is_open, FALSE)) AS bars_off_calendar
+FROM current_ticker c
+ORDER BY c.ticker
+"""
+
+
+@dataclass(frozen=True)
+class Gap:
+    ticker: str
+    security_id: int
+    start: date
+    end: date
+    missing_sessions: int
+    first_sn: int
+    last_sn: int
+
+
+def merge_gaps(gaps: List[Gap], merge_sessions: int) -> List[Gap]:
+    """
+    Merge a ticker's consecutive gaps separated by at most merge_sessions
+    stored sessions. missing_sessions stays the count of true holes.
+    """
+    out: List[Gap] = []
+    for g in gaps:
+        prev = out[-1] if out else None
+        if prev and prev.ticker == g.ticker and g.first_sn - prev.last_sn - 1 <= merge_sessions:
+            out[-1] = Gap(
+                prev.ticker, prev.security_id, prev.start, g.end,
+                prev.missing_sessions + g.missing_sessions, prev.first_sn, g.last_sn,
+            )
+        else:
+            out.append(g)
+    return out
+
+
+def plan_gaps(
+    cur,
+    tickers: List[str],
+    start: date,
+    end: date,
+    exchange: str = NYSE,
+    merge_sessions: Optional[int] = None,
+    before_first_bar: Optional[bool] = None,
+) -> Dict[str, List[Gap]]:
+    """
+    ticker -> fetch ranges covering its missing sessions in [start, end].
+    Tickers with complete coverage (or unresolved) are absent.
+    """
+    if merge_sessions is None:
+        merge_sessions = int(os.getenv("PRICES_GAP_MERGE_SESSIONS", "20"))
+    if before_first_bar is None:
+        before_first_bar = os.getenv("PRICES_GAPS_BEFORE_FIRST_BAR", "0") == "1"
+    require_calendar(cur, start, end, exchange)
+
+    cur.execute(
+        GAPS_SQL,
+        {"exchange": exchange, "start": start, "end": end, "tickers": tickers, "before_first_bar": before_first_bar},
+    )
+    gaps = [Gap(t, int(sid), lo, hi, int(n), int(a), int(b)) for t, sid, lo, hi, a, b, n in cur.fetchall()]
+
+    out: Dict[str, List[Gap]] = {}
+    for g in merge_gaps(gaps, merge_sessions):
+        out.setdefault(g.ticker, []).append(g)
+    return out
+
+
+def coverage_report(cur, tickers: List[str], start: date, end: date, exchange: str = NYSE) -> List[Dict]:
+    """
+    Per ticker: calendar sessions in range, bars stored on sessions, and
+    bars stored on non-session days (provider or mapping errors).
+    """
+    require_calendar(cur, start, end, exchange)
+    cur.execute(COVERAGE_SQL, {"exchange": exchange, "start": start, "end": end, "tickers": tickers})
+    return [
+        {"ticker": t, "security_id": int(sid), "sessions": n, "bars_on_sessions": on, "bars_off_calendar": off}
+        for t, sid, n, on, off in cur.fetchall()
+    ]
+
+
+def main():
+    from common import iso_today, iso_years_ago
+
+    from .db import get_conn
+    from .universe import load_tickers
+
+    parser = argparse.ArgumentParser(description="prices_daily gaps against the trading calendar")
+    parser.add_argument("tickers", nargs="*", help="default: the configured universe")
+    parser.add_argument("--start", type=date.fromisoformat)
+    parser.add_argument("--end", type=date.fromisoformat)
+    args = parser.parse_args()
+
+    start = args.start or date.fromisoformat(iso_years_ago(int(os.getenv("YEARS", "5"))))
+    end = args.end or date.fromisoformat(iso_today())
+    tickers = [t.upper() for t in args.tickers] or load_tickers()
+
+    conn = get_conn()
+    try:
+        with conn.cursor() as cur:
+            gaps = plan_gaps(cur, tickers, start, end)
+            coverage = coverage_report(cur, tickers, start, end)
+        conn.rollback()
+    finally:
+        conn.close()
+
+    for row in coverage:
+        ranges = gaps.get(row["ticker"], [])
+        missing = sum(g.missing_sessions for g in ranges)
+        print(
+            f"{row['ticker']:<8} {row['bars_on_sessions']:>6}/{row['sessions']:<6} sessions"
+            f"  missing {missing:>5} in {len(ranges)} ranges"
+            + (f"  off-calendar bars {row['bars_off_calendar']}" if row["bars_off_calendar"] else "")
+        )
+        for g in ranges:
+            print(f"         {g.start} .. {g.end}  ({g.missing_sessions} sessions)")
+    print(f"{len(gaps)} of {len(tickers)} tickers have gaps; {sum(len(v) for v in gaps.values())} fetch ranges")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,14 +4,362 @@ from datetime import datetime, time
 from decimal import Decimal
 import logging
 
-from src.ingest.jobs.prices_daily import run as run_prices_daily
+from psycopg2.extras import execute_values
+
+from src.ingest.profiling import phase
 
 
 logger = logging.getLogger(__name__)
 DERIVATION_VERSION = "v1"
 
 
-def run(conn, job_id):
+# ------------------------------------------------------------------
+# Derivation helpers (shared by full rebuild and incremental update)
+# ------------------------------------------------------------------
+
+def _derive_event_rows(cur, security_ids=None):
+    """
+    adjustment_events rows for all corporate actions, or only those of
+    security_ids.
+    """
+    where = ""
+    args = ()
+    if security_ids is not None:
+        where = "WHERE ca.security_id = ANY(%s)"
+        args = (list(security_ids),)
+
+    cur.execute(f"""
+        SELECT
+            ca.provider,
+            ca.provider_action_id,
+            ca.security_id,
+            ca.action_type,
+            ca.action_date,
+            ca.value_num,
+            ca.value_den,
+            ca.cash_amount
+        FROM stocks_research.corporate_actions ca
+        {where}
+        ORDER BY ca.security_id, ca.action_date
+    """, args)
+
+    rows = cur.fetchall()
+    logger.info("Processing %d corporate actions", len(rows))
+
+    event_rows = []
+
+    for (
+        provider,
+        provider_action_id,
+        security_id,
+        action_type,
+        action_date,
+        value_num,
+        value_den,
+        cash_amount
+    ) in rows:
+
+        effective_ts = datetime.combine(action_date, time(0, 0))
+
+        split_mult = Decimal("1")
+        dividend_mult = Decimal("1")
+        prev_close = None
+        prev_close_date = None
+        status = "RESOLVED"
+
+        if action_type == "SPLIT":
+            if value_num is not None and value_den is not None:
+                # value_num / value_den = new / old
+                # price multiplier = old / new
+                split_mult = Decimal(value_den) / Decimal(value_num)
+
+        elif action_type == "DIVIDEND":
+            cur.execute("""
+                SELECT trade_date, close
+                FROM stocks_research.prices_daily
+                WHERE security_id = %s
+                  AND trade_date < %s
+                ORDER BY trade_date DESC
+                LIMIT 1
+            """, (security_id, action_date))
+
+            row = cur.fetchone()
+
+            if row is None:
+                status = "MISSING_PREV_CLOSE"
+            else:
+                prev_close_date, prev_close = row
+                prev_close = Decimal(prev_close)
+
+                if prev_close <= 0 or cash_amount is None:
+                    status = "BAD_PREV_CLOSE"
+                else:
+                    dividend_mult = (
+                        (prev_close - Decimal(cash_amount)) / prev_close
+                    )
+
+        price_mult = split_mult * dividend_mult
+
+        event_rows.append((
+            security_id,
+            provider,
+            provider_action_id,
+            action_type,
+            effective_ts,
+            split_mult,
+            dividend_mult,
+            price_mult,
+            prev_close_date,
+            prev_close,
+            status,
+            DERIVATION_VERSION
+        ))
+
+    return event_rows
+
+
+def _insert_events(cur, event_rows):
+    cur.executemany("""
+        INSERT INTO stocks_research.adjustment_events (
+            security_id,
+            provider,
+            provider_action_id,
+            action_type,
+            effective_ts,
+            split_price_mult,
+            dividend_price_mult,
+            price_mult,
+            prev_close_date,
+            prev_close,
+            resolution_status,
+            derivation_version
+        )
+        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+    """, event_rows)
+
+
+def _factor_rows(security_id, trade_dates, events, anchor_date):
+    """
+    trade_dates and events (effective_ts, split_mult, dividend_mult) must both
+    be sorted descending. Factors compound every event effective after the
+    trade date.
+    """
+    event_idx = 0
+
+    split_factor = Decimal("1")
+    dividend_factor = Decimal("1")
+    volume_factor = Decimal("1")
+
+    out = []
+    for trade_date in trade_dates:
+        while (
+            event_idx < len(events)
+            and events[event_idx][0].date() > trade_date):
+
+            split_mult = Decimal(events[event_idx][1])
+            dividend_mult = Decimal(events[event_idx][2])
+
+            split_factor *= split_mult
+            dividend_factor *= dividend_mult
+            volume_factor *= (Decimal("1") / split_mult)
+
+            event_idx += 1
+
+        out.append((
+            security_id,
+            trade_date,
+            split_factor,
+            dividend_factor,
+            volume_factor,
+            anchor_date,
+            DERIVATION_VERSION
+        ))
+    return out
+
+
+def _insert_factors(cur, rows):
+    execute_values(cur, """
+        INSERT INTO stocks_research.adjustment_factors_daily (
+            security_id,
+            trade_date,
+            split_factor,
+            dividend_factor,
+            volume_factor,
+            anchor_date,
+            derivation_version,
+            derived_at
+        )
+        VALUES %s
+    """, rows, template="(%s,%s,%s,%s,%s,%s,%s,now())", page_size=5000)
+
+
+def _rebuild_factors(cur, security_id):
+    cur.execute("""
+        SELECT trade_date
+        FROM stocks_research.prices_daily
+        WHERE security_id = %s
+        ORDER BY trade_date DESC
+    """, (security_id,))
+
+    trade_dates = [r[0] for r in cur.fetchall()]
+    if not trade_dates:
+        return 0
+    anchor_date = trade_dates[0]
+
+    cur.execute("""
+        SELECT
+            effective_ts,
+            split_price_mult,
+            dividend_price_mult
+        FROM stocks_research.adjustment_events
+        WHERE security_id = %s
+        ORDER BY effective_ts DESC
+    """, (security_id,))
+
+    events = cur.fetchall()
+
+    rows = _factor_rows(security_id, trade_dates, events, anchor_date)
+    _insert_factors(cur, rows)
+    return len(rows)
+
+
+def _extend_factors(cur, security_ids):
+    """
+    Append factor rows for trade dates after each security's last derived
+    row. Only valid when none of the security's events are dated after that
+    row; callers route such securities to a full rebuild instead.
+    Returns (rows_inserted, security_ids_needing_rebuild).
+    """
+    cur.execute("""
+        SELECT s.security_id, f.last_date
+        FROM unnest(%s::bigint[]) AS s(security_id)
+        LEFT JOIN LATERAL (
+            SELECT MAX(trade_date) AS last_date
+            FROM stocks_research.adjustment_factors_daily
+            WHERE security_id = s.security_id
+        ) f ON TRUE
+    """, (list(security_ids),))
+    last_dates = dict(cur.fetchall())
+
+    needs_rebuild = {sid for sid, d in last_dates.items() if d is None}
+
+    # Events after the last derived day change earlier factors (and a
+    # dividend's prev_close may be one of the new bars).
+    cur.execute("""
+        SELECT DISTINCT ca.security_id
+        FROM stocks_research.corporate_actions ca
+        JOIN unnest(%s::bigint[], %s::date[]) AS l(security_id, last_date)
+          ON l.security_id = ca.security_id
+        WHERE ca.action_date > l.last_date
+    """, (
+        [sid for sid, d in last_dates.items() if d is not None],
+        [d for d in last_dates.values() if d is not None],
+    ))
+    needs_rebuild |= {r[0] for r in cur.fetchall()}
+
+    extend_ids = [sid for sid in last_dates if sid not in needs_rebuild]
+    if not extend_ids:
+        return 0, needs_rebuild
+
+    cur.execute("""
+        SELECT p.security_id, p.trade_date
+        FROM stocks_research.prices_daily p
+        JOIN unnest(%s::bigint[], %s::date[]) AS l(security_id, last_date)
+          ON l.security_id = p.security_id
+         AND p.trade_date > l.last_date
+        ORDER BY p.security_id, p.trade_date DESC
+    """, (extend_ids, [last_dates[sid] for sid in extend_ids]))
+
+    new_dates = {}
+    for sid, trade_date in cur.fetchall():
+        new_dates.setdefault(sid, []).append(trade_date)
+
+    rows = []
+    for sid, trade_dates in new_dates.items():
+        # No events after last_date, so every new day carries factor 1
+        rows.extend(_factor_rows(sid, trade_dates, [], trade_dates[0]))
+    if rows:
+        _insert_factors(cur, rows)
+
+        # Keep anchor_date = latest trade_date for the extended securities
+        cur.execute("""
+            UPDATE stocks_research.adjustment_factors_daily f
+            SET anchor_date = m.anchor_date
+            FROM (
+                SELECT security_id, MAX(trade_date) AS anchor_date
+                FROM stocks_research.adjustment_factors_daily
+                WHERE security_id = ANY(%s)
+                GROUP BY security_id
+            ) m
+            WHERE f.security_id = m.security_id
+              AND f.anchor_date <> m.anchor_date
+        """, (list(new_dates.keys()),))
+
+    return len(rows), needs_rebuild
+
+
+# ------------------------------------------------------------------
+# Job entrypoints
+# ------------------------------------------------------------------
+
+def _run_update(conn, params):
+    """
+    Incremental derivation for the securities touched by this run.
+
+    params:
+      security_ids         : securities with new bars (extend in place)
+      rebuild_security_ids : securities whose corporate actions changed
+                             (events + factors rebuilt from scratch)
+    """
+    rebuild = set(params.get("rebuild_security_ids") or [])
+    extend = set(params.get("security_ids") or []) - rebuild
+
+    conn.autocommit = False
+
+    try:
+        with conn.cursor() as cur:
+            with phase("factors"):
+                extended_rows, more = _extend_factors(cur, extend) if extend else (0, set())
+            rebuild |= more
+
+            event_rows = []
+            factor_rows = 0
+            if rebuild:
+                ids = sorted(rebuild)
+                cur.execute("DELETE FROM stocks_research.adjustment_events WHERE security_id = ANY(%s)", (ids,))
+                cur.execute("DELETE FROM stocks_research.adjustment_factors_daily WHERE security_id = ANY(%s)", (ids,))
+
+                with phase("events"):
+                    event_rows = _derive_event_rows(cur, ids)
+                    _insert_events(cur, event_rows)
+
+                with phase("factors"):
+                    for security_id in ids:
+                        factor_rows += _rebuild_factors(cur, security_id)
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    logger.info(
+        "Adjustment factors update complete: %d rebuilt, %d extended",
+        len(rebuild), len(extend - rebuild),
+    )
+    return {
+        "rows_upserted": len(event_rows) + factor_rows + extended_rows,
+        "delta": {
+            "securities_rebuilt": len(rebuild),
+            "securities_extended": len(extend - rebuild),
+            "event_rows": len(event_rows),
+            "factor_rows_rebuilt": factor_rows,
+            "factor_rows_appended": extended_rows,
+        },
+        "scope": {"security_ids": sorted(rebuild | extend)},
+    }
+
+
+def run(conn, job_id, params=None):
 
     """
     Phase 4A — Adjustment Factors (Daily)
@@ -25,15 +373,22 @@ def run(conn, job_id):
       - stocks_research.prices_daily
 
     Raw prices and corporate actions are NEVER mutated.
+
+    With params["mode"] == "update" only the securities named in params are
+    re-derived (see _run_update).
     """
 
+    params = params or {}
+    if params.get("mode") == "update":
+        return _run_update(conn, params)
+
     conn.autocommit = False
 
     try:
         with conn.cursor() as cur:
 
             # --------------------------------------------------------------
-            # Step 1: Ensure prices_daily exists (auto-heal)
+            # Step 1: Require prices_daily
             # --------------------------------------------------------------
             cur.execute("""
                 SELECT MAX(trade_date)
@@ -42,18 +397,11 @@ def run(conn, job_id):
             max_price_date = cur.fetchone()[0]
 
             if max_price_date is None:
-                logger.info("prices_daily empty; running prices ingestion")
-                run_prices_daily()
-                conn.commit()
-
-                cur.execute("""
-                    SELECT MAX(trade_date)
-                    FROM stocks_research.prices_daily
-                """)
-                max_price_date = cur.fetchone()[0]
-
-                if max_price_date is None:
-                    raise RuntimeError("prices_daily still empty after ingestion")
+                # prices_daily runs as its own ingestion_job so its state,
+                # checkpoints and rejects are attributed to it
+                raise RuntimeError(
+                    "prices_daily is empty; run python -m src.ingest.run --job prices_daily first"
+                )
 
             logger.info("Anchor will be based on latest trade_date=%s", max_price_date)
 
@@ -66,109 +414,9 @@ def run(conn, job_id):
             # --------------------------------------------------------------
             # Step 3: Build adjustment_events
             # --------------------------------------------------------------
-            cur.execute("""
-                SELECT
-                    ca.provider,
-                    ca.provider_action_id,
-                    ca.security_id,
-                    ca.action_type,
-                    ca.action_date,
-                    ca.value_num,
-                    ca.value_den,
-                    ca.cash_amount
-                FROM stocks_research.corporate_actions ca
-                ORDER BY ca.security_id, ca.action_date
-            """)
-
-            rows = cur.fetchall()
-            logger.info("Processing %d corporate actions", len(rows))
-
-            event_rows = []
-
-            for (
-                provider,
-                provider_action_id,
-                security_id,
-                action_type,
-                action_date,
-                value_num,
-                value_den,
-                cash_amount
-            ) in rows:
-
-                effective_ts = datetime.combine(action_date, time(0, 0))
-
-                split_mult = Decimal("1")
-                dividend_mult = Decimal("1")
-                prev_close = None
-                prev_close_date = None
-                status = "RESOLVED"
-
-                if action_type == "SPLIT":
-                    if value_num is not None and value_den is not None:
-                        # value_num / value_den = new / old
-                        # price multiplier = old / new
-                        split_mult = Decimal(value_den) / Decimal(value_num)
-
-                elif action_type == "DIVIDEND":
-                    cur.execute("""
-                        SELECT trade_date, close
-                        FROM stocks_research.prices_daily
-                        WHERE security_id = %s
-                          AND trade_date < %s
-                        ORDER BY trade_date DESC
-                        LIMIT 1
-                    """, (security_id, action_date))
-
-                    row = cur.fetchone()
-
-                    if row is None:
-                        status = "MISSING_PREV_CLOSE"
-                    else:
-                        prev_close_date, prev_close = row
-                        prev_close = Decimal(prev_close)
-
-                        if prev_close <= 0 or cash_amount is None:
-                            status = "BAD_PREV_CLOSE"
-                        else:
-                            dividend_mult = (
-                                (prev_close - Decimal(cash_amount)) / prev_close
-                            )
-
-                price_mult = split_mult * dividend_mult
-
-                event_rows.append((
-                    security_id,
-                    provider,
-                    provider_action_id,
-                    action_type,
-                    effective_ts,
-                    split_mult,
-                    dividend_mult,
-                    price_mult,
-                    prev_close_date,
-                    prev_close,
-                    status,
-                    DERIVATION_VERSION
-                ))
-
-            cur.executemany("""
-                INSERT INTO stocks_research.adjustment_events (
-                    security_id,
-                    provider,
-                    provider_action_id,
-                    action_type,
-                    effective_ts,
-                    split_price_mult,
-                    dividend_price_mult,
-                    price_mult,
-                    prev_close_date,
-                    prev_close,
-                    resolution_status,
-                    derivation_version
-                )
-                VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-            """, event_rows)
+            with phase("events"):
+                event_rows = _derive_event_rows(cur)
+                _insert_events(cur, event_rows)
 
             logger.info("Inserted %d adjustment_events", len(event_rows))
 
@@ -183,70 +431,9 @@ def run(conn, job_id):
 
             security_ids = [r[0] for r in cur.fetchall()]
 
-            for security_id in security_ids:
-
-                cur.execute("""
-                    SELECT trade_date
-                    FROM stocks_research.prices_daily
-                    WHERE security_id = %s
-                    ORDER BY trade_date DESC
-                """, (security_id,))
-
-                trade_dates = [r[0] for r in cur.fetchall()]
-                anchor_date = trade_dates[0]
-
-                cur.execute("""
-                    SELECT
-                        effective_ts,
-                        split_price_mult,
-                        dividend_price_mult
-                    FROM stocks_research.adjustment_events
-                    WHERE security_id = %s
-                    ORDER BY effective_ts DESC
-                """, (security_id,))
-
-                events = cur.fetchall()
-                event_idx = 0
-
-                split_factor = Decimal("1")
-                dividend_factor = Decimal("1")
-                volume_factor = Decimal("1")
-
-                for trade_date in trade_dates:
-                    while (
-                        event_idx < len(events) 
-                        and events[event_idx][0].date() > trade_date):
-
-                        split_mult = Decimal(events[event_idx][1])
-                        dividend_mult = Decimal(events[event_idx][2])
-
-                        split_factor *= split_mult
-                        dividend_factor *= dividend_mult
-                        volume_factor *= (Decimal("1") / split_mult)
-
-                        event_idx += 1
-
-                    cur.execute("""
-                        INSERT INTO stocks_research.adjustment_factors_daily (
-                            security_id,
-                            trade_date,
-                            split_factor,
-                            dividend_factor,
-                            volume_factor,
-                            anchor_date,
-                            derivation_version,
-                            derived_at
-                        )
-                        VALUES (%s,%s,%s,%s,%s,%s,%s,now())
-                    """, (
-                        security_id,
-                        trade_date,
-                        split_factor,
-                        dividend_factor,
-                        volume_factor,
-                        anchor_date,
-                        DERIVATION_VERSION
-                    ))
+            with phase("factors"):
+                for security_id in security_ids:
+                    _rebuild_factors(cur, security_id)
 
             conn.commit()
             logger.info("Adjustment factors derivation complete")
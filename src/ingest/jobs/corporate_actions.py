@@ -2,23 +2,178 @@ from __future__ import annotations
 
 import os
 import json
-from typing import Any, Dict, List
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
 
 from ..universe import load_tickers
-from ..validate.corporate_actions_events import validate_dividend, validate_split
+from ..tracking import record_rejects
+from ..validate.corporate_actions_events import validate_dividends, validate_splits
 
 import psycopg2
-from psycopg2.extras import execute_batch, Json
+from psycopg2.extras import execute_values, Json
 
-from common import getenv, requests_get_json
+from common import api_call_count, getenv, iter_pages
 
-BASE_URL = "https://api.massive.com"
+BASE_URL = os.getenv("MASSIVE_BASE_URL", "https://api.massive.com")
 SCHEMA = os.getenv("STOCKS_SCHEMA", "stocks_research")
 
 SPLITS_PATH = "/stocks/v1/splits"
 DIVIDENDS_PATH = "/stocks/v1/dividends"
 
 
+# Upserts keyed by provider identity; RETURNING yields the security_id of
+# every inserted or changed row.
+SPLITS_UPSERT_SQL = f"""
+INSERT INTO {SCHEMA}.corporate_actions
+  (
+    security_id,
+    action_date,
+    action_type,
+    value_num,
+    value_den,
+    cash_amount,
+    currency,
+    source,
+    provider,
+    provider_action_id,
+    raw_payload
+  )
+VALUES %s
+ON CONFLICT (provider, provider_action_id) DO UPDATE SET
+    security_id   = EXCLUDED.security_id,
+    action_date   = EXCLUDED.action_date,
+    value_num     = EXCLUDED.value_num,
+    value_den     = EXCLUDED.value_den,
+    source        = EXCLUDED.source,
+    raw_payload   = EXCLUDED.raw_payload
+-- unchanged re-fetches are not rewritten and not reported as changed
+WHERE (
+    {SCHEMA}.corporate_actions.security_id,
+    {SCHEMA}.corporate_actions.action_date,
+    {SCHEMA}.corporate_actions.value_num,
+    {SCHEMA}.corporate_actions.value_den,
+    {SCHEMA}.corporate_actions.raw_payload
+) IS DISTINCT FROM (
+    EXCLUDED.security_id,
+    EXCLUDED.action_date,
+    EXCLUDED.value_num,
+    EXCLUDED.value_den,
+    EXCLUDED.raw_payload
+)
+RETURNING security_id;
+"""
+
+SPLITS_TEMPLATE = """
+  (
+    %s,        -- security_id
+    %s,        -- action_date
+    'split',   -- action_type
+    %s,        -- value_num
+    %s,        -- value_den
+    NULL,      -- cash_amount
+    NULL,      -- currency
+    'massive', -- source
+    'massive', -- provider
+    %s,        -- provider_action_id
+    %s         -- raw_payload
+  )
+"""
+
+DIVIDENDS_UPSERT_SQL = f"""
+INSERT INTO {SCHEMA}.corporate_actions
+  (
+    security_id,
+    action_date,
+    action_type,
+    value_num,
+    value_den,
+    cash_amount,
+    currency,
+    source,
+    provider,
+    provider_action_id,
+    raw_payload
+  )
+VALUES %s
+ON CONFLICT (provider, provider_action_id) DO UPDATE SET
+    security_id = EXCLUDED.security_id,
+    action_date = EXCLUDED.action_date,
+    cash_amount = EXCLUDED.cash_amount,
+    currency    = EXCLUDED.currency,
+    source      = EXCLUDED.source,
+    raw_payload = EXCLUDED.raw_payload
+-- unchanged re-fetches are not rewritten and not reported as changed
+WHERE (
+    {SCHEMA}.corporate_actions.security_id,
+    {SCHEMA}.corporate_actions.action_date,
+    {SCHEMA}.corporate_actions.cash_amount,
+    {SCHEMA}.corporate_actions.currency,
+    {SCHEMA}.corporate_actions.raw_payload
+) IS DISTINCT FROM (
+    EXCLUDED.security_id,
+    EXCLUDED.action_date,
+    EXCLUDED.cash_amount,
+    EXCLUDED.currency,
+    EXCLUDED.raw_payload
+)
+RETURNING security_id;
+"""
+
+DIVIDENDS_TEMPLATE = """
+  (
+    %s,           -- security_id
+    %s,           -- action_date (ex-dividend date)
+    'dividend',   -- action_type
+    NULL,         -- value_num
+    NULL,         -- value_den
+    %s,           -- cash_amount
+    %s,           -- currency
+    'massive',    -- source
+    'massive',    -- provider
+    %s,           -- provider_action_id
+    %s            -- raw_payload
+  )
+"""
+
+
+def _split_row(sid: int, s: Dict[str, Any]) -> tuple:
+    return (
+        sid,
+        s["execution_date"],
+        s["split_to"],
+        s["split_from"],
+        s["id"],   # provider_action_id
+        Json(s),
+    )
+
+
+def _dividend_row(sid: int, d: Dict[str, Any]) -> tuple:
+    return (
+        sid,
+        d["ex_dividend_date"],
+        d["cash_amount"],
+        d["currency"],
+        d["id"],          # provider_action_id
+        Json(d),
+    )
+
+
+def fetch_mode(mode: str) -> str:
+    """
+    CORPORATE_ACTIONS_FETCH:
+      market  page through all splits/dividends for the window, no ticker filter
+      ticker  one split and one dividend query per ticker
+      auto    market for update runs and UNIVERSE_MODE=all, else ticker (default)
+    """
+    fetch = os.getenv("CORPORATE_ACTIONS_FETCH", "auto").lower()
+    if fetch not in ("auto", "market", "ticker"):
+        raise RuntimeError(f"Unknown CORPORATE_ACTIONS_FETCH: {fetch}")
+    if fetch == "auto":
+        all_mode = os.getenv("UNIVERSE_MODE", "explicit").lower() == "all"
+        return "market" if mode == "update" or all_mode else "ticker"
+    return fetch
+
+
 def security_id_for_ticker(cur, ticker: str) -> int:
     sql = f"""
     SELECT th.security_id
@@ -34,197 +189,329 @@ def security_id_for_ticker(cur, ticker: str) -> int:
     return int(r[0])
 
 
-def fetch_splits(api_key: str, ticker: str) -> List[Dict[str, Any]]:
+def fetch_splits(api_key: str, ticker: str, since: Optional[str] = None, until: Optional[str] = None) -> List[Dict[str, Any]]:
     url = BASE_URL + SPLITS_PATH
     params = {"ticker": ticker, "limit": 5000, "sort": "execution_date.desc"}
+    if since:
+        params["execution_date.gte"] = since
+    if until:
+        params["execution_date.lte"] = until
     out: List[Dict[str, Any]] = []
-    while True:
-        j = requests_get_json(url, params=params, api_key=api_key)
+    for j in iter_pages(url, params, api_key):
         out.extend(j.get("results") or [])
-        next_url = j.get("next_url")
-        if not next_url:
-            break
-        url = next_url
-        params = {}
     return out
 
 
-def upsert_splits(conn, ticker: str, splits: List[Dict[str, Any]]) -> int:
+def _quarantine(conn, ticker: str, job_id, invalid, date_key: str):
+    record_rejects(
+        conn,
+        "corporate_actions",
+        job_id,
+        "corporate_actions",
+        [(ticker, e.get(date_key) or None, reason, "reject", e) for e, reason in invalid],
+    )
+
+
+def upsert_splits(conn, ticker: str, splits: List[Dict[str, Any]], job_id=None) -> int:
     if not splits:
         return 0
 
-    sql = f"""
-    INSERT INTO {SCHEMA}.corporate_actions
-      (
-        security_id,
-        action_date,
-        action_type,
-        value_num,
-        value_den,
-        cash_amount,
-        currency,
-        source,
-        provider,
-        provider_action_id,
-        raw_payload
-      )
-    VALUES
-      (
-        %s,        -- security_id
-        %s,        -- action_date
-        'split',   -- action_type
-        %s,        -- value_num
-        %s,        -- value_den
-        NULL,      -- cash_amount
-        NULL,      -- currency
-        'massive', -- source
-        'massive', -- provider
-        %s,        -- provider_action_id
-        %s         -- raw_payload
-      )
-    ON CONFLICT (provider, provider_action_id) DO UPDATE SET
-        security_id   = EXCLUDED.security_id,
-        action_date   = EXCLUDED.action_date,
-        value_num     = EXCLUDED.value_num,
-        value_den     = EXCLUDED.value_den,
-        source        = EXCLUDED.source,
-        raw_payload   = EXCLUDED.raw_payload;
-    """
     with conn.cursor() as cur:
         sid = security_id_for_ticker(cur, ticker)
-        rows = []
-        invalid = 0
-
-        for s in splits:
-            err = validate_split(s)
-            if err:
-                invalid += 1
-                continue
+        valid, invalid = validate_splits(splits)
 
-            rows.append((
-                sid,
-                s["execution_date"],
-                s["split_to"],
-                s["split_from"],
-                s["id"],   # provider_action_id
-                Json(s),
-            ))
+        rows = [_split_row(sid, s) for s in valid]
 
-        execute_batch(cur, sql, rows, page_size=2000)
+        changed = execute_values(cur, SPLITS_UPSERT_SQL, rows, template=SPLITS_TEMPLATE, page_size=2000, fetch=True) if rows else []
 
-        if invalid:
-            print(f"  skipped {invalid} invalid splits for {ticker}")
+    if invalid:
+        _quarantine(conn, ticker, job_id, invalid, "execution_date")
+        print(f"  quarantined {len(invalid)} invalid splits for {ticker}")
 
     conn.commit()
-    return len(rows)
+    return len(changed)
 
 
-def fetch_dividends(api_key: str, ticker: str) -> List[Dict[str, Any]]:
+def fetch_dividends(api_key: str, ticker: str, since: Optional[str] = None, until: Optional[str] = None) -> List[Dict[str, Any]]:
     url = BASE_URL + DIVIDENDS_PATH
     params = {"ticker": ticker, "limit": 5000, "sort": "ex_dividend_date.desc"}
+    if since:
+        params["ex_dividend_date.gte"] = since
+    if until:
+        params["ex_dividend_date.lte"] = until
     out: List[Dict[str, Any]] = []
-    while True:
-        j = requests_get_json(url, params=params, api_key=api_key)
+    for j in iter_pages(url, params, api_key):
         out.extend(j.get("results") or [])
-        next_url = j.get("next_url")
-        if not next_url:
-            break
-        url = next_url
-        params = {}
     return out
 
 
-def upsert_dividends(conn, ticker: str, dividends: List[Dict[str, Any]]) -> int:
-    if not dividends:
-        return 0
+def _fetch_window(
+    api_key: str,
+    path: str,
+    date_field: str,
+    start: Optional[str],
+    end: Optional[str],
+) -> List[Dict[str, Any]]:
+    url = BASE_URL + path
+    params: Dict[str, Any] = {"limit": 5000, "sort": f"{date_field}.asc"}
+    if start:
+        params[f"{date_field}.gte"] = start
+    if end:
+        params[f"{date_field}.lte"] = end
+    out: List[Dict[str, Any]] = []
+    for j in iter_pages(url, params, api_key):
+        out.extend(j.get("results") or [])
+    return out
+
 
+def fetch_market_splits(api_key: str, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    All splits executed in [start, end] across the market.
+    """
+    return _fetch_window(api_key, SPLITS_PATH, "execution_date", start, end)
+
+
+def fetch_market_dividends(api_key: str, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    All dividends with ex-date in [start, end] across the market.
+    """
+    return _fetch_window(api_key, DIVIDENDS_PATH, "ex_dividend_date", start, end)
+
+
+def security_id_map(conn, tickers: List[str]) -> Dict[str, int]:
+    """
+    ticker -> security_id of its latest ticker_history row, in one query.
+    """
     sql = f"""
-    INSERT INTO {SCHEMA}.corporate_actions
-      (
-        security_id,
-        action_date,
-        action_type,
-        value_num,
-        value_den,
-        cash_amount,
-        currency,
-        source,
-        provider,
-        provider_action_id,
-        raw_payload
-      )
-    VALUES
-      (
-        %s,           -- security_id
-        %s,           -- action_date (ex-dividend date)
-        'dividend',   -- action_type
-        NULL,         -- value_num
-        NULL,         -- value_den
-        %s,           -- cash_amount
-        %s,           -- currency
-        'massive',    -- source
-        'massive',    -- provider
-        %s,           -- provider_action_id
-        %s            -- raw_payload
-      )
-    ON CONFLICT (provider, provider_action_id) DO UPDATE SET
-        security_id = EXCLUDED.security_id,
-        action_date = EXCLUDED.action_date,
-        cash_amount = EXCLUDED.cash_amount,
-        currency    = EXCLUDED.currency,
-        source      = EXCLUDED.source,
-        raw_payload = EXCLUDED.raw_payload;
+    SELECT DISTINCT ON (th.ticker) th.ticker, th.security_id
+    FROM {SCHEMA}.ticker_history th
+    WHERE th.ticker = ANY(%s)
+    ORDER BY th.ticker, th.start_date DESC;
+    """
+    with conn.cursor() as cur:
+        cur.execute(sql, (tickers,))
+        return {t: int(sid) for t, sid in cur.fetchall()}
+
+
+def upsert_market_actions(
+    conn,
+    splits: List[Dict[str, Any]],
+    dividends: List[Dict[str, Any]],
+    sids: Dict[str, int],
+    job_id=None,
+) -> Tuple[int, int, List[int]]:
+    """
+    Validate and upsert a market-wide batch in one transaction.
+    Returns (splits changed, dividends changed, changed security_ids).
     """
+    valid_s, invalid_s = validate_splits(splits)
+    valid_d, invalid_d = validate_dividends(dividends)
+
+    # One statement cannot upsert the same provider id twice
+    split_rows = list({s["id"]: _split_row(sids[s["ticker"]], s) for s in valid_s}.values())
+    dividend_rows = list({d["id"]: _dividend_row(sids[d["ticker"]], d) for d in valid_d}.values())
 
     with conn.cursor() as cur:
-        sid = security_id_for_ticker(cur, ticker)
-        rows = []
-        invalid = 0
+        changed_s = execute_values(
+            cur, SPLITS_UPSERT_SQL, split_rows, template=SPLITS_TEMPLATE, page_size=2000, fetch=True
+        ) if split_rows else []
+        changed_d = execute_values(
+            cur, DIVIDENDS_UPSERT_SQL, dividend_rows, template=DIVIDENDS_TEMPLATE, page_size=2000, fetch=True
+        ) if dividend_rows else []
+
+    rejects = [
+        (e.get("ticker"), e.get("execution_date") or None, reason, "reject", e) for e, reason in invalid_s
+    ] + [
+        (e.get("ticker"), e.get("ex_dividend_date") or None, reason, "reject", e) for e, reason in invalid_d
+    ]
+    if rejects:
+        record_rejects(conn, "corporate_actions", job_id, "corporate_actions", rejects)
+        print(f"  quarantined {len(invalid_s)} invalid splits, {len(invalid_d)} invalid dividends")
 
-        for d in dividends:
-            err = validate_dividend(d)
-            if err:
-                invalid += 1
-                continue
+    conn.commit()
+    changed = sorted({r[0] for r in changed_s} | {r[0] for r in changed_d})
+    return len(changed_s), len(changed_d), changed
+
+
+def upsert_dividends(conn, ticker: str, dividends: List[Dict[str, Any]], job_id=None) -> int:
+    if not dividends:
+        return 0
+
+
+    with conn.cursor() as cur:
+        sid = security_id_for_ticker(cur, ticker)
+        valid, invalid = validate_dividends(dividends)
 
-            rows.append((
-                sid,
-                d["ex_dividend_date"],
-                d["cash_amount"],
-                d["currency"],
-                d["id"],          # provider_action_id
-                Json(d),
-            ))
+        rows = [_dividend_row(sid, d) for d in valid]
 
-        execute_batch(cur, sql, rows, page_size=2000)
+        changed = execute_values(cur, DIVIDENDS_UPSERT_SQL, rows, template=DIVIDENDS_TEMPLATE, page_size=2000, fetch=True) if rows else []
 
-        if invalid:
-            print(f"  skipped {invalid} invalid dividends for {ticker}")
+    if invalid:
+        _quarantine(conn, ticker, job_id, invalid, "ex_dividend_date")
+        print(f"  quarantined {len(invalid)} invalid dividends for {ticker}")
 
     conn.commit()
-    return len(rows)
+    return len(changed)
 
 
-def main():
+def security_ids_for_tickers(conn, tickers: List[str]) -> List[int]:
+    sql = f"""
+    SELECT DISTINCT ON (th.ticker) th.security_id
+    FROM {SCHEMA}.ticker_history th
+    WHERE th.ticker = ANY(%s)
+    ORDER BY th.ticker, th.start_date DESC;
+    """
+    with conn.cursor() as cur:
+        cur.execute(sql, (tickers,))
+        return sorted(int(r[0]) for r in cur.fetchall())
+
+
+def _run_corporate_actions(conn, params: Dict[str, Any], job_id=None) -> Dict[str, Any]:
     api_key = getenv("MASSIVE_API_KEY")
-    dsn = getenv("PG_DSN")
+    mode = params.get("mode", "full")
+
+    # update mode: only actions on/after the last successful run, minus a
+    # lookback for late-published or corrected events
+    since = None
+    if mode == "update" and params.get("since"):
+        lookback = int(os.getenv("CORPORATE_ACTIONS_LOOKBACK_DAYS", "30"))
+        since = (date.fromisoformat(params["since"][:10]) - timedelta(days=lookback)).isoformat()
+    # an explicit range (--start-date / --end-date) wins
+    since = params.get("start_date") or since
+    until = params.get("end_date") or params.get("until")
+
+    # Tickers new to the universe (universe_sync) get their full history
+    full_history = set(params.get("full_history_tickers") or [])
 
     tickers = load_tickers()
-    conn = psycopg2.connect(dsn)
-    conn.autocommit = False
-    try:
-        total = 0
-        for i, t in enumerate(tickers, 1):
-            splits = fetch_splits(api_key, t)
-            n1 = upsert_splits(conn, t, splits)
+    if fetch_mode(mode) == "market":
+        return _run_market(conn, api_key, tickers, mode, since, until, full_history, job_id)
+
+    calls0 = api_call_count()
+    total_splits = 0
+    total_dividends = 0
+    changed_tickers: List[str] = []
+
+    for i, t in enumerate(tickers, 1):
+        t_since = None if t in full_history else since
+        splits = fetch_splits(api_key, t, t_since, until)
+        n1 = upsert_splits(conn, t, splits, job_id)
+
+        dividends = fetch_dividends(api_key, t, t_since, until)
+        n2 = upsert_dividends(conn, t, dividends, job_id)
+
+        total_splits += n1
+        total_dividends += n2
+        if n1 or n2:
+            changed_tickers.append(t)
+        print(f"{i:>2}/{len(tickers)} {t}: {n1} splits, {n2} dividends inserted/updated")
+
+    total = total_splits + total_dividends
+    print(f"Done. Total splits inserted/updated: {total}")
+
+    result: Dict[str, Any] = {
+        "rows_upserted": total,
+        "symbols_processed": len(tickers),
+        "api_calls": api_call_count() - calls0,
+    }
+    if mode == "update":
+        result["delta"] = {
+            "since": since,
+            "splits_changed": total_splits,
+            "dividends_changed": total_dividends,
+            "symbols_changed": len(changed_tickers),
+        }
+        result["scope"] = {
+            "security_ids": security_ids_for_tickers(conn, changed_tickers) if changed_tickers else [],
+        }
+    return result
+
+
+def _run_market(
+    conn,
+    api_key: str,
+    tickers: List[str],
+    mode: str,
+    since: Optional[str],
+    until: Optional[str],
+    full_history: set,
+    job_id=None,
+) -> Dict[str, Any]:
+    """
+    Market-wide fetch: every split and dividend in [since, until] in a few
+    paginated calls, restricted to the universe, upserted as one batch.
+    """
+    calls0 = api_call_count()
+    universe = set(tickers)
+
+    splits = [s for s in fetch_market_splits(api_key, since, until) if s.get("ticker") in universe]
+    dividends = [d for d in fetch_market_dividends(api_key, since, until) if d.get("ticker") in universe]
+
+    # A windowed run still needs the whole history of newly listed tickers
+    if since:
+        for t in sorted(full_history & universe):
+            splits.extend(fetch_splits(api_key, t))
+            dividends.extend(fetch_dividends(api_key, t))
+
+    event_tickers = sorted({e["ticker"] for e in splits + dividends})
+    sids = security_id_map(conn, event_tickers) if event_tickers else {}
+    missing = [t for t in event_tickers if t not in sids]
+    if missing:
+        raise RuntimeError(
+            f"No security_id found for tickers {', '.join(missing[:10])}"
+            f"{' ...' if len(missing) > 10 else ''}. Run 00_bootstrap_universe.py first."
+        )
+
+    n_splits, n_dividends, changed = upsert_market_actions(conn, splits, dividends, sids, job_id)
+    total = n_splits + n_dividends
+    print(
+        f"Market-wide {since or 'all history'} → {until or 'today'}: "
+        f"{len(splits)} splits, {len(dividends)} dividends for {len(event_tickers)} tickers; "
+        f"{n_splits} splits, {n_dividends} dividends inserted/updated"
+    )
+
+    result: Dict[str, Any] = {
+        "rows_upserted": total,
+        "symbols_processed": len(tickers),
+        "api_calls": api_call_count() - calls0,
+    }
+    if mode == "update":
+        result["delta"] = {
+            "since": since,
+            "fetch": "market",
+            "splits_changed": n_splits,
+            "dividends_changed": n_dividends,
+            "symbols_changed": len(changed),
+        }
+        result["scope"] = {"security_ids": changed}
+    return result
+
+
+def run(conn, job_id=None, params=None):
+    """
+    Phase-3 corporate actions entrypoint. The runner owns the DB connection.
 
-            dividends = fetch_dividends(api_key, t)
-            n2 = upsert_dividends(conn, t, dividends)
+    params:
+      mode = "full"   : full split/dividend history per ticker (default)
+      mode = "update" : only actions dated on/after params["since"] minus
+                        CORPORATE_ACTIONS_LOOKBACK_DAYS, except for
+                        params["full_history_tickers"] (new listings)
 
-            total += n1 + n2
-            print(f"{i:>2}/{len(tickers)} {t}: {n1} splits, {n2} dividends inserted/updated")
+    CORPORATE_ACTIONS_FETCH (see fetch_mode) picks per-ticker or
+    market-wide fetching; market-wide honours params["until"] as the
+    window end.
 
-        print(f"Done. Total splits inserted/updated: {total}")
+    Invalid events are quarantined to ingestion.rejects.
+    """
+    return _run_corporate_actions(conn, params or {}, job_id)
+
+
+def main():
+    dsn = getenv("PG_DSN")
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = False
+    try:
+        _run_corporate_actions(conn, {})
     finally:
         conn.close()
 
@@ -5,8 +5,8 @@ This job rebuilds stocks_research.fundamentals_quarterly_canonical
 deterministically from stocks_research.fundamentals_quarterly_raw.
 
 Design principles:
-- Derived state only (truncate + rebuild)
-- No incremental updates
+- Derived state only (truncate + rebuild; the nightly update rebuilds
+  the affected securities' rows the same way)
 - No Q4 derivation
 - No YoY computation
 - No trading-date alignment
@@ -20,9 +20,7 @@ Downstream:
 - Fundamentals alignment
 """
 
-from src.ingest.db import get_db_connection
 from src.ingest.logging import get_logger
-from src.ingest.validation import run_sql_assertions
 
 LOGGER = get_logger(__name__)
 
@@ -31,6 +29,11 @@ TRUNCATE_SQL = """
 TRUNCATE TABLE stocks_research.fundamentals_quarterly_canonical;
 """
 
+DELETE_SCOPED_SQL = """
+DELETE FROM stocks_research.fundamentals_quarterly_canonical
+WHERE security_id = ANY(%(security_ids)s);
+"""
+
 
 INSERT_CANONICAL_SQL = """
 INSERT INTO stocks_research.fundamentals_quarterly_canonical (
@@ -50,7 +53,7 @@ SELECT
     SUBSTRING(r.fiscal_period, 6, 1)::int AS fiscal_quarter,
 
     MAX(r.report_date)
-        FILTER (WHERE r.metric_name IN ('revenue', 'epsDiluted'))
+        FILTER (WHERE r.metric_name IN ('revenue', 'diluted_eps'))
         AS report_date,
 
     MAX(r.metric_value)
@@ -58,7 +61,7 @@ SELECT
         AS revenue,
 
     MAX(r.metric_value)
-        FILTER (WHERE r.metric_name = 'epsDiluted')
+        FILTER (WHERE r.metric_name = 'diluted_eps')
         AS eps_diluted,
 
     MAX(r.source) AS source,
@@ -68,7 +71,8 @@ FROM stocks_research.fundamentals_quarterly_raw r
 JOIN stocks_research.securities s
   ON s.composite_figi = r.composite_figi
 WHERE r.fiscal_period ~ '^[0-9]{4}Q[1-4]$'
-  AND r.metric_name IN ('revenue', 'epsDiluted')
+  AND r.metric_name IN ('revenue', 'diluted_eps')
+  AND (%(security_ids)s::bigint[] IS NULL OR s.security_id = ANY(%(security_ids)s))
 GROUP BY
     s.security_id,
     r.fiscal_period;
@@ -103,30 +107,62 @@ CANONICAL_ASSERTIONS = [
 ]
 
 
-def run():
+def run_sql_assertions(conn, assertions, job_name):
+    """
+    Each assertion is a query that must return no rows.
+    """
+    with conn.cursor() as cur:
+        for i, sql in enumerate(assertions, 1):
+            cur.execute(sql)
+            rows = cur.fetchmany(5)
+            if rows:
+                raise RuntimeError(
+                    f"{job_name}: canonical assertion {i} failed. Examples: {rows}"
+                )
+
+
+def run(conn, job_id=None, params=None):
     """
     Rebuild canonical quarterly fundamentals.
+
+    params["security_ids"] (update mode) limits the rebuild to those
+    securities; otherwise the table is truncated and rebuilt.
     """
     LOGGER.info(">>> ENTERED fundamentals_quarterly_canonical.run() <<<")
 
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
+    params = params or {}
+    security_ids = None
+    if params.get("mode") == "update":
+        security_ids = list(params.get("security_ids") or [])
 
+    with conn.cursor() as cur:
+
+        if security_ids is None:
             LOGGER.info("Truncating canonical quarterly fundamentals...")
             cur.execute(TRUNCATE_SQL)
+        else:
+            LOGGER.info("Deleting canonical rows for %d securities...", len(security_ids))
+            cur.execute(DELETE_SCOPED_SQL, {"security_ids": security_ids})
 
-            LOGGER.info("Inserting canonical quarterly fundamentals...")
-            cur.execute(INSERT_CANONICAL_SQL)
-            rows_inserted = cur.rowcount
+        LOGGER.info("Inserting canonical quarterly fundamentals...")
+        cur.execute(INSERT_CANONICAL_SQL, {"security_ids": security_ids})
+        rows_inserted = cur.rowcount
 
-            LOGGER.info("Rows inserted: %s", rows_inserted)
+        LOGGER.info("Rows inserted: %s", rows_inserted)
 
-        conn.commit()
+    conn.commit()
 
     LOGGER.info("Running canonical invariants...")
     run_sql_assertions(
+        conn,
         assertions=CANONICAL_ASSERTIONS,
         job_name="fundamentals_quarterly_canonical"
     )
 
     LOGGER.info("Canonical quarterly fundamentals rebuild complete.")
+
+    result = {"rows_upserted": rows_inserted}
+    if security_ids is not None:
+        result["delta"] = {"securities_rebuilt": len(security_ids), "rows": rows_inserted}
+        result["scope"] = {"security_ids": security_ids}
+    return result
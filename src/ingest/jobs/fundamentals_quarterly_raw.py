@@ -3,12 +3,15 @@ from __future__ import annotations
 import os
 import time
 import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from typing import Dict, List, Tuple
 from datetime import date
 
-import requests
-
+from common import api_call_count, iter_pages
 from src.ingest.logging import get_logger
+from src.ingest.profiling import phase
 
 logger = get_logger("fundamentals_quarterly_raw")
 
@@ -16,63 +19,157 @@ logger = get_logger("fundamentals_quarterly_raw")
 # -------------------------
 # Environment (LOCKED)
 # -------------------------
+# Resolved when the job runs, never at import: the runner imports only the
+# selected job, and a missing fundamentals env var must not break others.
+
+@dataclass(frozen=True)
+class FundamentalsConfig:
+    api_key: str
+    timeout_s: int
+    tickers: List[str]
+    start_fiscal_year: int
+    end_fiscal_year: int
+    start_fiscal_quarter: int
+    end_fiscal_quarter: int
+    base_url: str
+    endpoints: Dict[str, str]
+    # tickers per statements request (1 = one request per ticker)
+    ticker_batch: int = 25
+    # concurrent statement requests
+    workers: int = 4
+    page_limit: int = 1000
+
+
+def _required_int(name: str) -> int:
+    raw = os.getenv(name)
+    if not raw:
+        raise RuntimeError(f"{name} is required")
+    return int(raw)
+
+
+def load_config() -> FundamentalsConfig:
+    api_key = os.getenv("MASSIVE_API_KEY")
+    if not api_key:
+        raise RuntimeError("MASSIVE_API_KEY is required")
+
+    tickers = [t.strip().upper() for t in os.getenv("TICKERS", "").split(",") if t.strip()]
+    if not tickers:
+        raise RuntimeError("TICKERS must be specified")
+
+    base_url = os.getenv("MASSIVE_FINANCIALS_BASE_URL")
+    endpoints = {
+        "income": os.getenv("MASSIVE_INCOME_STATEMENTS_PATH"),
+        "balance": os.getenv("MASSIVE_BALANCE_SHEET_STATEMENTS_PATH"),
+        "cashflow": os.getenv("MASSIVE_CASH_FLOW_STATEMENTS_PATH"),
+    }
+    if not base_url or not all(endpoints.values()):
+        raise RuntimeError("Massive financial statement endpoints not fully configured in .env")
+
+    return FundamentalsConfig(
+        api_key=api_key,
+        timeout_s=int(os.getenv("MASSIVE_TIMEOUT_S", "30")),
+        tickers=tickers,
+        start_fiscal_year=_required_int("START_FISCAL_YEAR"),
+        end_fiscal_year=_required_int("END_FISCAL_YEAR"),
+        start_fiscal_quarter=int(os.getenv("START_FISCAL_QUARTER", "1")),
+        end_fiscal_quarter=int(os.getenv("END_FISCAL_QUARTER", "4")),
+        base_url=base_url,
+        endpoints=endpoints,
+        ticker_batch=max(1, int(os.getenv("FUNDAMENTALS_TICKER_BATCH", "25"))),
+        workers=max(1, int(os.getenv("FUNDAMENTALS_WORKERS", "4"))),
+        page_limit=int(os.getenv("FUNDAMENTALS_PAGE_LIMIT", "1000")),
+    )
 
-MASSIVE_API_KEY = os.getenv("MASSIVE_API_KEY")
-MASSIVE_TIMEOUT_S = int(os.getenv("MASSIVE_TIMEOUT_S", "30"))
-
-TICKERS = [t.strip().upper() for t in os.getenv("TICKERS", "").split(",") if t.strip()]
-
-START_FISCAL_YEAR = int(os.getenv("START_FISCAL_YEAR"))
-END_FISCAL_YEAR = int(os.getenv("END_FISCAL_YEAR"))
-
-START_FISCAL_QUARTER = int(os.getenv("START_FISCAL_QUARTER", "1"))
-END_FISCAL_QUARTER = int(os.getenv("END_FISCAL_QUARTER", "4"))
-
-if not MASSIVE_API_KEY:
-    raise RuntimeError("MASSIVE_API_KEY is required")
-
-if not TICKERS:
-    raise RuntimeError("TICKERS must be specified")
-
-BASE_URL = os.getenv("MASSIVE_FINANCIALS_BASE_URL")
 
-ENDPOINTS = {
-    "income": os.getenv("MASSIVE_INCOME_STATEMENTS_PATH"),
-    "balance": os.getenv("MASSIVE_BALANCE_SHEET_STATEMENTS_PATH"),
-    "cashflow": os.getenv("MASSIVE_CASH_FLOW_STATEMENTS_PATH"),
-}
+def _get_pages(cfg: FundamentalsConfig, endpoint: str, params: Dict) -> List[Dict]:
+    """
+    Every row of a statements query, following next_url, through the shared
+    retry/backoff policy (common.iter_pages).
+    """
+    out: List[Dict] = []
+    for payload in iter_pages(cfg.base_url + endpoint, params, cfg.api_key):
+        # Massive returns rows under "results"
+        results = payload.get("results", [])
+        if not isinstance(results, list):
+            raise RuntimeError(
+                f"Unexpected Massive payload shape for {endpoint}: keys={payload.keys()}"
+            )
+        out.extend(results)
+    return out
 
-if not BASE_URL or not all(ENDPOINTS.values()):
-    raise RuntimeError("Massive financial statement endpoints not fully configured in .env")
 
+def massive_get_batch(cfg: FundamentalsConfig, endpoint: str, tickers: List[str]) -> Dict[str, List[Dict]]:
+    """
+    Statements for several tickers in one paginated query, grouped by
+    ticker (a row may list several tickers).
+    """
+    params = {"limit": cfg.page_limit, "sort": "period_end.asc"}
+    if len(tickers) == 1:
+        params["tickers"] = tickers[0]
+    else:
+        params["tickers.any_of"] = ",".join(tickers)
 
+    wanted = set(tickers)
+    by_ticker: Dict[str, List[Dict]] = {t: [] for t in tickers}
+    for row in _get_pages(cfg, endpoint, params):
+        for t in row.get("tickers") or []:
+            t = t.upper()
+            if t in wanted:
+                by_ticker[t].append(row)
+    return by_ticker
 
-def massive_get(endpoint: str, ticker: str) -> List[Dict]:
-    url = BASE_URL + endpoint
-    params = {
-        "tickers": ticker,
-        "limit": 100,
-        "sort": "period_end.asc",
-        "apiKey": MASSIVE_API_KEY,
-    }
 
-    resp = requests.get(url, params=params, timeout=MASSIVE_TIMEOUT_S)
-    if resp.status_code != 200:
-        raise RuntimeError(
-            f"Massive {endpoint} failed for {ticker}: "
-            f"{resp.status_code} {resp.text}"
-        )
+def massive_get(cfg: FundamentalsConfig, endpoint: str, ticker: str) -> List[Dict]:
+    return massive_get_batch(cfg, endpoint, [ticker])[ticker]
 
-    payload = resp.json()
 
-    # Massive returns rows under "results"
-    results = payload.get("results", [])
-    if not isinstance(results, list):
-        raise RuntimeError(
-            f"Unexpected Massive payload shape for {endpoint}: keys={payload.keys()}"
-        )
+def fetch_statement_batches(cfg: FundamentalsConfig, batches: List[List[str]]):
+    """
+    Yield (batch, {statement: {ticker: rows}} or the exception) in batch
+    order. The three statements of each batch, and up to 2 x workers
+    batches ahead, are fetched concurrently on a shared pool; the caller
+    writes on its own thread. A failed multi-ticker batch is retried one
+    ticker at a time and yielded as single-ticker batches, so one bad
+    ticker fails only itself.
+    """
+    statements = list(cfg.endpoints)
+    ahead = 2 * cfg.workers
+    with ThreadPoolExecutor(max_workers=cfg.workers, thread_name_prefix="fundamentals") as pool:
+        pending: deque = deque()
+        it = iter(batches)
+
+        def submit(batch: List[str]) -> Dict:
+            return {s: pool.submit(massive_get_batch, cfg, cfg.endpoints[s], batch) for s in statements}
+
+        def results(futures: Dict):
+            try:
+                return {s: f.result() for s, f in futures.items()}
+            except Exception as e:
+                return e
+
+        def submit_next() -> bool:
+            batch = next(it, None)
+            if batch is None:
+                return False
+            pending.append((batch, submit(batch)))
+            return True
+
+        for _ in range(ahead):
+            if not submit_next():
+                break
+
+        while pending:
+            batch, futures = pending.popleft()
+            submit_next()
+            fetched = results(futures)
+            if not isinstance(fetched, Exception) or len(batch) == 1:
+                yield batch, fetched
+                continue
 
-    return results
+            logger.warning(f"{','.join(batch)}: batch failed, retrying one ticker at a time | {fetched}")
+            singles = [([t], submit([t])) for t in batch]
+            for single, single_futures in singles:
+                yield single, results(single_futures)
 
 
 
@@ -100,12 +197,12 @@ def quarter_key(row: Dict) -> Tuple[int, int]:
 
 
 
-def in_requested_range(fy: int, fq: int) -> bool:
-    if fy < START_FISCAL_YEAR or fy > END_FISCAL_YEAR:
+def in_requested_range(cfg: FundamentalsConfig, fy: int, fq: int) -> bool:
+    if fy < cfg.start_fiscal_year or fy > cfg.end_fiscal_year:
         return False
-    if fy == START_FISCAL_YEAR and fq < START_FISCAL_QUARTER:
+    if fy == cfg.start_fiscal_year and fq < cfg.start_fiscal_quarter:
         return False
-    if fy == END_FISCAL_YEAR and fq > END_FISCAL_QUARTER:
+    if fy == cfg.end_fiscal_year and fq > cfg.end_fiscal_quarter:
         return False
     return True
 
@@ -230,88 +327,179 @@ def upsert_row(conn, security_id: int, fy: int, fq: int, payload: Dict):
 # Job Entry
 # -------------------------
 
-def run(conn, job_id: int) -> Dict:
-    start = time.time()
+def write_ticker_quarters(conn, cfg: FundamentalsConfig, ticker: str, income: List[Dict]) -> int:
+    """
+    Upsert revenue / diluted_eps for one ticker. Caller commits.
+    """
+    # Resolve canonical identity
+    composite_figi = resolve_composite_figi(conn, ticker)
 
-    metrics = {
-        "job_id": job_id,
-        "tickers_total": len(TICKERS),
-        "tickers_ok": 0,
-        "tickers_failed": 0,
-        "rows_upserted": 0,   # runner expects this
-        "api_calls": 0,       # runner expects this
-        "seconds": 0,
-    }
+    rows_written_for_ticker = 0
 
-    logger.info(
-        f"Starting fundamentals_quarterly_raw | "
-        f"FY {START_FISCAL_YEAR}Q{START_FISCAL_QUARTER} "
-        f"→ FY {END_FISCAL_YEAR}Q{END_FISCAL_QUARTER}"
-    )
+    # Phase 4B: use INCOME as the quarter spine
+    for row in income:
+        fy = row.get("fiscal_year")
+        fq = row.get("fiscal_quarter")
 
-    for ticker in TICKERS:
-        try:
-            logger.info(f"{ticker}: fetching income/balance/cashflow")
+        if fy is None or fq is None:
+            continue
 
-            income = massive_get(ENDPOINTS["income"], ticker)
-            metrics["api_calls"] += 1
+        if not in_requested_range(cfg, int(fy), int(fq)):
+            continue
 
-            balance = massive_get(ENDPOINTS["balance"], ticker)
-            metrics["api_calls"] += 1
+        fiscal_period = fiscal_period_from_row(row)
+        report_date = row.get("period_end")
 
-            cashflow = massive_get(ENDPOINTS["cashflow"], ticker)
-            metrics["api_calls"] += 1
+        metrics_to_store = {
+            "revenue": row.get("revenue"),
+            "diluted_eps": row.get("diluted_earnings_per_share"),
+        }
 
-            # Resolve canonical identity
-            composite_figi = resolve_composite_figi(conn, ticker)
+        insert_metrics(
+            conn,
+            composite_figi=composite_figi,
+            fiscal_period=fiscal_period,
+            report_date=report_date,
+            metrics=metrics_to_store,
+            raw_payload=row,
+        )
 
-            rows_written_for_ticker = 0
+        rows_written_for_ticker += sum(
+            1 for v in metrics_to_store.values() if v is not None
+        )
 
-            # Phase 4B: use INCOME as the quarter spine
-            for row in income:
-                fy = row.get("fiscal_year")
-                fq = row.get("fiscal_quarter")
+    return rows_written_for_ticker
 
-                if fy is None or fq is None:
-                    continue
 
-                if not in_requested_range(int(fy), int(fq)):
-                    continue
+def fetch_filed_since(cfg: FundamentalsConfig, endpoint: str, since: str) -> Dict[str, List[Dict]]:
+    """
+    Market-wide statements filed on/after `since`, grouped by ticker.
+    One paginated call chain instead of one call per ticker.
+    """
+    url = cfg.base_url + endpoint
+    params = {"filing_date.gte": since, "limit": 1000, "sort": "period_end.asc"}
+    by_ticker: Dict[str, List[Dict]] = {}
+    for j in iter_pages(url, params, cfg.api_key):
+        for row in j.get("results") or []:
+            for t in row.get("tickers") or []:
+                by_ticker.setdefault(t.upper(), []).append(row)
+    return by_ticker
+
+
+def _run_update(conn, cfg: FundamentalsConfig, since: str, metrics: Dict) -> Dict:
+    calls0 = api_call_count()
+    with phase("fetch"):
+        filed = fetch_filed_since(cfg, cfg.endpoints["income"], since)
+    metrics["api_calls"] += api_call_count() - calls0
+
+    changed = [t for t in cfg.tickers if t in filed]
+    security_ids = []
+
+    for ticker in changed:
+        try:
+            n = write_ticker_quarters(conn, cfg, ticker, filed[ticker])
+            security_ids.append(resolve_security_id(conn, ticker))
+            conn.commit()
+            metrics["rows_upserted"] += n
+            metrics["tickers_ok"] += 1
+            logger.info(f"{ticker}: upserted {n} metric rows")
+        except Exception as e:
+            conn.rollback()
+            metrics["tickers_failed"] += 1
+            logger.error(f"{ticker}: FAILED | {e}")
 
-                fiscal_period = fiscal_period_from_row(row)
-                report_date = row.get("period_end")
+    metrics["delta"] = {
+        "since": since,
+        "tickers_with_filings": len(changed),
+        "tickers_unchanged": len(cfg.tickers) - len(changed),
+        "metric_rows": metrics["rows_upserted"],
+    }
+    metrics["scope"] = {"security_ids": sorted(set(security_ids))}
+    return metrics
 
-                metrics_to_store = {
-                    "revenue": row.get("revenue"),
-                    "diluted_eps": row.get("diluted_earnings_per_share"),
-                }
 
-                insert_metrics(
-                    conn,
-                    composite_figi=composite_figi,
-                    fiscal_period=fiscal_period,
-                    report_date=report_date,
-                    metrics=metrics_to_store,
-                    raw_payload=row,
-                )
+def run(conn, job_id: int, params: Dict = None) -> Dict:
+    """
+    params:
+      mode = "full"   : every statement for every ticker (default)
+      mode = "update" : only statements filed on/after params["since"]
+                        (market-wide query, filtered to TICKERS)
+    """
+    params = params or {}
+    start = time.time()
+    cfg = load_config()
 
-                rows_written_for_ticker += sum(
-                    1 for v in metrics_to_store.values() if v is not None
-                )
+    metrics = {
+        "job_id": job_id,
+        "tickers_total": len(cfg.tickers),
+        "tickers_ok": 0,
+        "tickers_failed": 0,
+        "rows_upserted": 0,   # runner expects this
+        "api_calls": 0,       # runner expects this
+        "seconds": 0,
+    }
 
-            conn.commit()
+    logger.info(
+        f"Starting fundamentals_quarterly_raw | "
+        f"FY {cfg.start_fiscal_year}Q{cfg.start_fiscal_quarter} "
+        f"→ FY {cfg.end_fiscal_year}Q{cfg.end_fiscal_quarter}"
+    )
 
-            metrics["rows_upserted"] += rows_written_for_ticker
-            metrics["tickers_ok"] += 1
+    if params.get("mode") == "update" and params.get("since"):
+        _run_update(conn, cfg, params["since"][:10], metrics)
+        metrics["seconds"] = round(time.time() - start, 2)
+        return metrics
 
-            logger.info(
-                f"{ticker}: upserted {rows_written_for_ticker} metric rows"
-            )
+    calls0 = api_call_count()
+    batches = [cfg.tickers[i:i + cfg.ticker_batch] for i in range(0, len(cfg.tickers), cfg.ticker_batch)]
+    logger.info(
+        f"Fetching income/balance/cashflow for {len(cfg.tickers)} tickers in "
+        f"{len(batches)} batches of up to {cfg.ticker_batch}, {cfg.workers} concurrent requests"
+    )
 
-        except Exception as e:
-            conn.rollback()
-            metrics["tickers_failed"] += 1
-            logger.error(f"{ticker}: FAILED | {e}")
+    security_ids = []
+    fetched = fetch_statement_batches(cfg, batches)
+    while True:
+        # time spent waiting on fetches, net of the writes
+        with phase("fetch"):
+            item = next(fetched, None)
+        if item is None:
+            break
+        batch, statements = item
+
+        if isinstance(statements, Exception):
+            metrics["tickers_failed"] += len(batch)
+            logger.error(f"{','.join(batch)}: FAILED | {statements}")
+            continue
+
+        for ticker in batch:
+            try:
+                rows_written_for_ticker = write_ticker_quarters(conn, cfg, ticker, statements["income"][ticker])
+                security_ids.append(resolve_security_id(conn, ticker))
+
+                conn.commit()
+
+                metrics["rows_upserted"] += rows_written_for_ticker
+                metrics["tickers_ok"] += 1
+
+                logger.info(
+                    f"{ticker}: upserted {rows_written_for_ticker} metric rows"
+                )
 
+            except Exception as e:
+                conn.rollback()
+                metrics["tickers_failed"] += 1
+                logger.error(f"{ticker}: FAILED | {e}")
+
+    metrics["api_calls"] = api_call_count() - calls0
+    # the update chain's first run takes this path; canonical and the raw
+    # validation gate need the written slice as on an update run
+    metrics["delta"] = {
+        "since": None,
+        "tickers_written": metrics["tickers_ok"],
+        "tickers_failed": metrics["tickers_failed"],
+        "metric_rows": metrics["rows_upserted"],
+    }
+    metrics["scope"] = {"security_ids": sorted(set(security_ids))}
     metrics["seconds"] = round(time.time() - start, 2)
-    return metrics
\ No newline at end of file
+    return metrics
@@ -1,17 +1,25 @@
 from __future__ import annotations
 
+import io
 import os
 import json
+import time
 from pathlib import Path
-from datetime import date
-from typing import Any, Dict, List
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
 
 from src.ingest.universe import load_tickers
+from src.ingest.profiling import phase
+from src.ingest.tracking import record_rejects, record_symbol_state
+from src.ingest.validate.bar_checks import check_bars, checks_mode
+from src.ingest.gap_planner import plan_gaps
+from src.ingest.trading_calendar import sessions
+from src.ingest.workunits import WorkUnit, date_windows, run_ordered
+from src.providers.massive.bars import NULL_PRICE, PRICE_SCALE, STAGE_DDL, BarBatch
 
 import psycopg2
-from psycopg2.extras import execute_batch
 
-from common import getenv, requests_get_json, iso_years_ago, iso_today
+from common import api_call_count, getenv, iter_pages, requests_get_json, iso_years_ago, iso_today
 import logging
 
 logger = logging.getLogger(__name__)
@@ -27,11 +35,13 @@ Writes:
   - prices_daily
 """
 
-BASE_URL = "https://api.massive.com"
+BASE_URL = os.getenv("MASSIVE_BASE_URL", "https://api.massive.com")
 SCHEMA = os.getenv("STOCKS_SCHEMA", "stocks_research")
-YEARS = int(os.getenv("YEARS", "5"))
+
+JOB_NAME = "prices_daily"
 
 AGGS_PATH = "/v2/aggs/ticker/{ticker}/range/1/day/{from_date}/{to_date}"
+GROUPED_PATH = "/v2/aggs/grouped/locale/us/market/stocks/{date}"
 
 
 def security_id_for_ticker(cur, ticker: str) -> int:
@@ -49,54 +59,185 @@ def security_id_for_ticker(cur, ticker: str) -> int:
     return int(r[0])
 
 
-def fetch_daily_bars(api_key: str, ticker: str, from_date: str, to_date: str) -> List[Dict[str, Any]]:
+def fetch_daily_bars(api_key: str, ticker: str, from_date: str, to_date: str, stats: Optional[Dict[str, int]] = None) -> BarBatch:
+    """
+    stats, when given, counts the pages fetched under "pages" (per-unit
+    call counts when several units fetch concurrently).
+    """
     url = BASE_URL + AGGS_PATH.format(ticker=ticker, from_date=from_date, to_date=to_date)
     params = {"adjusted": "false", "sort": "asc", "limit": 50000}  # raw/unadjusted
-    out: List[Dict[str, Any]] = []
 
-    while True:
-        j = requests_get_json(url, params=params, api_key=api_key)
-        out.extend(j.get("results") or [])
-        next_url = j.get("next_url")
-        if not next_url:
-            break
-        url = next_url
-        params = {}
-    return out
+    # each page becomes columns as it arrives; result dicts are not kept
+    batches = []
+    for j in iter_pages(url, params, api_key):
+        batches.append(BarBatch.from_results(j.get("results") or []))
+        if stats is not None:
+            stats["pages"] = stats.get("pages", 0) + 1
+    return BarBatch.concat(batches)
+
+
+UPSERT_FROM_STAGE_SQL = f"""
+INSERT INTO {SCHEMA}.prices_daily (security_id, trade_date, open, high, low, close, volume)
+SELECT
+  %(sid)s,
+  trade_date,
+  NULLIF(open_u,  %(null)s) / %(scale)s::numeric,
+  NULLIF(high_u,  %(null)s) / %(scale)s::numeric,
+  NULLIF(low_u,   %(null)s) / %(scale)s::numeric,
+  NULLIF(close_u, %(null)s) / %(scale)s::numeric,
+  volume
+FROM _prices_daily_stage
+ON CONFLICT (security_id, trade_date) DO UPDATE SET
+  open=EXCLUDED.open,
+  high=EXCLUDED.high,
+  low=EXCLUDED.low,
+  close=EXCLUDED.close,
+  volume=EXCLUDED.volume;
+"""
 
 
-def upsert_prices(conn, ticker: str, bars: List[Dict[str, Any]]) -> int:
-    if not bars:
+def upsert_prices(conn, ticker: str, bars: BarBatch) -> int:
+    """
+    Binary COPY of the batch into a session staging table, then one
+    upsert from it.
+    """
+    if not len(bars):
         return 0
 
+    with conn.cursor() as cur:
+        sid = security_id_for_ticker(cur, ticker)
+        cur.execute(STAGE_DDL)
+        cur.copy_expert("COPY _prices_daily_stage FROM STDIN WITH (FORMAT binary)", io.BytesIO(bars.copy_payload()))
+        cur.execute(UPSERT_FROM_STAGE_SQL, {"sid": sid, "null": int(NULL_PRICE), "scale": PRICE_SCALE})
+
+    conn.commit()
+    return len(bars)
+
+
+def latest_trade_dates(conn, tickers: List[str]) -> Dict[str, Any]:
+    """
+    ticker -> (security_id, latest trade_date or None), resolved in one query.
+    """
     sql = f"""
-    INSERT INTO {SCHEMA}.prices_daily (security_id, trade_date, open, high, low, close, volume)
-    VALUES (%s, %s, %s, %s, %s, %s, %s)
-    ON CONFLICT (security_id, trade_date) DO UPDATE SET
-      open=EXCLUDED.open,
-      high=EXCLUDED.high,
-      low=EXCLUDED.low,
-      close=EXCLUDED.close,
-      volume=EXCLUDED.volume;
+    SELECT DISTINCT ON (th.ticker) th.ticker, th.security_id, p.max_date
+    FROM {SCHEMA}.ticker_history th
+    LEFT JOIN LATERAL (
+        SELECT MAX(trade_date) AS max_date
+        FROM {SCHEMA}.prices_daily
+        WHERE security_id = th.security_id
+    ) p ON TRUE
+    WHERE th.ticker = ANY(%s)
+    ORDER BY th.ticker, th.start_date DESC;
     """
+    with conn.cursor() as cur:
+        cur.execute(sql, (tickers,))
+        return {t: (int(sid), max_date) for t, sid, max_date in cur.fetchall()}
 
+
+def latest_closes(conn, latest: Dict[str, Any]) -> Dict[str, float]:
+    """
+    ticker -> close on its latest stored trade_date, for latest_trade_dates()
+    output.
+    """
+    keys = {t: (sid, d) for t, (sid, d) in latest.items() if d is not None}
+    if not keys:
+        return {}
+    sql = f"""
+    SELECT p.security_id, p.close
+    FROM {SCHEMA}.prices_daily p
+    JOIN unnest(%s::bigint[], %s::date[]) AS k(security_id, trade_date)
+      USING (security_id, trade_date)
+    """
     with conn.cursor() as cur:
-        sid = security_id_for_ticker(cur, ticker)
+        cur.execute(sql, ([sid for sid, _ in keys.values()], [d for _, d in keys.values()]))
+        by_sid = {int(sid): float(close) for sid, close in cur.fetchall() if close is not None}
+    return {t: by_sid[sid] for t, (sid, _) in keys.items() if sid in by_sid}
 
-        rows = []
-        for b in bars:
-            ts_ms = int(b["t"])
-            d = date.fromtimestamp(ts_ms / 1000).isoformat()
-            rows.append((sid, d, b.get("o"), b.get("h"), b.get("l"), b.get("c"), int(b.get("v") or 0)))
 
-        execute_batch(cur, sql, rows, page_size=5000)
+def _reject_rows(ticker: str, issues) -> List[tuple]:
+    rows = []
+    for b, reason, severity in issues:
+        try:
+            key_date = datetime.fromtimestamp(int(b["t"]) / 1000, tz=timezone.utc).date().isoformat()
+        except (KeyError, TypeError, ValueError):
+            key_date = None
+        rows.append((ticker, key_date, reason, severity, b))
+    return rows
+
+
+def fetch_grouped_daily(api_key: str, trade_date: str) -> List[Dict[str, Any]]:
+    """
+    All US stock bars for one date in a single call (raw/unadjusted).
+    Non-trading days return no results.
+    """
+    url = BASE_URL + GROUPED_PATH.format(date=trade_date)
+    j = requests_get_json(url, params={"adjusted": "false"}, api_key=api_key)
+    return j.get("results") or []
 
+
+def _fetch_update_grouped(api_key: str, from_dates: Dict[str, date], to_date: date) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Fetch the delta for many nearly-current tickers with one grouped call per
+    missing session (holidays skipped) instead of one aggregates call per
+    ticker.
+    """
+    out: Dict[str, List[Dict[str, Any]]] = {t: [] for t in from_dates}
+    for d in sessions(min(from_dates.values()), to_date):
+        with phase("fetch"):
+            rows = fetch_grouped_daily(api_key, d.isoformat())
+        for b in rows:
+            t = b.get("T")
+            if t in out and d >= from_dates[t]:
+                out[t].append(b)
+    return out
+
+
+def _record_ticker(conn, ticker: str, acc: Dict[str, Any], backfill: Optional[Dict[str, Any]] = None):
+    checkpoint = {
+        "bars": acc["bars"],
+        "api_calls": acc["api_calls"],
+        "seconds": round(acc["seconds"], 3),
+    }
+    if acc["rejected"] or acc["warned"]:
+        checkpoint["bars_rejected"] = acc["rejected"]
+        checkpoint["bars_warned"] = acc["warned"]
+    if acc["last_trade_date"]:
+        checkpoint["last_trade_date"] = acc["last_trade_date"].isoformat()
+    if backfill is not None:
+        checkpoint["backfill"] = backfill
+    status = "error" if acc["failed"] else "ok"
+    error = f"windows failed: {','.join(acc['failed'])}" if status == "error" else None
+    record_symbol_state(conn, JOB_NAME, ticker, status, checkpoint, error)
     conn.commit()
-    return len(bars)
 
 
-def _run_prices_daily(conn):
+def backfill_checkpoints(conn, tickers: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    ticker -> checkpoint_json.backfill of its last full range-mode run.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT symbol, checkpoint_json -> 'backfill'
+            FROM ingestion.symbol_ingestion_state
+            WHERE job_name = %s AND symbol = ANY(%s) AND checkpoint_json ? 'backfill'
+            """,
+            (JOB_NAME, tickers),
+        )
+        return {t: b for t, b in cur.fetchall()}
+
+
+def _last_close(bars: BarBatch) -> Optional[float]:
+    if not len(bars):
+        return None
+    c = bars.close[int(bars.t.argmax())]
+    return None if c == NULL_PRICE else float(c) / PRICE_SCALE
+
+
+def _run_prices_daily(conn, params: Dict[str, Any], job_id=None):
     api_key = getenv("MASSIVE_API_KEY")
+    mode = params.get("mode", "full")
+    bar_checks = checks_mode()
 
     tickers = load_tickers()
     logger.info(
@@ -107,30 +248,220 @@ def _run_prices_daily(conn):
         "tickers": tickers,
     },
 )
-    from_date = iso_years_ago(YEARS)
-    to_date = iso_today()
+    years = int(os.getenv("YEARS", "5"))
+    history_from = date.fromisoformat(params.get("start_date") or iso_years_ago(years))
+    to_date = date.fromisoformat(params.get("end_date") or iso_today())
+    window = os.getenv("PRICES_WINDOW", "year").lower()
+    workers = int(os.getenv("PRICES_WORKERS", "4"))
+    calls0 = api_call_count()
+
+    # ticker -> first date to fetch
+    from_dates: Dict[str, date] = {t: history_from for t in tickers}
+    touched: List[int] = []
+    up_to_date = 0
+    grouped: Dict[str, List[Dict[str, Any]]] = {}
+    prev_closes: Dict[str, float] = {}
+
+    if mode == "update":
+        latest = latest_trade_dates(conn, tickers)
+        if bar_checks != "off":
+            prev_closes = latest_closes(conn, latest)
+        for t in tickers:
+            max_date = latest.get(t, (None, None))[1]
+            if max_date is not None:
+                from_dates[t] = max(history_from, max_date + timedelta(days=1))
+        up_to_date = sum(1 for d in from_dates.values() if d > to_date)
+        from_dates = {t: d for t, d in from_dates.items() if d <= to_date}
+
+        grouped_max_days = int(os.getenv("PRICES_GROUPED_MAX_DAYS", "5"))
+        near = {t: d for t, d in from_dates.items() if (to_date - d).days < grouped_max_days}
+        if near:
+            grouped = _fetch_update_grouped(api_key, near, to_date)
+
+    # Work units: one date window of one ticker. Full range backfills are
+    # checkpointed per window under symbol_ingestion_state.checkpoint_json
+    # .backfill (update and gap runs leave it alone); PRICES_RESUME=1
+    # continues each ticker's checkpointed range, skipping the windows it
+    # already wrote. Without explicit dates the stored range is reused as is,
+    # so a backfill interrupted on an earlier day resumes rather than
+    # restarting against today's range.
+    #
+    # PRICES_FILL=gaps (full mode) fetches only the sessions the trading
+    # calendar says are missing (gap_planner.py) instead of whole ranges.
+    fill = os.getenv("PRICES_FILL", "range").lower() if mode == "full" else "range"
+    checkpointed = mode == "full" and fill == "range"
+    range_key = f"{history_from.isoformat()}..{to_date.isoformat()}"
+    explicit_range = bool(params.get("start_date") or params.get("end_date"))
+    resume = checkpointed and os.getenv("PRICES_RESUME", "0") == "1"
+    previous = backfill_checkpoints(conn, list(from_dates)) if resume else {}
+    if fill == "gaps":
+        with conn.cursor() as cur:
+            gaps = plan_gaps(cur, list(from_dates), history_from, to_date)
+        ranges = {t: [(g.start, g.end) for g in gaps.get(t, [])] for t in from_dates}
+        logger.info(f"Gap fill: {len(gaps)} of {len(from_dates)} tickers have gaps, {sum(map(len, gaps.values()))} ranges")
+    else:
+        ranges = {t: [(start, to_date)] for t, start in from_dates.items()}
+
+    backfills: Dict[str, Dict[str, Any]] = {}
+    units: List[WorkUnit] = []
+    for t, start in from_dates.items():
+        if t in grouped:
+            units.append(WorkUnit(t, start, to_date))
+            continue
+        spans = ranges[t]
+        done: List[str] = []
+        if checkpointed:
+            key = range_key
+            prev = previous.get(t)
+            if prev and prev.get("window") == window and (prev.get("range") == range_key or not explicit_range):
+                key = prev["range"]
+                lo, hi = (date.fromisoformat(d) for d in key.split(".."))
+                spans = [(lo, hi)]
+                done = list(prev.get("done") or [])
+            backfills[t] = {"range": key, "window": window, "done": done, "failed": []}
+        units += [
+            u
+            for r_lo, r_hi in spans
+            for u in (WorkUnit(t, lo, hi) for lo, hi in date_windows(r_lo, r_hi, window))
+            if u.key not in done
+        ]
+
+    def fetch_unit(u: WorkUnit):
+        t0 = time.perf_counter()
+        if u.symbol in grouped:
+            return BarBatch.from_results(grouped[u.symbol]), 0, 0.0
+        stats: Dict[str, int] = {}
+        bars = fetch_daily_bars(api_key, u.symbol, u.start.isoformat(), u.end.isoformat(), stats)
+        return bars, stats.get("pages", 0), time.perf_counter() - t0
 
     total = 0
-    for i, t in enumerate(tickers, 1):
-        bars = fetch_daily_bars(api_key, t, from_date, to_date)
-        n = upsert_prices(conn, t, bars)
-        total += n
-        print(f"{i:>2}/{len(tickers)} {t}: {n} daily bars inserted/updated")
+    total_rejected = 0
+    windows_failed = 0
+    n_tickers = len(from_dates)
+    done_tickers = 0
+    acc: Optional[Dict[str, Any]] = None
+
+    def finish_ticker(acc):
+        nonlocal total, total_rejected, done_tickers
+        t = acc["ticker"]
+        _record_ticker(conn, t, acc, backfills.get(t))
+        if acc["bars"]:
+            touched.append(t)
+        total += acc["bars"]
+        total_rejected += acc["rejected"]
+        done_tickers += 1
+        suffix = f" ({acc['rejected']} quarantined, {acc['warned']} flagged)" if acc["rejected"] or acc["warned"] else ""
+        if acc["failed"]:
+            suffix += f" [{len(acc['failed'])} windows FAILED]"
+        print(f"{done_tickers:>2}/{n_tickers} {t}: {acc['bars']} daily bars inserted/updated{suffix}")
+
+    fetched = run_ordered(fetch_unit, units, workers, retries=int(os.getenv("PRICES_WINDOW_RETRIES", "2")))
+    while True:
+        # time spent waiting on fetches, net of validation and writes
+        with phase("fetch"):
+            item = next(fetched, None)
+        if item is None:
+            break
+        u, out = item
+        t = u.symbol
+        if acc is None or acc["ticker"] != t:
+            if acc is not None:
+                finish_ticker(acc)
+            acc = {
+                "ticker": t, "bars": 0, "rejected": 0, "warned": 0, "api_calls": 0, "seconds": 0.0, "failed": [],
+                "last_trade_date": None, "prev_close": prev_closes.get(t),
+            }
+
+        backfill = backfills.get(t)
+        if isinstance(out, Exception):
+            windows_failed += 1
+            acc["failed"].append(u.key)
+            if backfill is not None:
+                backfill["failed"].append(u.key)
+            acc["prev_close"] = None  # the spike check has no continuity across the gap
+            logger.error(f"{t} {u.key}: FAILED | {out}")
+            continue
+
+        bars, calls, fetch_s = out
+        t0 = time.perf_counter()
+        with phase("validate"):
+            checked = check_bars(bars, prev_close=acc["prev_close"], mode=bar_checks)
+        with phase("upsert"):
+            n = upsert_prices(conn, t, checked.keep)
+            record_rejects(conn, JOB_NAME, job_id, "prices_daily", _reject_rows(t, checked.issues))
+        if backfill is not None:
+            backfill["done"].append(u.key)
+            # window-level checkpoint; the per-ticker totals follow in finish_ticker
+            record_symbol_state(conn, JOB_NAME, t, "ok", {"backfill": backfill})
+            conn.commit()
+
+        acc["bars"] += n
+        acc["rejected"] += checked.rejected
+        acc["warned"] += checked.warned
+        acc["api_calls"] += calls
+        acc["seconds"] += fetch_s + time.perf_counter() - t0
+        acc["last_trade_date"] = checked.keep.last_trade_date() or acc["last_trade_date"]
+        acc["prev_close"] = _last_close(checked.keep) or acc["prev_close"]
+    if acc is not None:
+        finish_ticker(acc)
 
     print(f"Done. Total bars inserted/updated: {total}")
+    if windows_failed:
+        hint = "rerun with PRICES_RESUME=1 to fetch only the missing windows" if backfills else "rerun the update"
+        raise RuntimeError(
+            f"{windows_failed} date windows failed after retries (see symbol_ingestion_state); {hint}"
+        )
 
-    return {
+    result = {
         "rows_upserted": total,
-        "symbols_processed": len(tickers),
+        "rows_rejected": total_rejected,
+        "symbols_processed": len(from_dates),
+        "symbols_skipped": n_tickers - done_tickers,  # resumed or already complete
+        "work_units": len(units),
+        "api_calls": api_call_count() - calls0,
     }
+    if mode == "update":
+        latest = latest_trade_dates(conn, touched) if touched else {}
+        result["delta"] = {
+            "symbols_up_to_date": up_to_date,
+            "symbols_grouped": len(grouped),
+            "symbols_per_ticker": len(from_dates) - len(grouped),
+            "symbols_with_new_bars": len(touched),
+            "bars": total,
+            "bars_rejected": total_rejected,
+        }
+        result["scope"] = {
+            "security_ids": sorted(sid for sid, _ in latest.values()),
+            "start_date": min(from_dates.values()).isoformat() if from_dates else None,
+            "end_date": to_date.isoformat(),
+        }
+    return result
 
 
-def run(conn, job_id=None):
+def run(conn, job_id=None, params=None):
     """
     Phase-3 ingestion entrypoint.
     The runner owns the DB connection.
+
+    params:
+      mode = "full"   : YEARS of history for every ticker (default)
+      mode = "update" : only bars after each security's latest trade_date;
+                        tickers fewer than PRICES_GROUPED_MAX_DAYS behind are
+                        served from the grouped-daily endpoint
+      start_date / end_date : explicit range (default YEARS back .. today)
+
+    Each ticker's range is split into PRICES_WINDOW windows (year, quarter,
+    month or none), fetched on PRICES_WORKERS threads and written in order.
+    A window is retried PRICES_WINDOW_RETRIES times. Full runs checkpoint
+    every written window; PRICES_RESUME=1 continues each ticker's
+    checkpointed range (the stored one unless start/end are given), skipping
+    windows already written. PRICES_FILL=gaps (full mode) fetches only the ranges
+    where the trading calendar expects bars that are not stored.
+
+    Every fetched batch passes through validate/bar_checks.py before it is
+    written (BAR_CHECKS_MODE).
     """
-    return _run_prices_daily(conn)
+    return _run_prices_daily(conn, params or {}, job_id)
 
 
 if __name__ == "__main__":
@@ -138,7 +469,7 @@ if __name__ == "__main__":
     conn = psycopg2.connect(dsn)
     conn.autocommit = False
     try:
-        _run_prices_daily(conn)
+        _run_prices_daily(conn, {})
     finally:
         conn.close()
 
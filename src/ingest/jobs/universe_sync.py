@@ -0,0 +1,465 @@
+"""
+Phase: 6
+Job: universe_sync
+Requires:
+  - companies
+  - securities
+  - ticker_history
+  - ingestion.universe_fingerprints, ingestion.universe_changes
+    (sql/admin/040_universe_sync.sql)
+Writes:
+  - companies, securities, ticker_history (changes only)
+  - universes / universe_members (new snapshot when membership changed)
+  - ingestion.universe_changes
+
+Diffs the provider universe (universe_builder: all tickers, Phase 6 rules)
+against the active ticker_history rows. Delistings are detected against
+every listed ticker, before the rules: a ticker the rules exclude still
+trades, so its history stays open. Tickers whose attribute
+fingerprint (composite_figi, primary_exchange, type, name) matches the
+last sync and that are still active are skipped without comparison.
+
+Change types:
+  listing        new ticker, unknown composite_figi -> company, security, ticker row
+  relisting      new ticker, known composite_figi without an active ticker
+  ticker_change  new ticker whose composite_figi's active ticker disappeared
+  exchange_move  same ticker and security, new primary exchange
+  figi_change    ticker now points at a different composite_figi
+  delisting      active ticker no longer listed by the provider
+  excluded       active ticker still listed but excluded by the rules;
+                 recorded once, its ticker_history row stays open
+
+Closed rows get end_date = yesterday (never before their start_date); new
+rows start today. Securities without an active ticker are marked inactive.
+
+Only runs with UNIVERSE_MODE=all; other modes have a hand-picked universe.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from collections import Counter, namedtuple
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import psycopg2
+from psycopg2.extras import Json, execute_values
+
+from common import api_call_count, getenv
+
+from ..universe import invalidate_snapshot_cache
+from ..universe_builder import (
+    DEFAULT_UNIVERSE_NAME,
+    apply_rules,
+    classify,
+    fetch_all_tickers,
+    latest_universe_id,
+    write_snapshot,
+)
+
+SCHEMA = os.getenv("STOCKS_SCHEMA", "stocks_research")
+
+JOB_NAME = "universe_sync"
+
+FINGERPRINT_FIELDS = ("composite_figi", "primary_exchange", "type", "name")
+
+# Changes after which the ticker's history should be fetched in full
+FULL_HISTORY_CHANGES = {"listing", "relisting", "ticker_change", "figi_change"}
+
+ActiveTicker = namedtuple("ActiveTicker", "security_id composite_figi exchange start_date")
+
+
+@dataclass
+class Change:
+    change_type: str
+    ticker: str
+    # security the ticker belongs to afterwards; None = to be created
+    security_id: Optional[int]
+    # closed ticker_history row: security_id, ticker, exchange, start_date
+    old: Optional[Dict[str, Any]]
+    # new ticker_history row attributes: composite_figi, exchange, name
+    new: Optional[Dict[str, Any]]
+
+
+def _exchange(row: Dict[str, Any]) -> str:
+    return row.get("primary_exchange") or "UNKNOWN"
+
+
+def fingerprint(row: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+    attrs = {k: row.get(k) for k in FINGERPRINT_FIELDS}
+    return attrs, hashlib.sha1(json.dumps(attrs, sort_keys=True).encode()).hexdigest()
+
+
+# ----------------------------
+# Current state
+# ----------------------------
+
+def load_state(cur):
+    """
+    (fingerprint hashes by ticker, active tickers, security_id by composite_figi)
+    """
+    cur.execute("SELECT ticker, attrs_hash FROM ingestion.universe_fingerprints")
+    hashes = dict(cur.fetchall())
+
+    cur.execute(
+        f"""
+        SELECT DISTINCT ON (th.ticker)
+            th.ticker, th.security_id, s.composite_figi, th.exchange, th.start_date
+        FROM {SCHEMA}.ticker_history th
+        JOIN {SCHEMA}.securities s ON s.security_id = th.security_id
+        WHERE th.end_date IS NULL
+        ORDER BY th.ticker, th.start_date DESC
+        """
+    )
+    active = {r[0]: ActiveTicker(*r[1:]) for r in cur.fetchall()}
+
+    cur.execute(
+        f"""
+        SELECT DISTINCT ON (composite_figi) composite_figi, security_id
+        FROM {SCHEMA}.securities
+        ORDER BY composite_figi, security_id
+        """
+    )
+    figis = dict(cur.fetchall())
+    return hashes, active, figis
+
+
+def load_excluded(cur) -> set:
+    """
+    Tickers whose latest recorded change is a rule exclusion.
+    """
+    cur.execute(
+        """
+        SELECT ticker FROM (
+            SELECT DISTINCT ON (ticker) ticker, change_type
+            FROM ingestion.universe_changes
+            ORDER BY ticker, detected_at DESC, change_id DESC
+        ) last
+        WHERE change_type = 'excluded'
+        """
+    )
+    return {r[0] for r in cur.fetchall()}
+
+
+# ----------------------------
+# Diff
+# ----------------------------
+
+def _old(ticker: str, a: ActiveTicker) -> Dict[str, Any]:
+    return {
+        "security_id": a.security_id,
+        "ticker": ticker,
+        "composite_figi": a.composite_figi,
+        "exchange": a.exchange,
+        "start_date": a.start_date.isoformat(),
+    }
+
+
+def diff_universe(
+    provider: Dict[str, Dict[str, Any]],
+    listed: Dict[str, Dict[str, Any]],
+    hashes: Dict[str, str],
+    active: Dict[str, ActiveTicker],
+    figis: Dict[str, int],
+    excluded: Optional[set] = None,
+) -> Tuple[List[Change], Counter]:
+    """
+    provider is the rule-filtered universe, listed every ticker the
+    provider lists (before the rules), excluded the tickers whose
+    exclusion is already recorded.
+    """
+    changes: List[Change] = []
+    skipped: Counter = Counter()
+    excluded = excluded or set()
+
+    # Active tickers no longer listed, by figi: ticker-change candidates
+    vanished: Dict[str, List[str]] = {}
+    for t, a in sorted(active.items()):
+        if t not in listed:
+            vanished.setdefault(a.composite_figi, []).append(t)
+    consumed = set()
+
+    for t in sorted(provider):
+        row = provider[t]
+        a = active.get(t)
+        if a is not None and hashes.get(t) == fingerprint(row)[1]:
+            skipped["unchanged"] += 1
+            continue
+
+        figi = row.get("composite_figi")
+        if not figi:
+            skipped["no_composite_figi"] += 1
+            continue
+        new = {"composite_figi": figi, "exchange": _exchange(row), "name": row.get("name") or t}
+
+        if a is not None:
+            if a.composite_figi != figi:
+                changes.append(Change("figi_change", t, figis.get(figi), _old(t, a), new))
+            elif a.exchange != new["exchange"]:
+                changes.append(Change("exchange_move", t, a.security_id, _old(t, a), new))
+            else:
+                skipped["attributes_only"] += 1
+            continue
+
+        predecessors = [o for o in vanished.get(figi, []) if o not in consumed]
+        if predecessors:
+            o = predecessors[0]
+            consumed.add(o)
+            changes.append(Change("ticker_change", t, active[o].security_id, _old(o, active[o]), new))
+        elif figi in figis:
+            changes.append(Change("relisting", t, figis[figi], None, new))
+        else:
+            changes.append(Change("listing", t, None, None, new))
+
+    for t, a in sorted(active.items()):
+        if t in provider or t in consumed:
+            continue
+        if t not in listed:
+            changes.append(Change("delisting", t, a.security_id, _old(t, a), None))
+        elif t in excluded:
+            skipped["excluded_known"] += 1
+        else:
+            reason = {"reason": classify(listed[t]), "exchange": _exchange(listed[t])}
+            changes.append(Change("excluded", t, a.security_id, None, reason))
+
+    return changes, skipped
+
+
+# ----------------------------
+# Apply
+# ----------------------------
+
+def apply_changes(conn, changes: List[Change], job_id=None) -> List[int]:
+    """
+    Apply a change set in the caller's transaction. Returns the affected
+    security_ids. Exclusions are only recorded.
+    """
+    recorded = changes
+    changes = [c for c in changes if c.change_type != "excluded"]
+    with conn.cursor() as cur:
+        closing = [c.old for c in changes if c.old is not None]
+        if closing:
+            execute_values(
+                cur,
+                f"""
+                UPDATE {SCHEMA}.ticker_history th
+                SET end_date = GREATEST(th.start_date, CURRENT_DATE - 1)
+                FROM (VALUES %s) AS v(security_id, ticker, exchange, start_date)
+                WHERE th.security_id = v.security_id
+                  AND th.ticker = v.ticker
+                  AND th.exchange = v.exchange
+                  AND th.start_date = v.start_date::date
+                  AND th.end_date IS NULL
+                """,
+                [(o["security_id"], o["ticker"], o["exchange"], o["start_date"]) for o in closing],
+            )
+
+        # New securities (one per unknown composite_figi)
+        creating = {c.new["composite_figi"]: c.new for c in changes if c.new is not None and c.security_id is None}
+        if creating:
+            execute_values(
+                cur,
+                f"""
+                INSERT INTO {SCHEMA}.companies (composite_figi, name, country)
+                VALUES %s
+                ON CONFLICT (composite_figi) DO NOTHING
+                """,
+                [(figi, n["name"], "US") for figi, n in creating.items()],
+            )
+            created = execute_values(
+                cur,
+                f"""
+                INSERT INTO {SCHEMA}.securities (composite_figi, primary_exchange, is_active)
+                VALUES %s
+                RETURNING composite_figi, security_id
+                """,
+                [(figi, n["exchange"], True) for figi, n in creating.items()],
+                fetch=True,
+            )
+            new_ids = dict(created)
+            for c in changes:
+                if c.new is not None and c.security_id is None:
+                    c.security_id = new_ids[c.new["composite_figi"]]
+
+        opening = [c for c in changes if c.new is not None]
+        if opening:
+            execute_values(
+                cur,
+                f"""
+                INSERT INTO {SCHEMA}.ticker_history (security_id, ticker, exchange, start_date, end_date, reason)
+                VALUES %s
+                ON CONFLICT (security_id, ticker, exchange, start_date) DO NOTHING
+                """,
+                [(c.security_id, c.ticker, c.new["exchange"], c.change_type) for c in opening],
+                template="(%s, %s, %s, CURRENT_DATE, NULL, %s)",
+            )
+
+        affected = sorted(
+            {c.security_id for c in changes if c.security_id is not None}
+            | {c.old["security_id"] for c in changes if c.old is not None}
+        )
+        if affected:
+            cur.execute(
+                f"""
+                UPDATE {SCHEMA}.securities s
+                SET is_active = a.has_active,
+                    end_date  = CASE
+                                    WHEN a.has_active THEN NULL
+                                    ELSE COALESCE(s.end_date, GREATEST(s.start_date, CURRENT_DATE - 1))
+                                END
+                FROM (
+                    SELECT
+                        x.security_id,
+                        EXISTS (
+                            SELECT 1 FROM {SCHEMA}.ticker_history th
+                            WHERE th.security_id = x.security_id
+                              AND th.end_date IS NULL
+                        ) AS has_active
+                    FROM unnest(%s::bigint[]) AS x(security_id)
+                ) a
+                WHERE s.security_id = a.security_id
+                """,
+                (affected,),
+            )
+
+        if recorded:
+            execute_values(
+                cur,
+                """
+                INSERT INTO ingestion.universe_changes (
+                    job_id, change_type, ticker, security_id, old_value, new_value
+                )
+                VALUES %s
+                """,
+                [
+                    (job_id, c.change_type, c.ticker, c.security_id,
+                     Json(c.old) if c.old else None, Json(c.new) if c.new else None)
+                    for c in recorded
+                ],
+            )
+
+    return affected
+
+
+def store_fingerprints(conn, provider: Dict[str, Dict[str, Any]], hashes: Dict[str, str], gone: List[str]):
+    rows = []
+    for t, row in provider.items():
+        attrs, h = fingerprint(row)
+        if hashes.get(t) != h:
+            rows.append((t, row.get("composite_figi"), Json(attrs), h))
+
+    with conn.cursor() as cur:
+        if rows:
+            execute_values(
+                cur,
+                """
+                INSERT INTO ingestion.universe_fingerprints (ticker, composite_figi, attrs, attrs_hash)
+                VALUES %s
+                ON CONFLICT (ticker) DO UPDATE SET
+                    composite_figi  = EXCLUDED.composite_figi,
+                    attrs           = EXCLUDED.attrs,
+                    attrs_hash      = EXCLUDED.attrs_hash,
+                    last_changed_at = now()
+                """,
+                rows,
+                page_size=5000,
+            )
+        if gone:
+            cur.execute("DELETE FROM ingestion.universe_fingerprints WHERE ticker = ANY(%s)", (gone,))
+    return len(rows)
+
+
+# ----------------------------
+# Job
+# ----------------------------
+
+def _run_universe_sync(conn, params: Dict[str, Any], job_id=None) -> Dict[str, Any]:
+    if os.getenv("UNIVERSE_MODE", "explicit").lower() != "all":
+        print("universe_sync: UNIVERSE_MODE is not 'all'; nothing to sync")
+        return {"rows_upserted": 0, "api_calls": 0, "delta": {"skipped": True}, "scope": {"security_ids": []}}
+
+    api_key = getenv("MASSIVE_API_KEY")
+    family = os.getenv("UNIVERSE_NAME", DEFAULT_UNIVERSE_NAME)
+    max_delist = float(os.getenv("UNIVERSE_SYNC_MAX_DELIST_FRACTION", "0.05"))
+    calls0 = api_call_count()
+
+    rows = fetch_all_tickers(api_key)
+    members, stats = apply_rules(rows)
+    provider = {m["ticker"]: m for m in members}
+    listed: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        listed.setdefault((row.get("ticker") or "").strip().upper(), row)
+    listed.pop("", None)
+
+    with conn.cursor() as cur:
+        hashes, active, figis = load_state(cur)
+        excluded = load_excluded(cur)
+
+    changes, skipped = diff_universe(provider, listed, hashes, active, figis, excluded)
+    counts = Counter(c.change_type for c in changes)
+
+    # A truncated provider response must not delist half the universe
+    if active and counts["delisting"] > max_delist * len(active):
+        raise RuntimeError(
+            f"universe_sync: {counts['delisting']} of {len(active)} active tickers would be delisted "
+            f"(limit UNIVERSE_SYNC_MAX_DELIST_FRACTION={max_delist}); provider universe has "
+            f"{len(provider)} tickers. Refusing to apply."
+        )
+
+    affected = apply_changes(conn, changes, job_id)
+    gone = [c.ticker for c in changes if c.change_type == "delisting"]
+    gone += [c.old["ticker"] for c in changes if c.change_type == "ticker_change"]
+    refreshed = store_fingerprints(conn, provider, hashes, gone)
+
+    universe_id = None
+    if changes or latest_universe_id(conn, family) is None:
+        universe_id = write_snapshot(conn, family, members, stats)  # commits
+        invalidate_snapshot_cache()
+    else:
+        conn.commit()
+
+    for change_type, n in sorted(counts.items()):
+        print(f"universe_sync: {n:>6} {change_type}")
+    print(f"universe_sync: {skipped['unchanged']} unchanged, {refreshed} fingerprints refreshed"
+          + (f", snapshot {universe_id}" if universe_id else ""))
+
+    return {
+        "rows_upserted": len(changes) - counts.get("excluded", 0),
+        "api_calls": api_call_count() - calls0,
+        "delta": {
+            **{k: counts.get(k, 0) for k in
+               ("listing", "relisting", "delisting", "ticker_change", "exchange_move", "figi_change", "excluded")},
+            **dict(skipped),
+            "provider_tickers": len(provider),
+            "universe_id": universe_id,
+        },
+        "scope": {
+            "security_ids": affected,
+            "full_history_tickers": sorted(c.ticker for c in changes if c.change_type in FULL_HISTORY_CHANGES),
+        },
+    }
+
+
+def run(conn, job_id=None, params=None):
+    """
+    Phase-6 universe sync entrypoint. The runner owns the DB connection.
+
+    The result scope lists the affected security_ids and the tickers whose
+    history downstream jobs should fetch in full (full_history_tickers).
+    """
+    return _run_universe_sync(conn, params or {}, job_id)
+
+
+def main():
+    conn = psycopg2.connect(getenv("PG_DSN"))
+    conn.autocommit = False
+    try:
+        _run_universe_sync(conn, {})
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
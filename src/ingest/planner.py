@@ -0,0 +1,346 @@
+# src/ingest/planner.py
+
+"""
+Dry-run planner for `python -m src.ingest.run --plan`.
+
+Estimates, per job, the symbols to fetch, missing date ranges, provider
+calls, rows and wall time under the provider rate limit, using:
+  - the universe from load_tickers()
+  - existing coverage in prices_daily / corporate_actions
+  - past per-symbol metrics in ingestion.symbol_ingestion_state
+  - past job metrics in ingestion.ingestion_job
+
+The planner opens a read-only session and never calls the provider.
+
+Knobs:
+  MASSIVE_RATE_LIMIT_PER_MIN  plan limit used as the throughput ceiling
+  PLAN_DEFAULT_SECONDS_PER_CALL  fallback when there is no history (0.5)
+"""
+
+import math
+import os
+from datetime import date, timedelta
+
+from common import as_of_date, iso_today, iso_years_ago
+
+from .universe import load_tickers
+from .gap_planner import plan_gaps
+from .trading_calendar import session_count
+from .workunits import date_windows
+
+SCHEMA = os.getenv("STOCKS_SCHEMA", "stocks_research")
+
+AGGS_PAGE_LIMIT = 50000
+WORKER_COUNTS = [1, 2, 4, 8]
+
+
+def _trading_days(start, end):
+    return session_count(start, end)
+
+
+def _seconds_per_call(cur, job_name):
+    """
+    Observed wall seconds per provider call: per-symbol checkpoints first,
+    then whole-job history, then the configured default.
+    """
+    cur.execute(
+        """
+        SELECT
+            SUM((checkpoint_json->>'seconds')::float),
+            SUM((checkpoint_json->>'api_calls')::float)
+        FROM ingestion.symbol_ingestion_state
+        WHERE job_name = %s
+          AND checkpoint_json ? 'seconds'
+        """,
+        (job_name,),
+    )
+    seconds, calls = cur.fetchone()
+    if seconds and calls:
+        return seconds / calls, "symbol_ingestion_state"
+
+    cur.execute(
+        """
+        SELECT
+            SUM(EXTRACT(EPOCH FROM finished_at - started_at)),
+            SUM(api_calls)
+        FROM ingestion.ingestion_job
+        WHERE job_name = %s
+          AND status = 'success'
+          AND api_calls > 0
+        """,
+        (job_name,),
+    )
+    seconds, calls = cur.fetchone()
+    if seconds and calls:
+        return float(seconds) / float(calls), "ingestion_job"
+
+    return float(os.getenv("PLAN_DEFAULT_SECONDS_PER_CALL", "0.5")), "default"
+
+
+def _durations(api_calls, seconds_per_call):
+    """
+    Expected wall seconds per worker count: the larger of the latency-bound
+    time and the rate-limit-bound time.
+    """
+    rate = os.getenv("MASSIVE_RATE_LIMIT_PER_MIN")
+    floor_s = api_calls / float(rate) * 60 if rate else 0.0
+    return {
+        w: round(max(api_calls * seconds_per_call / w, floor_s), 1)
+        for w in WORKER_COUNTS
+    }
+
+
+def _coverage(cur, tickers):
+    cur.execute(
+        f"""
+        SELECT DISTINCT ON (th.ticker)
+            th.ticker, th.security_id, p.min_date, p.max_date, p.n
+        FROM {SCHEMA}.ticker_history th
+        LEFT JOIN LATERAL (
+            SELECT MIN(trade_date) AS min_date, MAX(trade_date) AS max_date, COUNT(*) AS n
+            FROM {SCHEMA}.prices_daily
+            WHERE security_id = th.security_id
+        ) p ON TRUE
+        WHERE th.ticker = ANY(%s)
+        ORDER BY th.ticker, th.start_date DESC
+        """,
+        (tickers,),
+    )
+    return {r[0]: r[1:] for r in cur.fetchall()}
+
+
+def plan_prices_daily(cur, tickers, mode, params):
+    # same range as jobs/prices_daily.py
+    years = int(os.getenv("YEARS", "5"))
+    history_from = date.fromisoformat(params.get("start_date") or iso_years_ago(years))
+    to_date = date.fromisoformat(params.get("end_date") or iso_today())
+    grouped_max_days = int(os.getenv("PRICES_GROUPED_MAX_DAYS", "5"))
+    window = os.getenv("PRICES_WINDOW", "year").lower()
+
+    coverage = _coverage(cur, tickers)
+    unresolved = [t for t in tickers if t not in coverage]
+
+    missing_ranges = []
+    missing_days = 0
+    fetch_rows = 0
+    calls = 0
+    grouped_from = None
+    up_to_date = 0
+
+    # PRICES_FILL=gaps: holes against the trading calendar, not just the ends
+    calendar_gaps = None
+    if mode == "full" and os.getenv("PRICES_FILL", "range").lower() == "gaps":
+        calendar_gaps = plan_gaps(cur, [t for t in tickers if t in coverage], history_from, to_date)
+
+    for t in tickers:
+        if t not in coverage:
+            continue
+        _, min_date, max_date, _ = coverage[t]
+
+        if calendar_gaps is not None:
+            for g in calendar_gaps.get(t, []):
+                missing_days += g.missing_sessions
+                missing_ranges.append((t, g.start.isoformat(), g.end.isoformat(), g.missing_sessions))
+                for lo, hi in date_windows(g.start, g.end, window):
+                    rows = _trading_days(lo, hi)
+                    fetch_rows += rows
+                    calls += max(1, math.ceil(rows / AGGS_PAGE_LIMIT))
+            continue
+
+        # what is missing relative to the requested window
+        if min_date is None:
+            gaps = [(history_from, to_date)]
+        else:
+            gaps = []
+            if min_date > history_from:
+                gaps.append((history_from, min_date - timedelta(days=1)))
+            if max_date < to_date:
+                gaps.append((max_date + timedelta(days=1), to_date))
+        for a, b in gaps:
+            n = _trading_days(a, b)
+            if n:
+                missing_days += n
+                missing_ranges.append((t, a.isoformat(), b.isoformat(), n))
+
+        # what the job will actually fetch
+        if mode == "update" and max_date is not None:
+            start = max_date + timedelta(days=1)
+            if start > to_date:
+                up_to_date += 1
+                continue
+            if (to_date - start).days < grouped_max_days:
+                grouped_from = min(grouped_from or start, start)
+                continue
+        else:
+            start = history_from
+        # one call chain per PRICES_WINDOW date window (jobs/prices_daily.py)
+        for lo, hi in date_windows(start, to_date, window):
+            rows = _trading_days(lo, hi)
+            fetch_rows += rows
+            calls += max(1, math.ceil(rows / AGGS_PAGE_LIMIT))
+
+    grouped_calls = session_count(grouped_from, to_date) if grouped_from else 0
+    calls += grouped_calls
+
+    spc, source = _seconds_per_call(cur, "prices_daily")
+    return {
+        "job": "prices_daily",
+        "mode": mode,
+        "window": f"{history_from.isoformat()} → {to_date.isoformat()}",
+        "symbols": len(tickers),
+        "symbols_unresolved": len(unresolved),
+        "symbols_up_to_date": up_to_date,
+        "missing_trading_days": missing_days,
+        "missing_ranges": missing_ranges,
+        "api_calls": calls,
+        "grouped_calls": grouped_calls,
+        "rows": fetch_rows,
+        "seconds_per_call": round(spc, 3),
+        "seconds_per_call_source": source,
+        "duration_s_by_workers": _durations(calls, spc),
+    }
+
+
+def plan_corporate_actions(cur, tickers, mode, params):
+    cur.execute(
+        f"""
+        SELECT COUNT(*)::float / GREATEST(COUNT(DISTINCT security_id), 1)
+        FROM {SCHEMA}.corporate_actions
+        """
+    )
+    per_symbol = cur.fetchone()[0] or 0.0
+
+    from .jobs.corporate_actions import fetch_mode
+
+    fetch = fetch_mode(mode)
+    if fetch == "market" and mode == "update":
+        calls = 2  # one window per endpoint; more pages only on busy days
+    elif fetch == "market":
+        # full history, every ticker in the market, 5000 events per page
+        cur.execute(f"SELECT COUNT(*) FROM {SCHEMA}.corporate_actions")
+        known = cur.fetchone()[0] or int(per_symbol * len(tickers))
+        calls = 2 + math.ceil(known / 5000)
+    else:
+        calls = 2 * len(tickers)
+    spc, source = _seconds_per_call(cur, "corporate_actions")
+    return {
+        "job": "corporate_actions",
+        "mode": mode,
+        "fetch": fetch,
+        "symbols": len(tickers),
+        "api_calls": calls,
+        "rows": int(per_symbol * len(tickers)) if mode == "full" else None,
+        "seconds_per_call": round(spc, 3),
+        "seconds_per_call_source": source,
+        "duration_s_by_workers": _durations(calls, spc),
+    }
+
+
+def plan_fundamentals_quarterly_raw(cur, tickers, mode, params):
+    start_fy = int(os.getenv("START_FISCAL_YEAR") or as_of_date().year - 5)
+    end_fy = int(os.getenv("END_FISCAL_YEAR") or as_of_date().year)
+    quarters = max(0, end_fy - start_fy + 1) * 4
+
+    if mode == "update":
+        # one market-wide filing_date query, 1000 rows per page
+        calls = 1 + len(tickers) // 1000
+        rows = None
+    else:
+        # three statements per batch of FUNDAMENTALS_TICKER_BATCH tickers,
+        # plus follow-up pages at FUNDAMENTALS_PAGE_LIMIT rows each
+        batch = max(1, int(os.getenv("FUNDAMENTALS_TICKER_BATCH", "25")))
+        page_limit = max(1, int(os.getenv("FUNDAMENTALS_PAGE_LIMIT", "1000")))
+        batches = -(-len(tickers) // batch)
+        pages_per_batch = max(1, -(-(quarters * min(batch, len(tickers) or 1)) // page_limit))
+        calls = 3 * batches * pages_per_batch
+        rows = 2 * quarters * len(tickers)  # revenue + diluted_eps
+
+    spc, source = _seconds_per_call(cur, "fundamentals_quarterly_raw")
+    return {
+        "job": "fundamentals_quarterly_raw",
+        "mode": mode,
+        "symbols": len(tickers),
+        "api_calls": calls,
+        "rows": rows,
+        "seconds_per_call": round(spc, 3),
+        "seconds_per_call_source": source,
+        "duration_s_by_workers": _durations(calls, spc),
+    }
+
+
+def plan_universe_sync(cur, tickers, mode, params):
+    if os.getenv("UNIVERSE_MODE", "explicit").lower() != "all":
+        return {"job": "universe_sync", "mode": mode, "api_calls": 0, "note": "UNIVERSE_MODE is not 'all'; skipped"}
+
+    # one /v3/reference/tickers page per 1000 tickers; the last build's
+    # fetched count (before the Phase 6 rules) sizes the crawl
+    cur.execute(
+        f"""
+        SELECT (rules_json->'stats'->>'fetched')::int
+        FROM {SCHEMA}.universes
+        WHERE rules_json ? 'stats'
+        ORDER BY created_at DESC
+        LIMIT 1
+        """
+    )
+    row = cur.fetchone()
+    fetched = row[0] if row and row[0] else len(tickers)
+    calls = max(1, math.ceil(fetched / 1000))
+
+    spc, source = _seconds_per_call(cur, "universe_sync")
+    return {
+        "job": "universe_sync",
+        "mode": mode,
+        "symbols": len(tickers),
+        "api_calls": calls,
+        "seconds_per_call": round(spc, 3),
+        "seconds_per_call_source": source,
+        "duration_s_by_workers": _durations(calls, spc),
+    }
+
+
+PLANNERS = {
+    "universe_sync": plan_universe_sync,
+    "prices_daily": plan_prices_daily,
+    "corporate_actions": plan_corporate_actions,
+    "fundamentals_quarterly_raw": plan_fundamentals_quarterly_raw,
+}
+
+
+def build_plan(conn, job_names, mode="full", params=None):
+    """
+    Plan every job in job_names. Derived jobs make no provider calls and
+    are listed with zero calls. params carries the run's start_date /
+    end_date, as passed to the jobs.
+    """
+    params = params or {}
+    conn.set_session(readonly=True)
+    tickers = load_tickers()
+
+    plans = []
+    with conn.cursor() as cur:
+        for job_name in job_names:
+            planner = PLANNERS.get(job_name)
+            if planner is None:
+                plans.append({"job": job_name, "mode": mode, "api_calls": 0, "note": "derived; no provider calls"})
+            else:
+                plans.append(planner(cur, tickers, mode, params))
+    conn.rollback()
+    return plans
+
+
+def print_plan(plans, max_ranges=20):
+    total_calls = 0
+    for p in plans:
+        print(f"\n== {p['job']} ({p['mode']}) ==")
+        for k, v in p.items():
+            if k in ("job", "mode", "missing_ranges"):
+                continue
+            print(f"  {k:<26} {v}")
+        ranges = p.get("missing_ranges") or []
+        if ranges:
+            print(f"  missing ranges (first {min(max_ranges, len(ranges))} of {len(ranges)}):")
+            for t, a, b, n in ranges[:max_ranges]:
+                print(f"    {t:<8} {a} → {b}  (~{n} trading days)")
+        total_calls += p.get("api_calls") or 0
+    print(f"\nTotal provider calls: {total_calls}")
@@ -0,0 +1,168 @@
+# src/ingest/profiling.py
+
+"""
+Opt-in profiling for runner jobs.
+
+Jobs import `phase` at module level and mark coarse phases with
+`phase("fetch")`; when no profiler is active that call returns a shared
+no-op context manager. The profiler itself (JobProfiler, cProfile, the
+stack sampler) only runs when run.py is invoked with --profile.
+
+Modes:
+  - pstats : deterministic cProfile, written as a .pstats file
+  - sample : wall-clock stack sampler, written as collapsed stacks
+             (one "frame;frame;frame count" line per stack, flamegraph.pl /
+             speedscope compatible)
+
+Output files are named profile_<job_name>_<job_id>.<ext> under PROFILE_DIR
+(default: <repo>/profiles).
+"""
+
+from __future__ import annotations
+
+import cProfile
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import resource  # POSIX only
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+
+ROOT = Path(__file__).resolve().parents[2]
+
+_NULL_PHASE = nullcontext()
+_active: Optional["JobProfiler"] = None
+
+
+def phase(name: str):
+    """
+    Mark a named phase of a job for wall/CPU/RSS accounting.
+    No-op unless a JobProfiler is active.
+    """
+    if _active is None:
+        return _NULL_PHASE
+    return _active.phase(name)
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    if sys.platform == "darwin":
+        return round(peak / (1024 * 1024), 1)
+    return round(peak / 1024, 1)
+
+
+class _StackSampler:
+    """Samples the target thread's Python stack on a fixed interval."""
+
+    def __init__(self, thread_id: int, interval_s: float):
+        self.thread_id = thread_id
+        self.interval_s = interval_s
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval_s):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            parts = []
+            while frame is not None:
+                code = frame.f_code
+                parts.append(f"{Path(code.co_filename).stem}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(parts))] += 1
+
+    def write(self, path: Path):
+        with path.open("w", encoding="utf-8") as f:
+            for stack, n in self.stacks.most_common():
+                f.write(f"{stack} {n}\n")
+
+
+class JobProfiler:
+    def __init__(self, job_name: str, job_id: str, mode: str = "pstats"):
+        if mode not in ("pstats", "sample"):
+            raise ValueError(f"Unknown profile mode {mode}. Valid: pstats, sample")
+
+        self.job_name = job_name
+        self.job_id = job_id
+        self.mode = mode
+        self.out_dir = Path(os.getenv("PROFILE_DIR", ROOT / "profiles"))
+        self.sample_interval_s = float(os.getenv("PROFILE_SAMPLE_INTERVAL_S", "0.005"))
+        self.phases: Dict[str, Dict[str, Any]] = {}
+        self.output_path: Optional[Path] = None
+
+    @contextmanager
+    def phase(self, name: str):
+        wall0 = time.perf_counter()
+        cpu0 = time.process_time()
+        try:
+            yield
+        finally:
+            p = self.phases.setdefault(name, {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0})
+            p["calls"] += 1
+            p["wall_s"] += time.perf_counter() - wall0
+            p["cpu_s"] += time.process_time() - cpu0
+            p["peak_rss_mb"] = _peak_rss_mb()
+
+    def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        global _active
+
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        stem = f"profile_{self.job_name}_{self.job_id}"
+
+        _active = self
+        try:
+            with self.phase("job"):
+                if self.mode == "pstats":
+                    prof = cProfile.Profile()
+                    try:
+                        return prof.runcall(fn, *args, **kwargs)
+                    finally:
+                        self.output_path = self.out_dir / f"{stem}.pstats"
+                        prof.dump_stats(str(self.output_path))
+                else:
+                    sampler = _StackSampler(threading.get_ident(), self.sample_interval_s)
+                    sampler.start()
+                    try:
+                        return fn(*args, **kwargs)
+                    finally:
+                        sampler.stop()
+                        self.output_path = self.out_dir / f"{stem}.collapsed"
+                        sampler.write(self.output_path)
+        finally:
+            _active = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-safe summary for ingestion_job.params_json."""
+        return {
+            "mode": self.mode,
+            "output": str(self.output_path) if self.output_path else None,
+            "phases": {
+                name: {
+                    "calls": p["calls"],
+                    "wall_s": round(p["wall_s"], 3),
+                    "cpu_s": round(p["cpu_s"], 3),
+                    "peak_rss_mb": p.get("peak_rss_mb"),
+                }
+                for name, p in self.phases.items()
+            },
+        }
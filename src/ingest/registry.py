@@ -0,0 +1,39 @@
+# src/ingest/registry.py
+
+"""
+Job registry: job name -> "module:function".
+
+Job modules are imported only when the job is selected, so an invocation
+pays for (and can be broken by) nothing but the job it runs. Job modules
+must stay side-effect free at import time; configuration is resolved
+inside the job's run().
+
+Every job is called as run(conn, job_id, params) where params is the dict
+recorded in ingestion_job.params_json.
+"""
+
+import importlib
+import time
+
+JOBS = {
+    "universe_sync": "src.ingest.jobs.universe_sync:run",
+    "prices_daily": "src.ingest.jobs.prices_daily:run",
+    "corporate_actions": "src.ingest.jobs.corporate_actions:run",
+    "adjustment_factors": "src.ingest.jobs.adjustment_factors:run",
+    "fundamentals_quarterly_raw": "src.ingest.jobs.fundamentals_quarterly_raw:run",
+    "fundamentals_quarterly_canonical": "src.ingest.jobs.fundamentals_quarterly_canonical:run",
+}
+
+
+def load_job(job_name):
+    """
+    Import and return (job_fn, import_seconds) for a registered job.
+    """
+    if job_name not in JOBS:
+        raise ValueError(f"Unknown job {job_name}. Valid: {sorted(JOBS.keys())}")
+
+    module_name, fn_name = JOBS[job_name].split(":")
+
+    t0 = time.perf_counter()
+    module = importlib.import_module(module_name)
+    return getattr(module, fn_name), time.perf_counter() - t0
@@ -1,141 +1,111 @@
 # src/ingest/run.py
 
+import time
+
+_T0 = time.perf_counter()
+
 import argparse
-import uuid
-from datetime import datetime, timezone
-from psycopg2.extras import Json
+import os
+from datetime import date, datetime, timezone
 
 from .db import get_conn
-from .jobs.prices_daily import run as run_prices_daily
-from .jobs.adjustment_factors import run as run_adjustment_factors
+from .registry import JOBS, load_job
+from .tracking import (
+    finish_job,
+    finish_run,
+    last_success_at,
+    provider_metrics_snapshot,
+    record_provider_metrics,
+    start_job,
+    start_run,
+    update_job_params,
+)
 
-from .util import get_git_commit, get_host_name, get_user_name
 from pathlib import Path
 from dotenv import load_dotenv
 
 ROOT = Path(__file__).resolve().parents[2]
 load_dotenv(ROOT / ".env")
 
-from .jobs.fundamentals_quarterly_raw import run as run_fundamentals_quarterly_raw
-
-JOBS = {
-    "prices_daily": run_prices_daily,
-    "adjustment_factors": run_adjustment_factors,
-    "fundamentals_quarterly_raw": run_fundamentals_quarterly_raw,
-}
-
-
-
-def start_run(conn, notes=None):
-    run_id = str(uuid.uuid4())
 
-    with conn.cursor() as cur:
-        cur.execute(
-            """
-            INSERT INTO ingestion.ingestion_run (
-                run_id,
-                status,
-                git_commit,
-                invoked_by,
-                host_name,
-                notes
-            )
-            VALUES (%s, 'running', %s, %s, %s, %s)
-            """,
-            (
-                run_id,
-                get_git_commit(),
-                get_user_name(),
-                get_host_name(),
-                notes,
-            ),
-        )
+def run_profiled(conn, job_name, job_id, job_fn, params, mode):
+    from .profiling import JobProfiler
 
-    conn.commit()
-    return run_id
-
-
-def finish_run(conn, run_id, status):
-    with conn.cursor() as cur:
-        cur.execute(
-            """
-            UPDATE ingestion.ingestion_run
-            SET status = %s,
-                finished_at = now()
-            WHERE run_id = %s
-            """,
-            (status, run_id),
-        )
-    conn.commit()
+    profiler = JobProfiler(job_name, job_id, mode=mode)
+    try:
+        return profiler.run(job_fn, conn, job_id, params)
+    except Exception:
+        # The job may have left the connection in an aborted transaction.
+        conn.rollback()
+        raise
+    finally:
+        update_job_params(conn, job_id, {"profile": profiler.snapshot()})
+        print(f"Profile written: {profiler.output_path}")
 
 
-def start_job(conn, run_id, job_name, params):
-    job_id = str(uuid.uuid4())
+def configure_replay():
+    """
+    PROVIDER_CACHE=replay for this process, with INGEST_AS_OF defaulting to
+    the day the cache was last filled so date windows match the recording.
+    """
+    from src.providers.response_cache import get_cache
 
-    with conn.cursor() as cur:
-        cur.execute(
-            """
-            INSERT INTO ingestion.ingestion_job (
-                job_id,
-                run_id,
-                job_name,
-                params_json,
-                status
-            )
-            VALUES (%s, %s, %s, %s, 'running')
-            """,
-            (job_id, run_id, job_name, Json(params)),
-        )
-
-    conn.commit()
-    return job_id
-
-
-def finish_job(
-    conn,
-    job_id,
-    status,
-    rows_upserted=0,
-    rows_deleted=0,
-    api_calls=0,
-    error_count=0,
-    last_checkpoint=None,
-    error_message=None,
-):
-    with conn.cursor() as cur:
-        cur.execute(
-            """
-            UPDATE ingestion.ingestion_job
-            SET status = %s,
-                finished_at = now(),
-                rows_upserted = %s,
-                rows_deleted = %s,
-                api_calls = %s,
-                error_count = %s,
-                last_checkpoint = %s,
-                error_message = %s
-            WHERE job_id = %s
-            """,
-            (
-                status,
-                rows_upserted,
-                rows_deleted,
-                api_calls,
-                error_count,
-                last_checkpoint,
-                error_message,
-                job_id,
-            ),
-        )
-    conn.commit()
+    os.environ["PROVIDER_CACHE"] = "replay"
+    if not os.getenv("INGEST_AS_OF"):
+        last = get_cache().latest_fetch_date()
+        if last is None:
+            raise RuntimeError("--replay: the provider response cache is empty")
+        os.environ["INGEST_AS_OF"] = last
+    print(f"Replaying provider responses from cache (as of {os.environ['INGEST_AS_OF']})")
 
 
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument("--job", required=True)
+    parser.add_argument("--job")
+    parser.add_argument(
+        "--mode",
+        choices=["full", "update"],
+        default="full",
+        help="update = only the delta since the job's last successful run "
+             "(without --job: the whole nightly chain, see update.py)",
+    )
     parser.add_argument("--notes")
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="pstats",
+        choices=["pstats", "sample"],
+        help="Profile the job (pstats = cProfile, sample = collapsed stacks)",
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Dry run: estimate API calls, rows and duration; no provider calls, no writes",
+    )
+    parser.add_argument(
+        "--replay",
+        action="store_true",
+        help="Serve every provider call from the local response cache; no network",
+    )
+    parser.add_argument("--start-date", help="Explicit range start (YYYY-MM-DD), passed to the job as params.start_date")
+    parser.add_argument("--end-date", help="Explicit range end (YYYY-MM-DD), passed to the job as params.end_date")
+    parser.add_argument(
+        "--as-of",
+        help="Run as of this date (YYYY-MM-DD); with --replay defaults to the cache's last fetch date",
+    )
     args = parser.parse_args()
 
+    if args.as_of:
+        os.environ["INGEST_AS_OF"] = args.as_of
+    if args.replay:
+        configure_replay()
+
+    if args.plan:
+        return main_plan(args)
+
+    if args.job is None and args.mode == "update":
+        return main_update(args)
+
     if args.job not in JOBS:
         raise ValueError(f"Unknown job {args.job}. Valid: {sorted(JOBS.keys())}")
 
@@ -147,15 +117,37 @@ def main():
 
     job_id = None
     try:
+        job_fn, import_s = load_job(args.job)
+
+        params = {
+            "mode": args.mode,
+            "invoked_at": datetime.now(timezone.utc).isoformat(),
+            # runner import + connect + run row, and the job module import
+            "startup_s": round(time.perf_counter() - _T0, 3),
+            "job_import_s": round(import_s, 3),
+        }
+        params.update(range_params(args))
+        if args.mode == "update":
+            since = last_success_at(conn, args.job)
+            params["since"] = since.isoformat() if since else None
+
+        provider_before = provider_metrics_snapshot()
         job_id = start_job(
             conn,
             run_id,
             job_name=args.job,
-            params={"invoked_at": datetime.now(timezone.utc).isoformat()},
+            params=params,
         )
 
-        job_fn = JOBS[args.job]
-        result = job_fn(conn, job_id)
+        from src.providers.broker import run_scope
+
+        with run_scope():
+            if args.profile:
+                result = run_profiled(conn, args.job, job_id, job_fn, params, args.profile)
+            else:
+                result = job_fn(conn, job_id, params)
+
+            record_provider_metrics(conn, job_id, provider_before)
 
         finish_job(
             conn,
@@ -163,11 +155,17 @@ def main():
             status="success",
             rows_upserted=result.get("rows_upserted", 0),
             api_calls=result.get("api_calls", 0),
+            last_checkpoint=(
+                {"delta": result.get("delta"), "scope": result.get("scope")}
+                if "delta" in result else None
+            ),
         )
 
     except Exception as e:
         overall_status = "failed"
+        conn.rollback()
         if job_id is not None:
+            record_provider_metrics(conn, job_id, provider_before)
             finish_job(
                 conn,
                 job_id,
@@ -183,5 +181,42 @@ def main():
         conn.close()
 
 
+def range_params(args):
+    """--start-date / --end-date as job params."""
+    return {
+        key: date.fromisoformat(getattr(args, key)).isoformat()
+        for key in ("start_date", "end_date")
+        if getattr(args, key)
+    }
+
+
+def main_plan(args):
+    from .planner import build_plan, print_plan
+    from .update import UPDATE_CHAIN
+
+    if args.job is not None and args.job not in JOBS:
+        raise ValueError(f"Unknown job {args.job}. Valid: {sorted(JOBS.keys())}")
+
+    conn = get_conn()
+    try:
+        print_plan(build_plan(conn, [args.job] if args.job else UPDATE_CHAIN, mode=args.mode, params=range_params(args)))
+    finally:
+        conn.close()
+
+
+def main_update(args):
+    from .update import run_update
+
+    conn = get_conn()
+    run_id = start_run(conn, notes=args.notes or "nightly update")
+    overall_status = "failed"
+    try:
+        overall_status = run_update(conn, run_id)
+    finally:
+        conn.rollback()
+        finish_run(conn, run_id, status=overall_status)
+        conn.close()
+
+
 if __name__ == "__main__":
     main()
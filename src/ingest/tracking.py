@@ -0,0 +1,235 @@
+# src/ingest/tracking.py
+
+"""
+Bookkeeping for ingestion.ingestion_run, ingestion.ingestion_job and
+ingestion.symbol_ingestion_state (sql/admin/010_ingestion_schema.sql), and
+ingestion.rejects (sql/admin/020_ingestion_rejects.sql).
+"""
+
+import uuid
+
+from psycopg2.extras import Json, execute_values
+
+from .util import get_git_commit, get_host_name, get_user_name
+
+
+def start_run(conn, notes=None):
+    run_id = str(uuid.uuid4())
+
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO ingestion.ingestion_run (
+                run_id,
+                status,
+                git_commit,
+                invoked_by,
+                host_name,
+                notes
+            )
+            VALUES (%s, 'running', %s, %s, %s, %s)
+            """,
+            (
+                run_id,
+                get_git_commit(),
+                get_user_name(),
+                get_host_name(),
+                notes,
+            ),
+        )
+
+    conn.commit()
+    return run_id
+
+
+def finish_run(conn, run_id, status):
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE ingestion.ingestion_run
+            SET status = %s,
+                finished_at = now()
+            WHERE run_id = %s
+            """,
+            (status, run_id),
+        )
+    conn.commit()
+
+
+def start_job(conn, run_id, job_name, params):
+    job_id = str(uuid.uuid4())
+
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO ingestion.ingestion_job (
+                job_id,
+                run_id,
+                job_name,
+                params_json,
+                status
+            )
+            VALUES (%s, %s, %s, %s, 'running')
+            """,
+            (job_id, run_id, job_name, Json(params)),
+        )
+
+    conn.commit()
+    return job_id
+
+
+def update_job_params(conn, job_id, extra):
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE ingestion.ingestion_job
+            SET params_json = params_json || %s
+            WHERE job_id = %s
+            """,
+            (Json(extra), job_id),
+        )
+    conn.commit()
+
+
+def finish_job(
+    conn,
+    job_id,
+    status,
+    rows_upserted=0,
+    rows_deleted=0,
+    api_calls=0,
+    error_count=0,
+    last_checkpoint=None,
+    error_message=None,
+):
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE ingestion.ingestion_job
+            SET status = %s,
+                finished_at = now(),
+                rows_upserted = %s,
+                rows_deleted = %s,
+                api_calls = %s,
+                error_count = %s,
+                last_checkpoint = %s,
+                error_message = %s
+            WHERE job_id = %s
+            """,
+            (
+                status,
+                rows_upserted,
+                rows_deleted,
+                api_calls,
+                error_count,
+                Json(last_checkpoint) if last_checkpoint is not None else None,
+                error_message,
+                job_id,
+            ),
+        )
+    conn.commit()
+
+
+def last_success_at(conn, job_name):
+    """
+    started_at of the most recent successful run of job_name, or None.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT MAX(started_at)
+            FROM ingestion.ingestion_job
+            WHERE job_name = %s
+              AND status = 'success'
+            """,
+            (job_name,),
+        )
+        return cur.fetchone()[0]
+
+
+def record_symbol_state(conn, job_name, symbol, status, checkpoint=None, error=None):
+    """
+    Upsert a per-symbol checkpoint. Caller owns the transaction.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO ingestion.symbol_ingestion_state (
+                job_name,
+                symbol,
+                last_success_at,
+                checkpoint_json,
+                status,
+                last_error
+            )
+            VALUES (
+                %s, %s,
+                CASE WHEN %s = 'ok' THEN now() END,
+                %s, %s, %s
+            )
+            ON CONFLICT (job_name, symbol) DO UPDATE SET
+                last_success_at = COALESCE(EXCLUDED.last_success_at, ingestion.symbol_ingestion_state.last_success_at),
+                checkpoint_json = ingestion.symbol_ingestion_state.checkpoint_json || EXCLUDED.checkpoint_json,
+                status = EXCLUDED.status,
+                last_error = EXCLUDED.last_error
+            """,
+            (job_name, symbol, status, Json(checkpoint or {}), status, error),
+        )
+
+
+def record_rejects(conn, job_name, job_id, entity, rejects):
+    """
+    Insert quarantined / flagged provider records. rejects is a list of
+    (symbol, key_date, reason, severity, payload). Caller owns the
+    transaction.
+    """
+    if not rejects:
+        return
+    with conn.cursor() as cur:
+        execute_values(
+            cur,
+            """
+            INSERT INTO ingestion.rejects (
+                job_name, job_id, entity, symbol, key_date, reason, severity, payload
+            )
+            VALUES %s
+            """,
+            [
+                (job_name, job_id, entity, symbol, key_date, reason, severity, Json(payload))
+                for symbol, key_date, reason, severity, payload in rejects
+            ],
+            page_size=1000,
+        )
+
+
+def provider_metrics_snapshot():
+    """
+    Process-wide provider counters, taken when a job starts.
+    """
+    from src.providers import broker, rate_governor, resilience
+
+    return {
+        "rate_governor": rate_governor.snapshot(),
+        "resilience": resilience.snapshot(),
+        "broker": broker.snapshot(),
+    }
+
+
+def record_provider_metrics(conn, job_id, before):
+    """
+    Store one job's provider metrics under params_json: rate_governor
+    (rate, throttle events, time spent waiting) and resilience (transient
+    and permanent errors, deadlines, circuit breaker and hedging events) and
+    broker (requests served from or merged into another job's fetch).
+    `before` is the provider_metrics_snapshot() taken when the job started.
+    """
+    from src.providers import broker, rate_governor, resilience
+
+    extra = {"resilience": resilience.metrics_delta(before["resilience"])}
+    governor = rate_governor.metrics_delta(before["rate_governor"])
+    if governor is not None:
+        extra["rate_governor"] = governor
+    shared = broker.metrics_delta(before["broker"])
+    if shared is not None:
+        extra["broker"] = shared
+    update_job_params(conn, job_id, extra)
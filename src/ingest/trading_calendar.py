@@ -0,0 +1,220 @@
+"""
+NYSE trading calendar, generated locally from the exchange's holiday
+rules, and its stocks_research.trading_calendar table
+(migrations/phase_6/02_create_trading_calendar.sql).
+
+Rules (NYSE Rule 7.2 and its historical predecessors):
+  New Year's Day      Jan 1; Sunday -> Monday, Saturday -> not observed
+  Martin Luther King  3rd Monday of January (from 1998)
+  Washington's Bday   3rd Monday of February
+  Good Friday         Easter Sunday - 2 days
+  Memorial Day        last Monday of May
+  Juneteenth          Jun 19, observed (from 2022)
+  Independence Day    Jul 4, observed
+  Labor Day           1st Monday of September
+  Thanksgiving        4th Thursday of November
+  Christmas           Dec 25, observed
+Observed: Saturday -> preceding Friday, Sunday -> following Monday.
+Plus the unscheduled closures in SPECIAL_CLOSURES. Early closes (1 pm) on
+Jul 3, the day after Thanksgiving and Dec 24 are flagged, not removed.
+
+    python -m src.ingest.trading_calendar                 # 1990 .. 2 years ahead
+    python -m src.ingest.trading_calendar --start 2000-01-01 --end 2030-12-31
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+
+from psycopg2.extras import execute_values
+
+from .logging import get_logger
+
+logger = get_logger("trading_calendar")
+
+SCHEMA = os.getenv("STOCKS_SCHEMA", "stocks_research")
+
+NYSE = "XNYS"
+DEFAULT_START = date(1990, 1, 1)
+
+SPECIAL_CLOSURES: Dict[date, str] = {
+    date(1994, 4, 27): "National Day of Mourning (Nixon)",
+    date(2001, 9, 11): "September 11",
+    date(2001, 9, 12): "September 11",
+    date(2001, 9, 13): "September 11",
+    date(2001, 9, 14): "September 11",
+    date(2004, 6, 11): "National Day of Mourning (Reagan)",
+    date(2007, 1, 2): "National Day of Mourning (Ford)",
+    date(2012, 10, 29): "Hurricane Sandy",
+    date(2012, 10, 30): "Hurricane Sandy",
+    date(2018, 12, 5): "National Day of Mourning (G.H.W. Bush)",
+    date(2025, 1, 9): "National Day of Mourning (Carter)",
+}
+
+
+def _easter(year: int) -> date:
+    # anonymous Gregorian algorithm
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    first = date(year, month, 1)
+    return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+
+
+def _last_weekday(year: int, month: int, weekday: int) -> date:
+    last = (date(year + month // 12, month % 12 + 1, 1)) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _observed(d: date) -> date:
+    if d.weekday() == 5:
+        return d - timedelta(days=1)
+    if d.weekday() == 6:
+        return d + timedelta(days=1)
+    return d
+
+
+@lru_cache(maxsize=None)
+def holidays(year: int) -> Dict[date, str]:
+    """
+    Full-day closures in `year`.
+    """
+    out: Dict[date, str] = {}
+
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:
+        out[_observed(new_year)] = "New Year's Day"
+    if year >= 1998:
+        out[_nth_weekday(year, 1, 0, 3)] = "Martin Luther King Jr. Day"
+    out[_nth_weekday(year, 2, 0, 3)] = "Washington's Birthday"
+    out[_easter(year) - timedelta(days=2)] = "Good Friday"
+    out[_last_weekday(year, 5, 0)] = "Memorial Day"
+    if year >= 2022:
+        out[_observed(date(year, 6, 19))] = "Juneteenth"
+    out[_observed(date(year, 7, 4))] = "Independence Day"
+    out[_nth_weekday(year, 9, 0, 1)] = "Labor Day"
+    out[_nth_weekday(year, 11, 3, 4)] = "Thanksgiving Day"
+    out[_observed(date(year, 12, 25))] = "Christmas Day"
+
+    for d, name in SPECIAL_CLOSURES.items():
+        if d.year == year:
+            out[d] = name
+    return out
+
+
+@lru_cache(maxsize=None)
+def early_closes(year: int) -> Set[date]:
+    closed = holidays(year)
+    candidates = [
+        date(year, 7, 3),
+        _nth_weekday(year, 11, 3, 4) + timedelta(days=1),
+        date(year, 12, 24),
+    ]
+    return {d for d in candidates if d.weekday() < 5 and d not in closed}
+
+
+def is_session(d: date) -> bool:
+    return d.weekday() < 5 and d not in holidays(d.year)
+
+
+def calendar_days(start: date, end: date) -> List[Tuple[date, bool, bool, Optional[str]]]:
+    """
+    (date, is_open, early_close, holiday) for every day in [start, end].
+    """
+    out = []
+    d = start
+    while d <= end:
+        holiday = holidays(d.year).get(d)
+        is_open = d.weekday() < 5 and holiday is None
+        out.append((d, is_open, is_open and d in early_closes(d.year), holiday))
+        d += timedelta(days=1)
+    return out
+
+
+def sessions(start: date, end: date) -> List[date]:
+    return [d for d, is_open, _, _ in calendar_days(start, end) if is_open]
+
+
+def session_count(start: date, end: date) -> int:
+    return len(sessions(start, end)) if start <= end else 0
+
+
+# ----------------------------
+# Table
+# ----------------------------
+
+UPSERT_SQL = f"""
+INSERT INTO {SCHEMA}.trading_calendar (exchange, cal_date, is_open, early_close, holiday)
+VALUES %s
+ON CONFLICT (exchange, cal_date) DO UPDATE SET
+  is_open = EXCLUDED.is_open,
+  early_close = EXCLUDED.early_close,
+  holiday = EXCLUDED.holiday
+WHERE (trading_calendar.is_open, trading_calendar.early_close, trading_calendar.holiday)
+      IS DISTINCT FROM (EXCLUDED.is_open, EXCLUDED.early_close, EXCLUDED.holiday)
+"""
+
+
+def load_calendar(conn, start: date, end: date, exchange: str = NYSE) -> int:
+    """
+    Write [start, end] to the trading_calendar table. Returns days
+    inserted or changed.
+    """
+    rows = [(exchange, d, o, e, h) for d, o, e, h in calendar_days(start, end)]
+    with conn.cursor() as cur:
+        changed = execute_values(cur, UPSERT_SQL + " RETURNING 1", rows, page_size=5000, fetch=True)
+    conn.commit()
+    return len(changed)
+
+
+def calendar_bounds(cur, exchange: str = NYSE) -> Tuple[Optional[date], Optional[date]]:
+    cur.execute(
+        f"SELECT MIN(cal_date), MAX(cal_date) FROM {SCHEMA}.trading_calendar WHERE exchange = %s",
+        (exchange,),
+    )
+    return cur.fetchone()
+
+
+def require_calendar(cur, start: date, end: date, exchange: str = NYSE):
+    lo, hi = calendar_bounds(cur, exchange)
+    if lo is None or lo > start or hi < end:
+        raise RuntimeError(
+            f"trading_calendar ({exchange}) covers {lo}..{hi}, need {start}..{end}; "
+            f"run python -m src.ingest.trading_calendar --start {start} --end {end}"
+        )
+
+
+def main():
+    from .db import get_conn
+
+    parser = argparse.ArgumentParser(description="Generate the NYSE trading calendar table")
+    parser.add_argument("--start", type=date.fromisoformat, default=DEFAULT_START)
+    parser.add_argument("--end", type=date.fromisoformat, default=date(date.today().year + 2, 12, 31))
+    parser.add_argument("--exchange", default=NYSE)
+    args = parser.parse_args()
+
+    conn = get_conn()
+    try:
+        n = load_calendar(conn, args.start, args.end, args.exchange)
+    finally:
+        conn.close()
+    print(f"trading_calendar {args.exchange} {args.start}..{args.end}: {n} days written")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,51 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# (family, pinned id) -> tickers; a snapshot is immutable once written
+_snapshot_cache = {}
+
+
+def invalidate_snapshot_cache():
+    """
+    Forget loaded snapshots (after universe_sync writes a new one).
+    """
+    _snapshot_cache.clear()
+
+
+def _load_snapshot() -> List[str]:
+    """
+    Tickers of the latest universe snapshot of UNIVERSE_NAME, or of
+    UNIVERSE_ID when pinned (src/ingest/universe_builder.py).
+    """
+    import psycopg2
+    from common import getenv
+    from src.ingest.universe_builder import DEFAULT_UNIVERSE_NAME, latest_universe_id, snapshot_tickers
+
+    family = os.getenv("UNIVERSE_NAME", DEFAULT_UNIVERSE_NAME)
+    pinned = os.getenv("UNIVERSE_ID")
+    key = (family, pinned)
+    if key in _snapshot_cache:
+        return list(_snapshot_cache[key])
+
+    conn = psycopg2.connect(getenv("PG_DSN"))
+    try:
+        universe_id = int(pinned) if pinned else latest_universe_id(conn, family)
+        if universe_id is None:
+            raise RuntimeError(
+                f"UNIVERSE_MODE=all but no '{family}' universe snapshot exists. "
+                "Run python -m src.ingest.universe_builder first."
+            )
+        tickers = snapshot_tickers(conn, universe_id)
+    finally:
+        conn.close()
+
+    if not tickers:
+        raise RuntimeError(f"Universe snapshot {universe_id} is empty")
+
+    logger.info("Universe snapshot loaded", extra={"universe_id": universe_id, "num_tickers": len(tickers)})
+    _snapshot_cache[key] = tickers
+    return list(tickers)
+
 
 def load_tickers() -> List[str]:
     """
@@ -41,8 +86,8 @@ def load_tickers() -> List[str]:
         return tickers
 
     elif mode == "all":
-        # IMPORTANT: do not silently allow this during bootstrap
-        return []
+        # Served from a persisted snapshot; never an implicit provider crawl
+        return _load_snapshot()
 
     else:
         raise RuntimeError(f"Unknown UNIVERSE_MODE: {mode}")
\ No newline at end of file
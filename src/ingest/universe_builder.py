@@ -0,0 +1,281 @@
+"""
+Phase 6 universe builder.
+
+Pages through the provider's all-tickers reference endpoint
+(/v3/reference/tickers, following next_url), applies the Phase 6
+inclusion/exclusion rules (docs/PHASE_6_PLANNING_NOTES.md) to the returned
+metadata, and writes a versioned snapshot:
+
+  stocks_research.universes         one row per build, name '<family>@<built_at>',
+                                    rules and build stats in rules_json
+  stocks_research.universe_members  the included tickers
+                                    (migrations/phase_6/01_create_universe_members.sql)
+
+load_tickers() with UNIVERSE_MODE=all serves the latest snapshot of
+UNIVERSE_NAME (or a pinned UNIVERSE_ID) without calling the provider.
+
+Provider metadata does not flag every excluded class (BDCs, closed-end
+funds and tracking stocks report as CS). The name patterns below catch the
+common cases; each build records per-reason exclusion counts and the
+included type mix so the mandatory Phase 6 audit can refine RULES.
+
+Usage:
+  python -m src.ingest.universe_builder [--name us_equities] [--dry-run]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import re
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import psycopg2
+from psycopg2.extras import Json, execute_values
+
+from common import getenv, iter_pages
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BASE_URL = os.getenv("MASSIVE_BASE_URL", "https://api.massive.com")
+SCHEMA = os.getenv("STOCKS_SCHEMA", "stocks_research")
+
+TICKERS_PATH = "/v3/reference/tickers"
+PAGE_LIMIT = 1000
+
+DEFAULT_UNIVERSE_NAME = "us_equities"
+RULES_VERSION = 1
+
+# Phase 6 universe: common stock, ADRs, REITs (REITs report as CS)
+RULES: Dict[str, Any] = {
+    "version": RULES_VERSION,
+    "market": "stocks",
+    "locale": "us",
+    "include_types": ["CS", "ADRC"],
+    # Listed venues only; OTC symbols carry no primary_exchange MIC here
+    "exchanges": ["XNYS", "XNAS", "XASE", "ARCX", "BATS", "XNGS", "XNCM", "XNMS"],
+    # Misclassified instruments by name (case-insensitive)
+    "exclude_name_patterns": [
+        r"\bpreferred\b",
+        r"\bpfd\b",
+        r"\bdepositary shares? representing\b.*\bpreferred\b",
+        r"\bwarrants?\b",
+        r"\brights?\b",
+        r"\bunits?\b",
+        r"\bnotes? due\b",
+        r"\betn\b",
+        r"\bexchange[- ]traded note",
+        r"\bclosed[- ]end fund\b",
+        r"\bbusiness development compan",
+        r"\btracking stock\b",
+    ],
+}
+
+
+# ----------------------------
+# Fetch
+# ----------------------------
+
+def fetch_all_tickers(api_key: str, active: bool = True) -> List[Dict[str, Any]]:
+    url = BASE_URL + TICKERS_PATH
+    params = {
+        "market": RULES["market"],
+        "locale": RULES["locale"],
+        "active": "true" if active else "false",
+        "limit": PAGE_LIMIT,
+        "sort": "ticker",
+    }
+    out: List[Dict[str, Any]] = []
+    pages = 0
+
+    for j in iter_pages(url, params, api_key):
+        out.extend(j.get("results") or [])
+        pages += 1
+        if pages % 10 == 0:
+            print(f"  {pages} pages, {len(out)} tickers...")
+    return out
+
+
+# ----------------------------
+# Rules
+# ----------------------------
+
+def classify(row: Dict[str, Any], rules: Dict[str, Any] = RULES) -> Optional[str]:
+    """
+    None if the ticker belongs in the universe, else the exclusion reason.
+    """
+    if row.get("market") and row["market"] != rules["market"]:
+        return "market"
+    if row.get("locale") and row["locale"] != rules["locale"]:
+        return "locale"
+
+    ticker_type = row.get("type") or ""
+    if ticker_type not in rules["include_types"]:
+        return f"type:{ticker_type or 'missing'}"
+
+    if (row.get("primary_exchange") or "") not in rules["exchanges"]:
+        return "exchange"
+
+    name = row.get("name") or ""
+    for pattern in rules["exclude_name_patterns"]:
+        if re.search(pattern, name, re.IGNORECASE):
+            return f"name:{pattern}"
+
+    return None
+
+
+def apply_rules(
+    rows: List[Dict[str, Any]],
+    rules: Dict[str, Any] = RULES,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    (members, stats). Duplicate tickers keep the first row.
+    """
+    members: List[Dict[str, Any]] = []
+    excluded: Counter = Counter()
+    seen = set()
+
+    for row in rows:
+        ticker = (row.get("ticker") or "").strip().upper()
+        if not ticker or ticker in seen:
+            excluded["duplicate_or_blank"] += 1
+            continue
+        seen.add(ticker)
+
+        reason = classify(row, rules)
+        if reason is None:
+            members.append({**row, "ticker": ticker})
+        else:
+            excluded[reason] += 1
+
+    stats = {
+        "fetched": len(rows),
+        "included": len(members),
+        "included_by_type": dict(Counter(m.get("type") for m in members)),
+        "included_without_figi": sum(1 for m in members if not m.get("composite_figi")),
+        "excluded": dict(excluded.most_common()),
+    }
+    return members, stats
+
+
+# ----------------------------
+# Snapshot
+# ----------------------------
+
+def write_snapshot(
+    conn,
+    family: str,
+    members: List[Dict[str, Any]],
+    stats: Dict[str, Any],
+    rules: Dict[str, Any] = RULES,
+) -> int:
+    built_at = datetime.now(timezone.utc).replace(microsecond=0)
+    name = f"{family}@{built_at.isoformat()}"
+
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            INSERT INTO {SCHEMA}.universes (name, rules_json, created_at)
+            VALUES (%s, %s, %s)
+            RETURNING universe_id
+            """,
+            (name, Json({"family": family, "rules": rules, "stats": stats}), built_at),
+        )
+        universe_id = cur.fetchone()[0]
+
+        execute_values(
+            cur,
+            f"""
+            INSERT INTO {SCHEMA}.universe_members
+                (universe_id, ticker, composite_figi, ticker_type, primary_exchange, name)
+            VALUES %s
+            """,
+            [
+                (
+                    universe_id,
+                    m["ticker"],
+                    m.get("composite_figi"),
+                    m.get("type"),
+                    m.get("primary_exchange"),
+                    m.get("name"),
+                )
+                for m in members
+            ],
+            page_size=5000,
+        )
+    conn.commit()
+    return universe_id
+
+
+def latest_universe_id(conn, family: str) -> Optional[int]:
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT universe_id
+            FROM {SCHEMA}.universes
+            WHERE rules_json->>'family' = %s
+            ORDER BY created_at DESC, universe_id DESC
+            LIMIT 1
+            """,
+            (family,),
+        )
+        row = cur.fetchone()
+    return int(row[0]) if row else None
+
+
+def snapshot_tickers(conn, universe_id: int) -> List[str]:
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT ticker
+            FROM {SCHEMA}.universe_members
+            WHERE universe_id = %s
+            ORDER BY ticker
+            """,
+            (universe_id,),
+        )
+        return [r[0] for r in cur.fetchall()]
+
+
+def build_universe(conn, api_key: str, family: str = DEFAULT_UNIVERSE_NAME, dry_run: bool = False):
+    """
+    Fetch, filter and (unless dry_run) persist a snapshot.
+    Returns (universe_id or None, stats).
+    """
+    print(f"Fetching all {RULES['locale']} {RULES['market']} tickers...")
+    rows = fetch_all_tickers(api_key)
+    members, stats = apply_rules(rows)
+    if not members:
+        raise RuntimeError(f"Universe rules matched none of {len(rows)} tickers")
+    if dry_run:
+        return None, stats
+    return write_snapshot(conn, family, members, stats), stats
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m src.ingest.universe_builder")
+    parser.add_argument("--name", default=os.getenv("UNIVERSE_NAME", DEFAULT_UNIVERSE_NAME))
+    parser.add_argument("--dry-run", action="store_true", help="Apply the rules and print stats only")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(getenv("PG_DSN"))
+    try:
+        universe_id, stats = build_universe(conn, getenv("MASSIVE_API_KEY"), args.name, args.dry_run)
+    finally:
+        conn.close()
+
+    print(f"Fetched {stats['fetched']}, included {stats['included']} "
+          f"({stats['included_without_figi']} without composite_figi)")
+    print(f"Included by type: {stats['included_by_type']}")
+    print("Excluded:")
+    for reason, n in stats["excluded"].items():
+        print(f"  {n:>7}  {reason}")
+    if universe_id is not None:
+        print(f"\nWrote universe snapshot {universe_id} ({args.name})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# src/ingest/update.py
+
+"""
+Nightly incremental update.
+
+Runs the frozen Phase 6 job order for the delta since each job's last
+successful run, inside one ingestion_run:
+
+  1. universe_sync                     listings, delistings, ticker changes
+                                       (UNIVERSE_MODE=all only)
+  2. prices_daily                      new bars only
+  3. corporate_actions                 actions dated since the last run, full
+                                       history for newly listed tickers
+  4. adjustment_factors                securities with new bars or changed actions
+  5. fundamentals_quarterly_raw        statements filed since the last run
+  6. fundamentals_quarterly_canonical  securities with new filings
+  7. validation gates                  for every job that wrote rows
+
+Each stage reports its delta in ingestion_job.last_checkpoint
+({"delta": ..., "scope": ...}). A failed stage stops the chain
+(PHASE_6_PLANNING_NOTES: no reordering, stop on error).
+"""
+
+from datetime import datetime, timezone
+
+from .logging import get_logger
+from .registry import load_job
+from .tracking import (
+    finish_job,
+    last_success_at,
+    provider_metrics_snapshot,
+    record_provider_metrics,
+    start_job,
+)
+
+logger = get_logger("update")
+
+UPDATE_CHAIN = [
+    "universe_sync",
+    "prices_daily",
+    "corporate_actions",
+    "adjustment_factors",
+    "fundamentals_quarterly_raw",
+    "fundamentals_quarterly_canonical",
+]
+
+# job name -> validate_runner gate name
+VALIDATION_GATES = {
+    "prices_daily": "prices_daily",
+    "corporate_actions": "corporate_actions",
+    "adjustment_factors": "adjustment_factors_daily",
+    "fundamentals_quarterly_raw": "fundamentals_quarterly_raw",
+}
+
+
+def _stage_params(conn, job_name, scopes):
+    since = last_success_at(conn, job_name)
+    params = {
+        "mode": "update",
+        "invoked_at": datetime.now(timezone.utc).isoformat(),
+        "since": since.isoformat() if since else None,
+    }
+
+    def ids(job):
+        return (scopes.get(job) or {}).get("security_ids") or []
+
+    if job_name == "corporate_actions":
+        params["full_history_tickers"] = (scopes.get("universe_sync") or {}).get("full_history_tickers") or []
+    elif job_name == "adjustment_factors":
+        params["security_ids"] = sorted(set(ids("prices_daily")) | set(ids("corporate_actions")))
+        params["rebuild_security_ids"] = ids("corporate_actions")
+    elif job_name == "fundamentals_quarterly_canonical":
+        params["security_ids"] = ids("fundamentals_quarterly_raw")
+
+    return params
+
+
+def run_update(conn, run_id):
+    """
+    Execute the update chain. Returns the ingestion_run status.
+
+    The whole chain shares one provider broker (src/providers/broker.py):
+    a response one stage fetched is not fetched again by a later stage.
+    """
+    from src.providers.broker import run_scope
+
+    with run_scope() as shared:
+        status = _run_chain(conn, run_id)
+        if shared is not None:
+            logger.info(f"provider broker: {shared.metrics()}")
+    return status
+
+
+def _run_chain(conn, run_id):
+    scopes = {}
+
+    for job_name in UPDATE_CHAIN:
+        params = _stage_params(conn, job_name, scopes)
+
+        job_id = None
+        provider_before = provider_metrics_snapshot()
+        try:
+            job_fn, _ = load_job(job_name)
+            job_id = start_job(conn, run_id, job_name, params)
+            result = job_fn(conn, job_id, params) or {}
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"{job_name}: FAILED | {e}")
+            if job_id is not None:
+                record_provider_metrics(conn, job_id, provider_before)
+                finish_job(conn, job_id, status="failed", error_count=1, error_message=str(e))
+            return "failed"
+
+        scopes[job_name] = result.get("scope")
+        record_provider_metrics(conn, job_id, provider_before)
+        finish_job(
+            conn,
+            job_id,
+            status="success",
+            rows_upserted=result.get("rows_upserted", 0),
+            api_calls=result.get("api_calls", 0),
+            last_checkpoint={"delta": result.get("delta"), "scope": result.get("scope")},
+        )
+        logger.info(f"{job_name}: {result.get('delta')}")
+
+    return run_validation_gates(scopes)
+
+
+def run_validation_gates(scopes):
+    """
+    Post-job gates, limited to the slice each job wrote. Full-table
+    validation runs on its own schedule (see OPERATIONAL_RUNBOOK).
+    """
+    from .validate_base import ValidationScope
+    from .validate_runner import validate_job
+
+    for job_name, gate in VALIDATION_GATES.items():
+        if not (scopes.get(job_name) or {}).get("security_ids"):
+            logger.info(f"{gate}: nothing written, validation skipped")
+            continue
+        try:
+            validate_job(gate, scope=ValidationScope.from_dict(scopes[job_name]))
+        except Exception as e:
+            logger.error(f"{gate}: VALIDATION FAILED | {e}")
+            return "failed"
+
+    return "success"
@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import time
 from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, Sequence, Tuple
 
+from src.ingest.validate_base import ValidationCheck, ValidationResult, ValidationScope
+
 
 # ----------------------------
 # Small internal reporting model
@@ -16,6 +19,7 @@ class CheckResult:
     violations: int
     sample_rows: List[Dict[str, Any]]
     hint: str = ""
+    seconds: float | None = None
 
 
 class ValidationError(Exception):
@@ -31,11 +35,15 @@ def _get_conn(ctx: Any):
     Try hard to find a DB-API connection on ctx.
 
     Expected possibilities (seen in many ingestion frameworks):
+      - ctx itself (a connection)
       - ctx.conn
       - ctx.db.conn
       - ctx.db.connection
       - ctx.connection
     """
+    if hasattr(ctx, "cursor"):
+        return ctx
+
     for attr in ("conn", "connection"):
         if hasattr(ctx, attr):
             return getattr(ctx, attr)
@@ -75,54 +83,232 @@ def _fetch_dicts(conn, sql: str, params: Optional[Sequence[Any]] = None) -> List
         return out
 
 
+# ----------------------------
+# Single-pass invariant scan
+# ----------------------------
+
+# One pass over adjustment_factors_daily (window over the PK order) merged
+# with prices_daily computes every invariant AFD_02..AFD_08 per security;
+# the outer aggregate totals the violations and keeps bounded samples.
+# Samples are capped per security and across securities, so the result
+# size does not grow with the table.
+#
+# A scope limits both sides to its security_ids. Date bounds are not
+# applied: factors are rebuilt per security, and the anchor and LAG-based
+# checks need each security's full series.
+SINGLE_PASS_SQL = """
+WITH f AS (
+    SELECT
+        security_id,
+        trade_date,
+        price_factor,
+        LAG(trade_date)   OVER w AS prev_date,
+        LAG(price_factor) OVER w AS prev_factor,
+        LEAD(trade_date)  OVER w IS NULL AS is_latest
+    FROM stocks_research.adjustment_factors_daily a
+    WHERE TRUE{scope_a}
+    WINDOW w AS (PARTITION BY security_id ORDER BY trade_date)
+),
+j AS (
+    SELECT
+        COALESCE(f.security_id, p.security_id) AS security_id,
+        COALESCE(f.trade_date, p.trade_date)   AS trade_date,
+        f.security_id IS NOT NULL AS has_factor,
+        p.security_id IS NOT NULL AS has_price,
+        f.price_factor,
+        f.prev_factor,
+        COALESCE(f.prev_date = f.trade_date, FALSE) AS is_duplicate,
+        COALESCE(f.is_latest, FALSE) AS is_latest
+    FROM f
+    FULL JOIN (
+        SELECT p.security_id, p.trade_date
+        FROM stocks_research.prices_daily p
+        WHERE TRUE{scope_p}
+    ) p
+      ON p.security_id = f.security_id
+     AND p.trade_date = f.trade_date
+),
+per_security AS (
+    SELECT
+        security_id,
+        COUNT(*) FILTER (WHERE has_factor) AS n_factors,
+        COUNT(*) FILTER (WHERE has_price AND NOT is_duplicate) AS n_prices,
+        MIN(trade_date) FILTER (WHERE has_factor) AS first_date,
+        MAX(trade_date) FILTER (WHERE has_factor) AS last_date,
+        MAX(price_factor) FILTER (WHERE is_latest) AS latest_factor,
+
+        COUNT(DISTINCT trade_date) FILTER (WHERE is_duplicate) AS n_duplicates,
+        COUNT(*) FILTER (WHERE has_factor AND NOT has_price) AS n_no_price,
+        COUNT(*) FILTER (WHERE has_factor AND (price_factor IS NULL OR price_factor <= 0)) AS n_nonpositive,
+        COUNT(*) FILTER (WHERE is_latest AND ABS(price_factor - 1.0) > 1e-12) AS n_bad_anchor,
+        COUNT(*) FILTER (WHERE prev_factor IS NOT NULL AND ABS(price_factor - prev_factor) > 1e-12) AS n_changes,
+
+        to_jsonb((array_agg(jsonb_build_object(
+            'security_id', security_id, 'trade_date', trade_date
+        ) ORDER BY trade_date) FILTER (WHERE is_duplicate))[1:%(n)s]) AS s_duplicates,
+        to_jsonb((array_agg(jsonb_build_object(
+            'security_id', security_id, 'trade_date', trade_date, 'price_factor', price_factor
+        ) ORDER BY trade_date) FILTER (WHERE has_factor AND NOT has_price))[1:%(n)s]) AS s_no_price,
+        to_jsonb((array_agg(jsonb_build_object(
+            'security_id', security_id, 'trade_date', trade_date, 'price_factor', price_factor
+        ) ORDER BY trade_date) FILTER (WHERE has_factor AND (price_factor IS NULL OR price_factor <= 0)))[1:%(n)s]) AS s_nonpositive,
+        to_jsonb((array_agg(jsonb_build_object(
+            'security_id', security_id, 'trade_date', trade_date,
+            'prev_factor', prev_factor, 'price_factor', price_factor
+        ) ORDER BY trade_date) FILTER (WHERE prev_factor IS NOT NULL AND ABS(price_factor - prev_factor) > 1e-12))[1:%(n)s]) AS s_changes
+    FROM j
+    GROUP BY security_id
+)
+SELECT
+    SUM(ps.n_factors) AS n_total,
+
+    SUM(ps.n_duplicates) AS afd_02,
+    COALESCE(SUM(ps.n_factors) FILTER (WHERE s.security_id IS NULL), 0) AS afd_03,
+    SUM(ps.n_no_price) AS afd_04,
+    COUNT(*) FILTER (WHERE ps.n_prices > 0 AND ps.n_factors <> ps.n_prices) AS afd_05,
+    SUM(ps.n_nonpositive) AS afd_06,
+    SUM(ps.n_bad_anchor) AS afd_07,
+    SUM(ps.n_changes) AS n_changes,
+
+    (array_agg(ps.s_duplicates ORDER BY ps.security_id) FILTER (WHERE ps.n_duplicates > 0))[1:%(n)s],
+    (array_agg(jsonb_build_object(
+        'security_id', ps.security_id, 'first_date', ps.first_date,
+        'last_date', ps.last_date, 'rows', ps.n_factors
+    ) ORDER BY ps.n_factors DESC, ps.security_id) FILTER (WHERE s.security_id IS NULL AND ps.n_factors > 0))[1:%(n)s],
+    (array_agg(ps.s_no_price ORDER BY ps.security_id) FILTER (WHERE ps.n_no_price > 0))[1:%(n)s],
+    (array_agg(jsonb_build_object(
+        'security_id', ps.security_id, 'n_prices', ps.n_prices, 'n_factors', ps.n_factors
+    ) ORDER BY ps.security_id) FILTER (WHERE ps.n_prices > 0 AND ps.n_factors <> ps.n_prices))[1:%(n)s],
+    (array_agg(ps.s_nonpositive ORDER BY ps.security_id) FILTER (WHERE ps.n_nonpositive > 0))[1:%(n)s],
+    (array_agg(jsonb_build_object(
+        'security_id', ps.security_id, 'trade_date', ps.last_date, 'price_factor', ps.latest_factor
+    ) ORDER BY ps.security_id) FILTER (WHERE ps.n_bad_anchor > 0))[1:%(n)s],
+    (array_agg(ps.s_changes ORDER BY ps.security_id) FILTER (WHERE ps.n_changes > 0))[1:%(n)s],
+
+    COUNT(*) AS n_securities
+FROM per_security ps
+LEFT JOIN stocks_research.securities s
+  ON s.security_id = ps.security_id
+"""
+
+
+def _flatten(groups: Optional[List[Any]], max_samples: int) -> List[Dict[str, Any]]:
+    """
+    Samples come back either as one object per security or as a capped
+    array of row objects per security; flatten and cap.
+    """
+    out: List[Dict[str, Any]] = []
+    for g in groups or []:
+        out.extend(g if isinstance(g, list) else [g])
+        if len(out) >= max_samples:
+            break
+    return out[:max_samples]
+
+
+SCAN_CHECK_IDS = [
+    "AFD_02_NO_DUPLICATES",
+    "AFD_03_FK_SECURITIES",
+    "AFD_04_SUBSET_OF_PRICES",
+    "AFD_05_COVERAGE_PARITY",
+    "AFD_06_FACTOR_POSITIVE",
+    "AFD_07_ANCHOR_NORMALIZED",
+]
+
+# What each scan count is a count of (denominator for sampled rates)
+CHECK_UNITS = {
+    "AFD_02_NO_DUPLICATES": "rows",
+    "AFD_03_FK_SECURITIES": "rows",
+    "AFD_04_SUBSET_OF_PRICES": "rows",
+    "AFD_05_COVERAGE_PARITY": "securities",
+    "AFD_06_FACTOR_POSITIVE": "rows",
+    "AFD_07_ANCHOR_NORMALIZED": "securities",
+}
+
+
+@dataclass
+class AfdScan:
+    n_total: int
+    n_securities: int
+    n_changes: int
+    counts: Dict[str, int]
+    samples: Dict[str, List[Dict[str, Any]]]
+    seconds: float
+
+
+def scan_adjustment_factors_daily(
+    conn,
+    *,
+    max_samples: int = 20,
+    scope: Optional[ValidationScope] = None,
+) -> AfdScan:
+    """
+    Run SINGLE_PASS_SQL, optionally limited to scope.security_ids.
+    """
+    params: Dict[str, Any] = {"n": max_samples}
+    scope_a = scope_p = ""
+    if scope is not None and scope.security_ids is not None:
+        by_security = ValidationScope(security_ids=scope.security_ids)
+        scope_a, scope_params = by_security.predicate("a")
+        scope_p, _ = by_security.predicate("p")
+        params.update(scope_params)
+
+    t0 = time.perf_counter()
+    with conn.cursor() as cur:
+        cur.execute(SINGLE_PASS_SQL.format(scope_a=scope_a, scope_p=scope_p), params)
+        row = cur.fetchone()
+
+    return AfdScan(
+        n_total=int(row[0] or 0),
+        n_securities=int(row[15] or 0),
+        n_changes=int(row[7] or 0),
+        counts={c: int(v or 0) for c, v in zip(SCAN_CHECK_IDS, row[1:7])},
+        samples={
+            c: _flatten(g, max_samples)
+            for c, g in zip(SCAN_CHECK_IDS + ["AFD_08_PIECEWISE_CONSTANT_HEURISTIC"], row[8:15])
+        },
+        seconds=time.perf_counter() - t0,
+    )
+
+
+def piecewise_violation(n_changes: int, n_total: int) -> int:
+    # AFD_08 is a ratio heuristic: one violation when >5% of rows change factor
+    return 1 if n_total and n_changes / n_total > 0.05 else 0
+
+
 # ----------------------------
 # Core validator entrypoint
 # ----------------------------
 
-def validate_adjustment_factors_daily(ctx: Any, *, max_samples: int = 20) -> List[CheckResult]:
+def validate_adjustment_factors_daily(
+    ctx: Any,
+    *,
+    max_samples: int = 20,
+    scope: Optional[ValidationScope] = None,
+) -> List[CheckResult]:
     """
     Validates Phase 4A adjustment_factors_daily invariants.
 
+    AFD_01 is a catalog lookup; AFD_02..AFD_08 share one scan of
+    adjustment_factors_daily merged with prices_daily (SINGLE_PASS_SQL).
+    The scan's time is attributed to AFD_02.
+
     Assumptions:
       - stocks_research.adjustment_factors_daily has columns:
-          security_id, trading_date, price_factor
+          security_id, trade_date, price_factor
       - stocks_research.prices_daily has:
-          security_id, trading_date
+          security_id, trade_date
       - stocks_research.securities has:
           security_id
     """
     conn = _get_conn(ctx)
     results: List[CheckResult] = []
 
-    def run_check(
-        check_id: str,
-        description: str,
-        count_sql: str,
-        sample_sql: str,
-        hint: str,
-        params: Optional[Sequence[Any]] = None,
-    ):
-        violations = int(_fetch_val(conn, count_sql, params) or 0)
-        sample_rows = []
-        if violations > 0:
-            sample_rows = _fetch_dicts(conn, sample_sql + f" LIMIT {max_samples}", params)
-        results.append(
-            CheckResult(
-                check_id=check_id,
-                description=description,
-                ok=(violations == 0),
-                violations=violations,
-                sample_rows=sample_rows,
-                hint=hint,
-            )
-        )
-
     # ----------------------------
     # AFD_01: Table exists
     # ----------------------------
-    run_check(
-        "AFD_01_TABLE_EXISTS",
-        "adjustment_factors_daily table exists",
+    t0 = time.perf_counter()
+    missing = int(_fetch_val(
+        conn,
         """
         SELECT CASE WHEN EXISTS (
             SELECT 1
@@ -131,245 +317,110 @@ def validate_adjustment_factors_daily(ctx: Any, *, max_samples: int = 20) -> Lis
               AND table_name='adjustment_factors_daily'
         ) THEN 0 ELSE 1 END
         """,
-        """
-        SELECT 'missing_table' AS problem
-        """,
-        hint="Run the Phase 4A migrations that create stocks_research.adjustment_factors_daily.",
+    ))
+    results.append(
+        CheckResult(
+            check_id="AFD_01_TABLE_EXISTS",
+            description="adjustment_factors_daily table exists",
+            ok=(missing == 0),
+            violations=missing,
+            sample_rows=[{"problem": "missing_table"}] if missing else [],
+            hint="Run the Phase 4A migrations that create stocks_research.adjustment_factors_daily.",
+            seconds=time.perf_counter() - t0,
+        )
     )
 
     # If table missing, stop early (other checks will error).
-    if results[-1].ok is False:
+    if missing:
         return results
 
     # ----------------------------
-    # AFD_02: No duplicate (security_id, trading_date)
-    # ----------------------------
-    run_check(
-        "AFD_02_NO_DUPLICATES",
-        "No duplicate rows for (security_id, trading_date)",
-        """
-        SELECT COUNT(*) FROM (
-            SELECT security_id, trading_date, COUNT(*) AS c
-            FROM stocks_research.adjustment_factors_daily
-            GROUP BY security_id, trading_date
-            HAVING COUNT(*) > 1
-        ) t
-        """,
-        """
-        SELECT security_id, trading_date, COUNT(*) AS count_rows
-        FROM stocks_research.adjustment_factors_daily
-        GROUP BY security_id, trading_date
-        HAVING COUNT(*) > 1
-        ORDER BY count_rows DESC, security_id, trading_date
-        """,
-        hint="Enforce uniqueness with a PK/UNIQUE index and ensure your build is idempotent.",
-    )
-
-    # ----------------------------
-    # AFD_03: FK to securities (no orphan security_id)
+    # AFD_02..AFD_08: one shared pass
     # ----------------------------
-    run_check(
-        "AFD_03_FK_SECURITIES",
-        "All security_id in adjustment_factors_daily exist in securities",
-        """
-        SELECT COUNT(*)
-        FROM stocks_research.adjustment_factors_daily f
-        LEFT JOIN stocks_research.securities s
-          ON s.security_id = f.security_id
-        WHERE s.security_id IS NULL
-        """,
-        """
-        SELECT f.security_id, MIN(f.trading_date) AS first_date, MAX(f.trading_date) AS last_date, COUNT(*) AS rows
-        FROM stocks_research.adjustment_factors_daily f
-        LEFT JOIN stocks_research.securities s
-          ON s.security_id = f.security_id
-        WHERE s.security_id IS NULL
-        GROUP BY f.security_id
-        ORDER BY rows DESC, f.security_id
-        """,
-        hint="Your builder produced factors for a security_id that is not in the master table. Fix security universe linkage.",
-    )
+    scan = scan_adjustment_factors_daily(conn, max_samples=max_samples, scope=scope)
+    counts = [scan.counts[c] for c in SCAN_CHECK_IDS]
+    samples = [scan.samples[c] for c in SCAN_CHECK_IDS + ["AFD_08_PIECEWISE_CONSTANT_HEURISTIC"]]
+    afd_08 = piecewise_violation(scan.n_changes, scan.n_total)
+
+    checks = [
+        (
+            "AFD_02_NO_DUPLICATES",
+            "No duplicate rows for (security_id, trade_date)",
+            counts[0],
+            "Enforce uniqueness with a PK/UNIQUE index and ensure your build is idempotent.",
+        ),
+        (
+            "AFD_03_FK_SECURITIES",
+            "All security_id in adjustment_factors_daily exist in securities",
+            counts[1],
+            "Your builder produced factors for a security_id that is not in the master table. Fix security universe linkage.",
+        ),
+        (
+            "AFD_04_SUBSET_OF_PRICES",
+            "Every (security_id, trade_date) in factors exists in prices_daily",
+            counts[2],
+            "Your factor generator emitted dates not present in prices_daily (calendar mismatch or off-by-one effective date mapping).",
+        ),
+        (
+            "AFD_05_COVERAGE_PARITY",
+            "For each security, factor row count matches prices_daily row count",
+            counts[3],
+            "Factors must have exactly one row per trading day for every security with prices. Rebuild factors for missing days.",
+        ),
+        (
+            "AFD_06_FACTOR_POSITIVE",
+            "factor is non-null and strictly > 0",
+            counts[4],
+            "Factor must be > 0. Null/zero/negative indicates a broken event multiplier (split ratio/dividend math).",
+        ),
+        (
+            "AFD_07_ANCHOR_NORMALIZED",
+            "Latest trade_date per security has factor = 1.0 (within tolerance)",
+            counts[5],
+            "If you intend backward-adjusted normalization, latest factor should be exactly 1.0. If you used a different anchor, change this check accordingly.",
+        ),
+        # NOTE: This check is heuristic and should be WARN in output if you support it.
+        (
+            "AFD_08_PIECEWISE_CONSTANT_HEURISTIC",
+            "Heuristic: factor changes should be rare (indicates stable behavior between events)",
+            afd_08,
+            "If >5% of rows change factor, something is likely wrong (double-compounding, date alignment, or float instability). If you have many distributions, loosen threshold.",
+        ),
+    ]
 
-    # ----------------------------
-    # AFD_04: Factors only on trading days that exist in prices_daily
-    # ----------------------------
-    run_check(
-        "AFD_04_SUBSET_OF_PRICES",
-        "Every (security_id, trading_date) in factors exists in prices_daily",
-        """
-        SELECT COUNT(*)
-        FROM stocks_research.adjustment_factors_daily f
-        LEFT JOIN stocks_research.prices_daily p
-          ON p.security_id = f.security_id
-         AND p.trading_date = f.trading_date
-        WHERE p.security_id IS NULL
-        """,
-        """
-        SELECT f.security_id, f.trading_date, f.factor
-        FROM stocks_research.adjustment_factors_daily f
-        LEFT JOIN stocks_research.prices_daily p
-          ON p.security_id = f.security_id
-         AND p.trading_date = f.trading_date
-        WHERE p.security_id IS NULL
-        ORDER BY f.security_id, f.trading_date
-        """,
-        hint="Your factor generator emitted dates not present in prices_daily (calendar mismatch or off-by-one effective date mapping).",
-    )
+    for i, (check_id, description, violations, hint) in enumerate(checks):
+        results.append(
+            CheckResult(
+                check_id=check_id,
+                description=description,
+                ok=(violations == 0),
+                violations=violations,
+                sample_rows=samples[i] if violations else [],
+                hint=hint,
+                seconds=scan.seconds if i == 0 else 0.0,
+            )
+        )
 
-    # ----------------------------
-    # AFD_05: Coverage parity per security (counts match)
-    # ----------------------------
-    run_check(
-        "AFD_05_COVERAGE_PARITY",
-        "For each security, factor row count matches prices_daily row count",
-        """
-        SELECT COUNT(*) FROM (
-            SELECT p.security_id
-            FROM (
-                SELECT security_id, COUNT(*) AS n_prices
-                FROM stocks_research.prices_daily
-                GROUP BY security_id
-            ) p
-            LEFT JOIN (
-                SELECT security_id, COUNT(*) AS n_factors
-                FROM stocks_research.adjustment_factors_daily
-                GROUP BY security_id
-            ) f
-              ON f.security_id = p.security_id
-            WHERE COALESCE(f.n_factors, 0) <> p.n_prices
-        ) t
-        """,
-        """
-        SELECT
-            p.security_id,
-            p.n_prices,
-            COALESCE(f.n_factors, 0) AS n_factors
-        FROM (
-            SELECT security_id, COUNT(*) AS n_prices
-            FROM stocks_research.prices_daily
-            GROUP BY security_id
-        ) p
-        LEFT JOIN (
-            SELECT security_id, COUNT(*) AS n_factors
-            FROM stocks_research.adjustment_factors_daily
-            GROUP BY security_id
-        ) f
-          ON f.security_id = p.security_id
-        WHERE COALESCE(f.n_factors, 0) <> p.n_prices
-        ORDER BY p.security_id
-        """,
-        hint="Factors must have exactly one row per trading day for every security with prices. Rebuild factors for missing days.",
-    )
+    return results
 
-    # ----------------------------
-    # AFD_06: Factor domain (positive and non-null)
-    # ----------------------------
-    run_check(
-        "AFD_06_FACTOR_POSITIVE",
-        "factor is non-null and strictly > 0",
-        """
-        SELECT COUNT(*)
-        FROM stocks_research.adjustment_factors_daily
-        WHERE price_factor IS NULL OR price_factor <= 0
-        """,
-        """
-        SELECT security_id, trading_date, price_factor
-        FROM stocks_research.adjustment_factors_daily
-        WHERE price_factor IS NULL OR price_factor <= 0
-        ORDER BY security_id, trading_date
-        """,
-        hint="Factor must be > 0. Null/zero/negative indicates a broken event multiplier (split ratio/dividend math).",
-    )
 
-    # ----------------------------
-    # AFD_07: Anchor normalization (latest date factor ~= 1.0)
-    # ----------------------------
-    run_check(
-        "AFD_07_ANCHOR_NORMALIZED",
-        "Latest trading_date per security has factor = 1.0 (within tolerance)",
-        """
-        WITH latest AS (
-            SELECT security_id, MAX(trading_date) AS max_date
-            FROM stocks_research.adjustment_factors_daily
-            GROUP BY security_id
+def to_validation_result(results: List[CheckResult]) -> ValidationResult:
+    return ValidationResult([
+        ValidationCheck(
+            name=f"{r.check_id}: {r.description}",
+            passed=r.ok,
+            details=None if r.ok else f"{r.violations} violations; samples: {r.sample_rows[:3]}",
+            seconds=r.seconds,
         )
-        SELECT COUNT(*)
-        FROM latest l
-        JOIN stocks_research.adjustment_factors_daily f
-          ON f.security_id = l.security_id
-         AND f.trading_date = l.max_date
-        WHERE ABS(f.price_factor - 1.0) > 1e-12
-        """,
-        """
-        WITH latest AS (
-            SELECT security_id, MAX(trading_date) AS max_date
-            FROM stocks_research.adjustment_factors_daily
-            GROUP BY security_id
-        )
-        SELECT f.security_id, f.trading_date, f.price_factor
-        FROM latest l
-        JOIN stocks_research.adjustment_factors_daily f
-          ON f.security_id = l.security_id
-         AND f.trading_date = l.max_date
-        WHERE ABS(f.price_factor - 1.0) > 1e-12
-        ORDER BY f.security_id
-        """,
-        hint="If you intend backward-adjusted normalization, latest factor should be exactly 1.0. If you used a different anchor, change this check accordingly.",
-    )
+        for r in results
+    ])
 
-    # ----------------------------
-    # AFD_08: Piecewise constancy (most days factor should not change)
-    # NOTE: This check is heuristic and should be WARN in output if you support it.
-    # We'll still report it as a normal check result; your validate runner can treat it as WARN if desired.
-    # ----------------------------
-    run_check(
-        "AFD_08_PIECEWISE_CONSTANT_HEURISTIC",
-        "Heuristic: factor changes should be rare (indicates stable behavior between events)",
-        """
-        WITH deltas AS (
-            SELECT
-                security_id,
-                trading_date,
-                price_factor,
-                LAG(price_factor) OVER (PARTITION BY security_id ORDER BY trading_date) AS prev_factor
-            FROM stocks_research.adjustment_factors_daily
-        ),
-        changes AS (
-            SELECT security_id, trading_date
-            FROM deltas
-            WHERE prev_factor IS NOT NULL
-              AND ABS(price_factor - prev_factor) > 1e-12
-        ),
-        counts AS (
-            SELECT
-                (SELECT COUNT(*) FROM changes) AS n_changes,
-                (SELECT COUNT(*) FROM stocks_research.adjustment_factors_daily) AS n_total
-        )
-        SELECT CASE
-            WHEN (SELECT n_total FROM counts) = 0 THEN 0
-            WHEN (SELECT n_changes FROM counts)::float / (SELECT n_total FROM counts)::float > 0.05 THEN 1
-            ELSE 0
-        END
-        """,
-        """
-        WITH deltas AS (
-            SELECT
-                security_id,
-                trading_date,
-                price_factor,
-                LAG(price_factor) OVER (PARTITION BY security_id ORDER BY trading_date) AS prev_factor
-            FROM stocks_research.adjustment_factors_daily
-        )
-        SELECT security_id, trading_date, prev_factor, price_factor
-        FROM deltas
-        WHERE prev_factor IS NOT NULL
-          AND ABS(price_factor - prev_factor) > 1e-12
-        ORDER BY security_id, trading_date
-        """,
-        hint="If >5% of rows change factor, something is likely wrong (double-compounding, date alignment, or float instability). If you have many distributions, loosen threshold.",
-    )
 
-    return results
+def run_adjustment_factors_daily(conn, scope: Optional[ValidationScope] = None) -> ValidationResult:
+    """
+    validate_runner entrypoint.
+    """
+    return to_validation_result(validate_adjustment_factors_daily(conn, scope=scope))
 
 
 def assert_ok(results: List[CheckResult]) -> None:
@@ -0,0 +1,133 @@
+"""
+In-pipeline sanity checks for daily bars, run on each fetched BarBatch
+(src/providers/massive/bars.py) before it is written.
+
+Checks are vectorized over the batch with numpy:
+
+  reject (quarantined instead of written):
+    missing_price       any of o/h/l/c missing
+    nonpositive_price   any of o/h/l/c <= 0
+    high_below_low      h < l
+    ohlc_inconsistent   h below max(o, c) or l above min(o, c)
+    negative_volume     v < 0
+    duplicate_date      same UTC trade date as an earlier bar in the batch
+
+  warn (written, and recorded for review):
+    price_spike         close/previous close outside [1/R, R]; often an
+                        unrecorded split (BAR_PRICE_SPIKE_RATIO, 1.8)
+    volume_spike        v above K x the batch median volume
+                        (BAR_VOLUME_SPIKE_X, 25; batches of 20+ bars)
+
+BAR_CHECKS_MODE:
+  quarantine  rejects go to ingestion.rejects instead of prices_daily (default)
+  warn        everything is written; issues are recorded
+  off         no checks
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.providers.massive.bars import MS_PER_DAY, BarBatch
+
+REJECT = "reject"
+WARN = "warn"
+
+
+def checks_mode() -> str:
+    mode = os.getenv("BAR_CHECKS_MODE", "quarantine").lower()
+    if mode not in ("quarantine", "warn", "off"):
+        raise RuntimeError(f"Unknown BAR_CHECKS_MODE: {mode}")
+    return mode
+
+
+@dataclass
+class BarCheckResult:
+    keep: BarBatch
+    # (bar in provider shape, "reason[,reason...]", severity)
+    issues: List[Tuple[Dict[str, Any], str, str]] = field(default_factory=list)
+
+    @property
+    def rejected(self) -> int:
+        return sum(1 for _, _, sev in self.issues if sev == REJECT)
+
+    @property
+    def warned(self) -> int:
+        return sum(1 for _, _, sev in self.issues if sev == WARN)
+
+
+def check_bars(
+    bars: BarBatch,
+    prev_close: Optional[float] = None,
+    mode: Optional[str] = None,
+) -> BarCheckResult:
+    """
+    Check one ticker's batch. prev_close (the last stored close) lets the
+    spike check cover the first bar of an incremental batch.
+    """
+    mode = mode or checks_mode()
+    if mode == "off" or not len(bars):
+        return BarCheckResult(keep=bars)
+
+    prices = bars.prices()
+    o, h, l, c = (prices[:, i] for i in range(4))
+    v, t = bars.volume, bars.t
+    n = len(bars)
+
+    reasons: Dict[str, np.ndarray] = {}
+    with np.errstate(invalid="ignore", divide="ignore"):
+        reasons["missing_price"] = np.isnan(prices).any(axis=1)
+        reasons["nonpositive_price"] = (prices <= 0).any(axis=1)
+        reasons["high_below_low"] = h < l
+        reasons["ohlc_inconsistent"] = (h < np.fmax(o, c) - 1e-9) | (l > np.fmin(o, c) + 1e-9)
+        reasons["negative_volume"] = v < 0
+
+        dup = np.zeros(n, dtype=bool)
+        _, first = np.unique(t // MS_PER_DAY, return_index=True)
+        dup[np.setdiff1d(np.arange(n), first)] = True
+        reasons["duplicate_date"] = dup
+
+        bad = np.zeros(n, dtype=bool)
+        for m in reasons.values():
+            bad |= m
+
+        # Soft checks over the good bars, in date order
+        warnings: Dict[str, np.ndarray] = {}
+        ratio_limit = float(os.getenv("BAR_PRICE_SPIKE_RATIO", "1.8"))
+        good = np.flatnonzero(~bad)
+        good = good[np.argsort(t[good], kind="stable")]
+        spike = np.zeros(n, dtype=bool)
+        if good.size:
+            closes = c[good]
+            prev = np.concatenate(([prev_close if prev_close else np.nan], closes[:-1]))
+            r = closes / prev
+            spike[good] = (r > ratio_limit) | (r < 1 / ratio_limit)
+        warnings["price_spike"] = spike
+
+        vol_x = float(os.getenv("BAR_VOLUME_SPIKE_X", "25"))
+        vspike = np.zeros(n, dtype=bool)
+        if good.size >= 20:
+            positive = v[good][v[good] > 0]
+            if positive.size:
+                vspike[good] = v[good] > vol_x * np.median(positive)
+        warnings["volume_spike"] = vspike
+
+    flagged = bad.copy()
+    for m in warnings.values():
+        flagged |= m
+
+    issues = []
+    for i in np.flatnonzero(flagged):
+        if bad[i]:
+            names = [k for k, m in reasons.items() if m[i]]
+            issues.append((bars.row(i), ",".join(names), REJECT))
+        else:
+            names = [k for k, m in warnings.items() if m[i]]
+            issues.append((bars.row(i), ",".join(names), WARN))
+
+    keep = bars.take(~bad) if mode == "quarantine" else bars
+    return BarCheckResult(keep=keep, issues=issues)
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
 
 
 # ---------------------------------------------------------------------
@@ -83,3 +85,86 @@ def validate_dividend(event: Dict[str, Any]) -> Optional[str]:
         return "missing currency"
 
     return None
+
+
+# ---------------------------------------------------------------------
+# Batch validation
+# ---------------------------------------------------------------------
+#
+# Same rules and messages as validate_split / validate_dividend, evaluated
+# as column masks over the whole batch. The first failing rule wins, as in
+# the per-event functions. Returns (valid_events, [(event, reason), ...]).
+
+def _floats(values: List[Any]) -> np.ndarray:
+    try:
+        return np.array(values, dtype=float)
+    except (TypeError, ValueError):
+        # non-numeric junk: fall back per value, junk -> nan
+        out = np.full(len(values), np.nan)
+        for i, v in enumerate(values):
+            try:
+                out[i] = float(v) if v is not None else np.nan
+            except (TypeError, ValueError):
+                pass
+        return out
+
+
+def _present(events: List[Dict[str, Any]], key: str) -> np.ndarray:
+    return np.fromiter((bool(e.get(key)) for e in events), dtype=bool, count=len(events))
+
+
+def _split_batch(
+    events: List[Dict[str, Any]],
+    rules: List[Tuple[np.ndarray, Any]],
+) -> Tuple[List[Dict[str, Any]], List[Tuple[Dict[str, Any], str]]]:
+    n = len(events)
+    failed = np.zeros(n, dtype=bool)
+    reason_idx = np.full(n, -1)
+    for k, (mask, _) in enumerate(rules):
+        new = mask & ~failed
+        reason_idx[new] = k
+        failed |= new
+
+    valid = [events[i] for i in np.flatnonzero(~failed)]
+    invalid = []
+    for i in np.flatnonzero(failed):
+        reason = rules[reason_idx[i]][1]
+        invalid.append((events[i], reason(events[i]) if callable(reason) else reason))
+    return valid, invalid
+
+
+def validate_splits(events: List[Dict[str, Any]]):
+    """
+    Batch form of validate_split.
+    """
+    if not events:
+        return [], []
+    to = _floats([e.get("split_to") for e in events])
+    frm = _floats([e.get("split_from") for e in events])
+    missing_ratio = np.isnan(to) | np.isnan(frm)
+    with np.errstate(invalid="ignore"):
+        bad_ratio = ~missing_ratio & ((to <= 0) | (frm <= 0))
+    return _split_batch(events, [
+        (~_present(events, "id"), "missing id"),
+        (~_present(events, "execution_date"), "missing execution_date"),
+        (missing_ratio, "missing split_to or split_from"),
+        (bad_ratio, lambda e: f"invalid split ratio: {e.get('split_to')}:{e.get('split_from')}"),
+    ])
+
+
+def validate_dividends(events: List[Dict[str, Any]]):
+    """
+    Batch form of validate_dividend.
+    """
+    if not events:
+        return [], []
+    cash = _floats([e.get("cash_amount") for e in events])
+    with np.errstate(invalid="ignore"):
+        nonpositive = ~np.isnan(cash) & (cash <= 0)
+    return _split_batch(events, [
+        (~_present(events, "id"), "missing id"),
+        (~_present(events, "ex_dividend_date"), "missing ex_dividend_date"),
+        (np.isnan(cash), "missing cash_amount"),
+        (nonpositive, lambda e: f"non-positive cash_amount: {e.get('cash_amount')}"),
+        (~_present(events, "currency"), "missing currency"),
+    ])
@@ -0,0 +1,232 @@
+"""
+Sampling validation for the very large tables (prices_daily,
+adjustment_factors_daily).
+
+Two kinds of sample:
+  - security-level: a random set of security_ids is fed through the
+    (scoped) exact check, so per-security invariants such as AFD_05
+    coverage parity and AFD_08 piecewise constancy stay exact within
+    each sampled security
+  - row-level: TABLESAMPLE SYSTEM for row-local checks (orphans)
+
+Each sampled check reports a violation-rate estimate with a Wilson score
+interval. When a sample finds any violation, the exact check runs
+automatically and its result is what gates. Intervals treat sampled units
+as independent; rows cluster by block and by security, so read row-level
+bounds as optimistic.
+
+Every sample draws a fresh random seed, so successive runs look at
+different securities and blocks. The seed is printed with each estimate;
+VALIDATE_SAMPLE_SEED=<seed> reproduces that run's sample.
+
+Knobs:
+  VALIDATE_SAMPLE_SECURITIES  securities per security-level sample (200)
+  VALIDATE_SAMPLE_PERCENT     TABLESAMPLE percentage (1.0)
+  VALIDATE_SAMPLE_SEED        fixed seed (default: random per sample)
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import random
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from src.ingest.validate_base import ValidationCheck, ValidationResult, ValidationScope
+from src.ingest.validate.adjustment_factors_daily import (
+    CHECK_UNITS,
+    piecewise_violation,
+    run_adjustment_factors_daily,
+    scan_adjustment_factors_daily,
+)
+
+SAMPLED_TABLES = {"prices_daily", "adjustment_factors_daily"}
+
+DEFAULT_SAMPLE_SECURITIES = int(os.getenv("VALIDATE_SAMPLE_SECURITIES", "200"))
+DEFAULT_SAMPLE_PERCENT = float(os.getenv("VALIDATE_SAMPLE_PERCENT", "1.0"))
+
+Z_95 = 1.959964
+
+
+def sample_seed(seed: Optional[int] = None) -> int:
+    """
+    `seed`, else VALIDATE_SAMPLE_SEED, else a fresh random seed.
+    """
+    if seed is not None:
+        return seed
+    env = os.getenv("VALIDATE_SAMPLE_SEED")
+    if env:
+        return int(env)
+    return random.randrange(1, 2**31 - 1)
+
+
+# ----------------------------
+# Estimates
+# ----------------------------
+
+def wilson_interval(k: int, n: int, z: float = Z_95) -> Tuple[float, float]:
+    """
+    Wilson score interval for a binomial proportion k/n.
+    """
+    if n == 0:
+        return 0.0, 1.0
+    p = k / n
+    denom = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+
+@dataclass
+class SampleEstimate:
+    check: str
+    violations: int
+    n: int
+    unit: str
+    seed: Optional[int] = None
+
+    @property
+    def rate(self) -> float:
+        return self.violations / self.n if self.n else 0.0
+
+    @property
+    def bounds(self) -> Tuple[float, float]:
+        return wilson_interval(self.violations, self.n)
+
+    def describe(self) -> str:
+        lo, hi = self.bounds
+        return (
+            f"sampled {self.n} {self.unit}: {self.violations} violations, "
+            f"rate {self.rate:.4%} (95% CI {lo:.4%}–{hi:.4%})"
+            + (f", seed {self.seed}" if self.seed is not None else "")
+        )
+
+
+# ----------------------------
+# Sample selection
+# ----------------------------
+
+def sample_security_ids(
+    conn,
+    n: int,
+    scope: Optional[ValidationScope] = None,
+    seed: Optional[int] = None,
+) -> List[int]:
+    """
+    Uniform random sample of up to n security_ids, drawn from the scope's
+    security_ids when it has them.
+    """
+    if scope is not None and scope.security_ids is not None:
+        population = list(scope.security_ids)
+    else:
+        with conn.cursor() as cur:
+            cur.execute("SELECT security_id FROM stocks_research.securities")
+            population = [r[0] for r in cur.fetchall()]
+
+    if len(population) <= n:
+        return population
+    return random.Random(seed).sample(population, n)
+
+
+# ----------------------------
+# Sampled checks
+# ----------------------------
+
+def sampled_adjustment_factors_daily(
+    conn,
+    scope: Optional[ValidationScope] = None,
+    sample_size: Optional[int] = None,
+    seed: Optional[int] = None,
+) -> ValidationResult:
+    """
+    AFD_02..AFD_08 on a security-level sample; escalates to the exact
+    (scoped) check when the sample shows any violation.
+    """
+    sample_size = sample_size or DEFAULT_SAMPLE_SECURITIES
+    seed = sample_seed(seed)
+    # Drawn from securities, so AFD_03 cannot see orphans here; the
+    # TABLESAMPLE orphan check on adjustment_factors_daily covers them.
+    ids = sample_security_ids(conn, sample_size, scope, seed)
+    scan = scan_adjustment_factors_daily(conn, scope=ValidationScope(security_ids=ids))
+
+    estimates = [
+        SampleEstimate(
+            check=check_id,
+            violations=violations,
+            n=scan.n_total if CHECK_UNITS[check_id] == "rows" else scan.n_securities,
+            unit=CHECK_UNITS[check_id],
+            seed=seed,
+        )
+        for check_id, violations in scan.counts.items()
+    ]
+    changes = SampleEstimate("AFD_08_PIECEWISE_CONSTANT_HEURISTIC", scan.n_changes, scan.n_total, "rows", seed)
+    afd_08 = piecewise_violation(scan.n_changes, scan.n_total)
+
+    if any(e.violations for e in estimates) or afd_08:
+        found = ", ".join(e.check for e in estimates if e.violations) or changes.check
+        exact = run_adjustment_factors_daily(conn, scope)
+        return ValidationResult([
+            ValidationCheck(
+                name="adjustment_factors_daily sample",
+                passed=True,
+                details=f"violations in sample ({found}, seed {seed}); escalated to exact check",
+                seconds=scan.seconds,
+            ),
+            *exact.checks,
+        ])
+
+    checks = [
+        ValidationCheck(
+            name=f"{e.check} (sampled)",
+            passed=True,
+            details=e.describe(),
+            seconds=scan.seconds if i == 0 else 0.0,
+        )
+        for i, e in enumerate(estimates)
+    ]
+    checks.append(
+        ValidationCheck(
+            name=f"{changes.check} (sampled)",
+            passed=True,
+            details=f"change {changes.describe()}; threshold 5%",
+            seconds=0.0,
+        )
+    )
+    return ValidationResult(checks)
+
+
+def sampled_orphan_count(
+    cur,
+    schema: str,
+    table: str,
+    fk_col: str,
+    ref_table: str,
+    percent: float,
+    predicate: str = "",
+    params: Optional[dict] = None,
+    seed: Optional[int] = None,
+) -> SampleEstimate:
+    """
+    Orphan rate on a TABLESAMPLE SYSTEM block sample of `table`. The
+    predicate must use the alias `t`.
+    """
+    seed = sample_seed(seed)
+    params = dict(params or {})
+    params.update({"sample_percent": percent, "sample_seed": seed})
+    cur.execute(
+        f"""
+        SELECT
+            COUNT(*),
+            COUNT(*) FILTER (WHERE r.{fk_col} IS NULL)
+        FROM {schema}.{table} t TABLESAMPLE SYSTEM (%(sample_percent)s) REPEATABLE (%(sample_seed)s)
+        LEFT JOIN {schema}.{ref_table} r
+          ON t.{fk_col} = r.{fk_col}
+        WHERE TRUE{predicate}
+        """,
+        params,
+    )
+    n, k = cur.fetchone()
+    return SampleEstimate(
+        check=f"no orphans: {table}.{fk_col}", violations=int(k or 0), n=int(n or 0), unit="rows", seed=seed
+    )
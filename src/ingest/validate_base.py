@@ -1,5 +1,6 @@
+import time
 from dataclasses import dataclass
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple
 
 
 @dataclass
@@ -7,6 +8,7 @@ class ValidationCheck:
     name: str
     passed: bool
     details: str | None = None
+    seconds: float | None = None
 
 
 @dataclass
@@ -25,9 +27,125 @@ class ValidationResult:
         return ValidationResult(checks)
 
 
-def run_sql_check(conn, *, name: str, sql: str, expect_zero: bool) -> ValidationResult:
+@dataclass(frozen=True)
+class ValidationScope:
+    """
+    Slice of the data a validation run is limited to: a set of security_ids
+    and/or a date range. None fields are unbounded; an empty security_ids
+    list matches nothing.
+    """
+    security_ids: Optional[List[int]] = None
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+
+    @property
+    def is_global(self) -> bool:
+        return self.security_ids is None and self.start_date is None and self.end_date is None
+
+    @classmethod
+    def from_dict(cls, d: Optional[Dict[str, Any]]) -> "ValidationScope":
+        d = d or {}
+        return cls(
+            security_ids=d.get("security_ids"),
+            start_date=d.get("start_date"),
+            end_date=d.get("end_date"),
+        )
+
+    @classmethod
+    def from_job(cls, conn, job_id: str) -> "ValidationScope":
+        """
+        Scope of the rows written by an ingestion job, as recorded in
+        ingestion_job.last_checkpoint by the runner.
+        """
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT last_checkpoint->'scope'
+                FROM ingestion.ingestion_job
+                WHERE job_id = %s
+                """,
+                (job_id,),
+            )
+            row = cur.fetchone()
+        if row is None:
+            raise RuntimeError(f"Unknown ingestion job_id {job_id}")
+        if row[0] is None:
+            raise RuntimeError(f"ingestion job {job_id} recorded no scope")
+        return cls.from_dict(row[0])
+
+    def predicate(
+        self,
+        alias: str,
+        date_column: Optional[str] = None,
+        by_figi: bool = False,
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        " AND ..." SQL fragment restricting `alias` to the scope, plus its
+        params. by_figi resolves security_ids through securities for
+        tables keyed by composite_figi.
+        """
+        sql = ""
+        params: Dict[str, Any] = {}
+        if self.security_ids is not None:
+            params["scope_security_ids"] = list(self.security_ids)
+            if by_figi:
+                sql += (
+                    f" AND {alias}.composite_figi IN ("
+                    "SELECT composite_figi FROM stocks_research.securities "
+                    "WHERE security_id = ANY(%(scope_security_ids)s::bigint[]))"
+                )
+            else:
+                sql += f" AND {alias}.security_id = ANY(%(scope_security_ids)s::bigint[])"
+        if date_column and self.start_date:
+            params["scope_start_date"] = self.start_date
+            sql += f" AND {alias}.{date_column} >= %(scope_start_date)s"
+        if date_column and self.end_date:
+            params["scope_end_date"] = self.end_date
+            sql += f" AND {alias}.{date_column} <= %(scope_end_date)s"
+        return sql, params
+
+
+@dataclass(frozen=True)
+class SqlCheck:
+    """
+    A single independent SQL check. Validators declare these so the runner
+    can schedule each scan on its own connection.
+
+    `sql` may contain a `{scope}` placeholder, filled with the scope
+    predicate for `alias` (empty for a global run). `scoped_sql` replaces
+    `sql` for scoped runs where appending a predicate would change the
+    check's meaning.
+    """
+    name: str
+    sql: str
+    expect_zero: bool = True
+    alias: Optional[str] = None
+    date_column: Optional[str] = None
+    by_figi: bool = False
+    scoped_sql: Optional[str] = None
+
+    def render(self, scope: Optional[ValidationScope] = None) -> Tuple[str, Optional[Dict[str, Any]]]:
+        if scope is None or scope.is_global or self.alias is None:
+            return self.sql.format(scope=""), None
+        predicate, params = scope.predicate(self.alias, self.date_column, self.by_figi)
+        return (self.scoped_sql or self.sql).format(scope=predicate), params
+
+    def run(self, conn, scope: Optional[ValidationScope] = None) -> ValidationResult:
+        sql, params = self.render(scope)
+        return run_sql_check(conn, name=self.name, sql=sql, expect_zero=self.expect_zero, params=params)
+
+
+def run_sql_check(
+    conn,
+    *,
+    name: str,
+    sql: str,
+    expect_zero: bool,
+    params: Optional[Dict[str, Any]] = None,
+) -> ValidationResult:
+    t0 = time.perf_counter()
     with conn.cursor() as cur:
-        cur.execute(sql)
+        cur.execute(sql, params)
         val = cur.fetchone()[0]
 
     passed = (val == 0) if expect_zero else (val > 0)
@@ -38,6 +156,7 @@ def run_sql_check(conn, *, name: str, sql: str, expect_zero: bool) -> Validation
                 name=name,
                 passed=passed,
                 details=None if passed else f"Query returned {val}",
+                seconds=time.perf_counter() - t0,
             )
         ]
     )
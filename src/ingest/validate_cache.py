@@ -0,0 +1,212 @@
+"""
+Validation result cache (ingestion.validation_cache,
+sql/admin/030_validation_cache.sql).
+
+Each cached check is stored with a fingerprint of every table it reads.
+A check whose tables' fingerprints are unchanged returns its stored
+result without touching the data; any change re-runs just that check.
+
+Table fingerprint (all catalog/statistics reads, no scans):
+  - relfilenode               changes on TRUNCATE / rewrite
+  - pg_relation_size          heap growth
+  - reltuples                 row count estimate
+  - n_tup_ins/upd/del         cumulative modification counters
+  - MAX(date column)          only where the date column is indexed
+  - last_job                  latest finished ingestion_job among the
+                              table's writers (WRITER_JOBS)
+  - snapshot                  latest snapshot_table_stats row for the table
+
+Statistics counters reach pg_stat_user_tables asynchronously (up to a
+few seconds after commit). last_job and the indexed max date narrow that
+window for writes made through the runner; writes outside it (bootstrap
+scripts, manual SQL) rely on the counters alone, so validate with
+--no-cache right after them. Disable with VALIDATE_CACHE=0 or
+validate_runner --no-cache.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import asdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from psycopg2.extras import Json, execute_values
+
+from src.ingest.validate_base import ValidationCheck, ValidationResult, ValidationScope
+
+SCHEMA = os.getenv("STOCKS_SCHEMA", "stocks_research")
+
+# Indexed date columns whose maximum is part of the fingerprint
+DATE_FINGERPRINT: Dict[str, str] = {
+    "prices_daily": "trade_date",
+    "adjustment_factors_daily": "trade_date",
+    "fundamentals_quarterly_raw": "report_date",
+}
+
+# Table -> ingestion jobs (ingestion_job.job_name) that write it
+WRITER_JOBS: Dict[str, List[str]] = {
+    "companies": ["universe_sync"],
+    "securities": ["universe_sync"],
+    "ticker_history": ["universe_sync"],
+    "prices_daily": ["prices_daily"],
+    "corporate_actions": ["corporate_actions"],
+    "adjustment_events": ["adjustment_factors"],
+    "adjustment_factors_daily": ["adjustment_factors"],
+    "fundamentals_quarterly_raw": ["fundamentals_quarterly_raw"],
+    "fundamentals_quarterly_canonical": ["fundamentals_quarterly_canonical"],
+}
+
+
+def cache_enabled() -> bool:
+    return os.getenv("VALIDATE_CACHE", "1") != "0"
+
+
+def cache_available(conn) -> bool:
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('ingestion.validation_cache') IS NOT NULL")
+        return bool(cur.fetchone()[0])
+
+
+def table_fingerprints(conn, tables: Iterable[str]) -> Dict[str, Dict[str, object]]:
+    tables = sorted(set(tables))
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT
+                c.relname,
+                c.relfilenode,
+                pg_relation_size(c.oid),
+                c.reltuples::bigint,
+                s.n_tup_ins,
+                s.n_tup_upd,
+                s.n_tup_del
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+            WHERE n.nspname = %s
+              AND c.relname = ANY(%s)
+            """,
+            (SCHEMA, tables),
+        )
+        out: Dict[str, Dict[str, object]] = {
+            name: {
+                "relfilenode": relfilenode,
+                "size": size,
+                "reltuples": reltuples,
+                "ins": ins,
+                "upd": upd,
+                "del": dele,
+            }
+            for name, relfilenode, size, reltuples, ins, upd, dele in cur.fetchall()
+        }
+
+        for table in tables:
+            col = DATE_FINGERPRINT.get(table)
+            if col and table in out:
+                cur.execute(f"SELECT MAX({col}) FROM {SCHEMA}.{table}")
+                v = cur.fetchone()[0]
+                out[table]["max_date"] = v.isoformat() if v else None
+
+        writers = sorted({j for t in tables for j in WRITER_JOBS.get(t, [])})
+        cur.execute(
+            """
+            SELECT job_name, MAX(finished_at)
+            FROM ingestion.ingestion_job
+            WHERE job_name = ANY(%s)
+              AND finished_at IS NOT NULL
+            GROUP BY job_name
+            """,
+            (writers,),
+        )
+        finished = {name: finished_at for name, finished_at in cur.fetchall()}
+        for table in tables:
+            done = [finished[j] for j in WRITER_JOBS.get(table, []) if j in finished]
+            if done and table in out:
+                out[table]["last_job"] = max(done).isoformat()
+
+        cur.execute(
+            """
+            SELECT DISTINCT ON (s.table_name)
+                s.table_name, s.snapshot_id::text, s.row_count, s.max_date
+            FROM ingestion.snapshot_table_stats s
+            JOIN ingestion.snapshot_tag g ON g.snapshot_id = s.snapshot_id
+            WHERE s.schema_name = %s
+              AND s.table_name = ANY(%s)
+            ORDER BY s.table_name, g.created_at DESC
+            """,
+            (SCHEMA, tables),
+        )
+        for name, snapshot_id, row_count, max_date in cur.fetchall():
+            if name in out:
+                out[name]["snapshot"] = [snapshot_id, row_count, max_date.isoformat() if max_date else None]
+
+    return out
+
+
+def combined_fingerprint(fingerprints: Dict[str, Dict[str, object]], tables: Iterable[str]) -> str:
+    payload = {t: fingerprints.get(t) for t in sorted(set(tables))}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def scope_key(scope: Optional[ValidationScope], sample: bool = False) -> str:
+    if scope is None or scope.is_global:
+        key = "global"
+    else:
+        ids = sorted(scope.security_ids) if scope.security_ids is not None else None
+        key = hashlib.sha256(
+            json.dumps([ids, scope.start_date, scope.end_date]).encode()
+        ).hexdigest()[:16]
+    return f"{key}:sample" if sample else key
+
+
+def load(conn, names: List[str], key: str) -> Dict[str, Tuple[str, ValidationResult]]:
+    """
+    check name -> (fingerprint, cached result)
+    """
+    if not names:
+        return {}
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT check_name, fingerprint, result_json
+            FROM ingestion.validation_cache
+            WHERE scope_key = %s
+              AND check_name = ANY(%s)
+            """,
+            (key, names),
+        )
+        return {
+            name: (fp, ValidationResult([ValidationCheck(**c) for c in result]))
+            for name, fp, result in cur.fetchall()
+        }
+
+
+def store(conn, key: str, entries: List[Tuple[str, str, List[str], ValidationResult]]):
+    """
+    entries: (check name, fingerprint, tables, result)
+    """
+    if not entries:
+        return
+    with conn.cursor() as cur:
+        execute_values(
+            cur,
+            """
+            INSERT INTO ingestion.validation_cache (
+                check_name, scope_key, fingerprint, tables, result_json, passed, checked_at
+            )
+            VALUES %s
+            ON CONFLICT (check_name, scope_key) DO UPDATE SET
+                fingerprint = EXCLUDED.fingerprint,
+                tables      = EXCLUDED.tables,
+                result_json = EXCLUDED.result_json,
+                passed      = EXCLUDED.passed,
+                checked_at  = EXCLUDED.checked_at
+            """,
+            [
+                (name, key, fp, sorted(set(tables)), Json([asdict(c) for c in result.checks]), result.ok)
+                for name, fp, tables, result in entries
+            ],
+            template="(%s, %s, %s, %s, %s, %s, now())",
+        )
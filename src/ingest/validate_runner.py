@@ -1,15 +1,25 @@
 from __future__ import annotations
 
-from src.ingest.validate_base import ValidationResult
-from src.ingest.validate.corporate_actions import validate_corporate_actions
-from src.ingest.validate.fundamentals_quarterly_raw import (
-    validate_fundamentals_quarterly_raw,
+from src.ingest.validate_base import ValidationCheck, ValidationResult, ValidationScope
+from src.ingest.validate import corporate_actions as corporate_actions_checks
+from src.ingest.validate.adjustment_factors_daily import run_adjustment_factors_daily
+from src.ingest.validate.sampling import (
+    DEFAULT_SAMPLE_PERCENT,
+    SAMPLED_TABLES,
+    sampled_adjustment_factors_daily,
+    sampled_orphan_count,
 )
+from src.ingest.validate import fundamentals_quarterly_raw as fundamentals_quarterly_raw_checks
+from src.ingest import validate_cache
 
+import argparse
 import os
 import sys
-import psycopg2
-from typing import Dict, List
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from psycopg2.pool import ThreadedConnectionPool
 
 from common import getenv
 from dotenv import load_dotenv
@@ -23,6 +33,9 @@ load_dotenv()
 
 SCHEMA = os.getenv("STOCKS_SCHEMA", "stocks_research")
 
+# Independent checks run concurrently on pooled connections.
+DEFAULT_PARALLELISM = int(os.getenv("VALIDATE_PARALLELISM", "4"))
+
 JOBS: Dict[str, Dict[str, List[str]]] = {
     "prices_daily": {
         "requires_tables": [
@@ -73,6 +86,37 @@ JOBS: Dict[str, Dict[str, List[str]]] = {
     },
 }
 
+# Phase-specific semantic checks: (name, fn(conn, scope) -> ValidationResult),
+# one entry per independent scan
+SEMANTIC_CHECKS: Dict[str, List[Tuple[str, Callable]]] = {
+    "corporate_actions": [(c.name, c.run) for c in corporate_actions_checks.CHECKS],
+    "adjustment_factors_daily": [
+        ("adjustment_factors_daily single-pass invariants", run_adjustment_factors_daily),
+    ],
+    "fundamentals_quarterly_raw": [(c.name, c.run) for c in fundamentals_quarterly_raw_checks.CHECKS],
+}
+
+# Tables read by each job's semantic checks (validation cache fingerprints)
+SEMANTIC_TABLES: Dict[str, List[str]] = {
+    "corporate_actions": ["corporate_actions", "securities"],
+    "adjustment_factors_daily": ["adjustment_factors_daily", "prices_daily", "securities"],
+    "fundamentals_quarterly_raw": ["fundamentals_quarterly_raw", "securities"],
+}
+
+# Sampling-mode replacements (same names, so they take the exact check's slot)
+SAMPLED_SEMANTIC_CHECKS: Dict[str, List[Tuple[str, Callable]]] = {
+    "adjustment_factors_daily": [
+        ("adjustment_factors_daily single-pass invariants", sampled_adjustment_factors_daily),
+    ],
+}
+
+# Date column used when an orphan check is limited to a scope's date range
+DATE_COLUMNS: Dict[str, str] = {
+    "prices_daily": "trade_date",
+    "corporate_actions": "action_date",
+    "adjustment_factors_daily": "trade_date",
+}
+
 
 
 # -----------------------------
@@ -92,22 +136,22 @@ def table_exists(cur, schema: str, table: str) -> bool:
     return cur.fetchone() is not None
 
 
-def require_tables_exist(cur, schema: str, tables: List[str]):
+def require_tables_exist(cur, schema: str, tables: List[str]) -> str:
     for t in tables:
         if not table_exists(cur, schema, t):
             raise RuntimeError(f"Missing required table: {schema}.{t}")
-        print(f"✔ table exists: {schema}.{t}")
+    return f"tables exist: {', '.join(f'{schema}.{t}' for t in tables)}"
 
 
-def require_nonempty_table(cur, schema: str, table: str):
+def require_nonempty_table(cur, schema: str, table: str) -> str:
     cur.execute(f"SELECT COUNT(*) FROM {schema}.{table}")
     count = cur.fetchone()[0]
     if count == 0:
         raise RuntimeError(f"{schema}.{table} is empty")
-    print(f"✔ {schema}.{table} has {count} rows")
+    return f"{schema}.{table} has {count} rows"
 
 
-def require_active_tickers(cur, schema: str):
+def require_active_tickers(cur, schema: str) -> str:
     cur.execute(
         f"""
         SELECT COUNT(*)
@@ -118,10 +162,10 @@ def require_active_tickers(cur, schema: str):
     count = cur.fetchone()[0]
     if count == 0:
         raise RuntimeError("No active tickers found in ticker_history")
-    print(f"✔ {count} active tickers found")
+    return f"{count} active tickers found"
 
 
-def require_unique_ticker_resolution(cur, schema: str):
+def require_unique_ticker_resolution(cur, schema: str) -> str:
     cur.execute(
         f"""
         SELECT ticker, COUNT(DISTINCT security_id)
@@ -138,7 +182,7 @@ def require_unique_ticker_resolution(cur, schema: str):
             "Ticker resolution error: each active ticker must map to exactly one "
             f"security_id. Examples: {examples}"
         )
-    print("✔ all active tickers resolve to exactly one security_id")
+    return "all active tickers resolve to exactly one security_id"
 
 
 def require_no_orphans(
@@ -147,15 +191,20 @@ def require_no_orphans(
     table: str,
     fk_col: str,
     ref_table: str,
-):
+    scope: Optional[ValidationScope] = None,
+) -> str:
+    predicate, params = "", None
+    if scope is not None and not scope.is_global:
+        predicate, params = scope.predicate("t", DATE_COLUMNS.get(table))
     cur.execute(
         f"""
         SELECT COUNT(*)
         FROM {schema}.{table} t
         LEFT JOIN {schema}.{ref_table} r
           ON t.{fk_col} = r.{fk_col}
-        WHERE r.{fk_col} IS NULL
-        """
+        WHERE r.{fk_col} IS NULL{predicate}
+        """,
+        params,
     )
     count = cur.fetchone()[0]
     if count != 0:
@@ -163,57 +212,322 @@ def require_no_orphans(
             f"{schema}.{table} contains {count} orphaned rows "
             f"(missing {ref_table}.{fk_col})"
         )
-    print(f"✔ no orphaned rows in {schema}.{table}")
+    return f"no orphaned rows in {schema}.{table}"
+
+
+def require_no_orphans_sampled(
+    cur,
+    schema: str,
+    table: str,
+    fk_col: str,
+    ref_table: str,
+    scope: Optional[ValidationScope] = None,
+) -> str:
+    """
+    Orphan check on a TABLESAMPLE of `table`; any orphan in the sample
+    triggers the exact check.
+    """
+    predicate, params = "", None
+    if scope is not None and not scope.is_global:
+        predicate, params = scope.predicate("t", DATE_COLUMNS.get(table))
+    estimate = sampled_orphan_count(
+        cur, schema, table, fk_col, ref_table, DEFAULT_SAMPLE_PERCENT, predicate, params
+    )
+    if estimate.violations:
+        exact = require_no_orphans(cur, schema, table, fk_col, ref_table, scope)
+        return f"{estimate.describe()}; exact check: {exact}"
+    return estimate.describe()
 
 
 # -----------------------------
-# Job validation
+# Check planning
 # -----------------------------
 
-def validate_job(job_name: str):
-    if job_name not in JOBS:
-        raise RuntimeError(
-            f"Unknown job '{job_name}'. Known jobs: {', '.join(JOBS.keys())}"
-        )
+# (name, fn, tables) where fn(conn) returns a ValidationResult or a success
+# message, and raises on failure. `tables` are the tables the check reads;
+# checks with none (structural) are never cached.
+Check = Tuple[str, Callable, List[str]]
+
 
-    cfg = JOBS[job_name]
+def _cursor_check(fn, *args) -> Callable:
+    def run(conn):
+        with conn.cursor() as cur:
+            return fn(cur, *args)
+    return run
+
+
+def structural_checks(job_names: List[str]) -> List[Check]:
+    tables: List[str] = []
+    for job_name in job_names:
+        for t in JOBS[job_name]["requires_tables"]:
+            if t not in tables:
+                tables.append(t)
+    return [
+        (f"table exists: {SCHEMA}.{t}", _cursor_check(require_tables_exist, SCHEMA, [t]), [])
+        for t in tables
+    ]
+
+
+def invariant_checks(
+    job_names: List[str],
+    scope: Optional[ValidationScope] = None,
+    sample: bool = False,
+) -> List[Check]:
+    """
+    Identity, FK and semantic checks for the given jobs. Checks shared by
+    several jobs are planned once.
+
+    With a scope, FK and semantic checks only look at the scoped slice;
+    the identity checks are cheap and always global. With sample=True,
+    checks over the large tables run on a sample and fall back to the exact
+    check when the sample shows a violation (validate/sampling.py).
+    """
+    checks: List[Check] = [
+        # Identity sanity (global)
+        ("companies non-empty", _cursor_check(require_nonempty_table, SCHEMA, "companies"), ["companies"]),
+        ("securities non-empty", _cursor_check(require_nonempty_table, SCHEMA, "securities"), ["securities"]),
+        ("active tickers present", _cursor_check(require_active_tickers, SCHEMA), ["ticker_history"]),
+        ("unique ticker resolution", _cursor_check(require_unique_ticker_resolution, SCHEMA), ["ticker_history"]),
+    ]
+
+    seen = {name for name, _, _ in checks}
+    for job_name in job_names:
+        # FK integrity
+        for table, fk_col, ref_table in JOBS[job_name].get("orphan_checks", []):
+            name = f"no orphans: {table}.{fk_col} -> {ref_table}"
+            if name not in seen:
+                seen.add(name)
+                orphans = (
+                    require_no_orphans_sampled
+                    if sample and table in SAMPLED_TABLES
+                    else require_no_orphans
+                )
+                checks.append((
+                    name,
+                    _cursor_check(orphans, SCHEMA, table, fk_col, ref_table, scope),
+                    [table, ref_table],
+                ))
+
+        # Phase-specific semantic validation
+        semantic = SEMANTIC_CHECKS.get(job_name, [])
+        if sample:
+            semantic = SAMPLED_SEMANTIC_CHECKS.get(job_name, semantic)
+        for name, fn in semantic:
+            if name not in seen:
+                seen.add(name)
+                checks.append((name, lambda conn, fn=fn: fn(conn, scope), SEMANTIC_TABLES[job_name]))
+
+    return checks
 
-    dsn = getenv("PG_DSN")
-    conn = psycopg2.connect(dsn)
-    conn.autocommit = True
 
+# -----------------------------
+# Concurrent execution
+# -----------------------------
+
+def _execute(pool: ThreadedConnectionPool, check: Check) -> Tuple[ValidationResult, bool]:
+    """
+    Run one check. The flag says whether the outcome reflects the data
+    (pass, or a RuntimeError from a failed invariant) and so may be cached;
+    database and other errors are not.
+    """
+    name, fn, _ = check
+    conn = pool.getconn()
+    t0 = time.perf_counter()
     try:
-        with conn.cursor() as cur:
-            print(f"\nValidating invariants for job: {job_name}\n")
-
-            # Structural checks
-            require_tables_exist(cur, SCHEMA, cfg["requires_tables"])
-
-            # Identity sanity
-            require_nonempty_table(cur, SCHEMA, "companies")
-            require_nonempty_table(cur, SCHEMA, "securities")
-            require_active_tickers(cur, SCHEMA)
-            require_unique_ticker_resolution(cur, SCHEMA)
-
-            # FK integrity
-            for table, fk_col, ref_table in cfg.get("orphan_checks", []):
-                require_no_orphans(cur, SCHEMA, table, fk_col, ref_table)
-
-            # Phase-specific semantic validation
-            if job_name == "fundamentals_quarterly_raw":
-                result = validate_fundamentals_quarterly_raw(conn)
-                if not result.ok:
-                    for check in result.checks:
-                        if not check.passed:
-                            raise RuntimeError(
-                                f"{check.name} failed: {check.details}"
-                            )
-                print("✔ Phase 4B semantic checks passed")
-
-            print(f"\nSAFE TO RUN: {job_name}\n")
+        conn.autocommit = True
+        out = fn(conn)
+    except Exception as e:
+        return ValidationResult([
+            ValidationCheck(name=name, passed=False, details=str(e), seconds=time.perf_counter() - t0)
+        ]), isinstance(e, RuntimeError)
+    finally:
+        pool.putconn(conn)
+
+    if isinstance(out, ValidationResult):
+        return out, True
+    return ValidationResult([
+        ValidationCheck(name=name, passed=True, details=out, seconds=time.perf_counter() - t0)
+    ]), True
+
+
+def _run_check(pool: ThreadedConnectionPool, check: Check) -> ValidationResult:
+    return _execute(pool, check)[0]
 
+
+def _run_checks(pool, executor, checks: List[Check]) -> ValidationResult:
+    # map() keeps the planned order in the report
+    return ValidationResult.combine(list(executor.map(lambda c: _run_check(pool, c), checks)))
+
+
+def _run_checks_cached(pool, executor, checks: List[Check], key: str) -> ValidationResult:
+    """
+    Like _run_checks, but a check whose input tables have the same
+    fingerprints as when its result was cached returns that result; the
+    rest run and refresh the cache.
+    """
+    conn = pool.getconn()
+    try:
+        conn.autocommit = True
+        if not validate_cache.cache_available(conn):
+            print("validation cache: ingestion.validation_cache missing; running uncached")
+            return _run_checks(pool, executor, checks)
+        fingerprints = validate_cache.table_fingerprints(conn, [t for _, _, ts in checks for t in ts])
+        cached = validate_cache.load(conn, [name for name, _, _ in checks], key)
     finally:
-        conn.close()
+        pool.putconn(conn)
+
+    planned = []
+    for check in checks:
+        name, _, tables = check
+        fp = validate_cache.combined_fingerprint(fingerprints, tables) if tables else None
+        hit = cached.get(name)
+        if fp is not None and hit is not None and hit[0] == fp:
+            planned.append((check, fp, hit[1]))
+        else:
+            planned.append((check, fp, None))
+
+    misses = [(check, fp) for check, fp, hit in planned if hit is None]
+    fresh = list(executor.map(lambda m: _execute(pool, m[0]), misses))
+
+    entries = [
+        (check[0], fp, check[2], result)
+        for (check, fp), (result, cacheable) in zip(misses, fresh)
+        if cacheable and fp is not None
+    ]
+    if entries:
+        conn = pool.getconn()
+        try:
+            conn.autocommit = True
+            validate_cache.store(conn, key, entries)
+        finally:
+            pool.putconn(conn)
+
+    results = iter(r for r, _ in fresh)
+    out = []
+    for _, _, hit in planned:
+        if hit is None:
+            out.append(next(results))
+        else:
+            out.append(ValidationResult([
+                ValidationCheck(
+                    name=c.name,
+                    passed=c.passed,
+                    details="(cached)" if c.details is None else f"{c.details} (cached)",
+                    seconds=0.0,
+                )
+                for c in hit.checks
+            ]))
+    return ValidationResult.combine(out)
+
+
+def validate_jobs(
+    job_names: List[str],
+    parallelism: int | None = None,
+    scope: Optional[ValidationScope] = None,
+    job_id: Optional[str] = None,
+    sample: bool = False,
+    use_cache: Optional[bool] = None,
+) -> ValidationResult:
+    """
+    Validate several jobs at once. Structural checks run first; if any table
+    is missing, the remaining checks are skipped. Everything else runs
+    concurrently on up to `parallelism` pooled connections.
+
+    `scope` (or `job_id`, whose recorded scope is used) limits the FK and
+    semantic checks to a slice of the data. `sample` switches the large-table
+    checks to sampling mode. Unless `use_cache` is False (default:
+    VALIDATE_CACHE), checks whose input tables are unchanged since their
+    last run return the cached result (validate_cache.py).
+    """
+    if use_cache is None:
+        use_cache = validate_cache.cache_enabled()
+
+    unknown = [j for j in job_names if j not in JOBS]
+    if unknown:
+        raise RuntimeError(
+            f"Unknown job '{unknown[0]}'. Known jobs: {', '.join(JOBS.keys())}"
+        )
+
+    parallelism = max(1, parallelism or DEFAULT_PARALLELISM)
+    pool = ThreadedConnectionPool(1, parallelism, getenv("PG_DSN"))
+
+    try:
+        if job_id is not None:
+            conn = pool.getconn()
+            try:
+                scope = ValidationScope.from_job(conn, job_id)
+                conn.rollback()
+            finally:
+                pool.putconn(conn)
+
+        with ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix="validate") as executor:
+            result = _run_checks(pool, executor, structural_checks(job_names))
+            if result.ok:
+                checks = invariant_checks(job_names, scope, sample)
+                if use_cache:
+                    key = validate_cache.scope_key(scope, sample)
+                    invariants = _run_checks_cached(pool, executor, checks, key)
+                else:
+                    invariants = _run_checks(pool, executor, checks)
+                result = ValidationResult.combine([result, invariants])
+    finally:
+        pool.closeall()
+
+    return result
+
+
+def describe_scope(scope: Optional[ValidationScope]) -> str:
+    if scope is None or scope.is_global:
+        return "full tables"
+    parts = []
+    if scope.security_ids is not None:
+        parts.append(f"{len(scope.security_ids)} securities")
+    if scope.start_date or scope.end_date:
+        parts.append(f"{scope.start_date or '…'} → {scope.end_date or '…'}")
+    return ", ".join(parts)
+
+
+def print_report(
+    job_names: List[str],
+    result: ValidationResult,
+    wall_s: float,
+    scope: Optional[ValidationScope] = None,
+    job_id: Optional[str] = None,
+):
+    what = f"rows written by job {job_id}" if job_id is not None else describe_scope(scope)
+    print(f"\nValidating invariants for: {', '.join(job_names)} ({what})\n")
+    for c in result.checks:
+        mark = "✔" if c.passed else "✘"
+        timing = f"{c.seconds:7.3f}s" if c.seconds is not None else " " * 8
+        line = f"{mark} {timing}  {c.name}"
+        if c.details and (not c.passed or c.details != c.name):
+            line += f" — {c.details}"
+        print(line)
+    total = sum(c.seconds or 0.0 for c in result.checks)
+    print(f"\n{len(result.checks)} checks, {total:.3f}s of check time in {wall_s:.3f}s wall")
+
+
+# -----------------------------
+# Job validation
+# -----------------------------
+
+def validate_job(
+    job_name: str,
+    parallelism: int | None = None,
+    scope: Optional[ValidationScope] = None,
+):
+    """
+    Gate a single job: raises RuntimeError on the first failed check.
+    """
+    t0 = time.perf_counter()
+    result = validate_jobs([job_name], parallelism, scope)
+    print_report([job_name], result, time.perf_counter() - t0, scope)
+
+    for check in result.checks:
+        if not check.passed:
+            raise RuntimeError(f"{check.name} failed: {check.details}")
+
+    print(f"\nSAFE TO RUN: {job_name}\n")
 
 
 # -----------------------------
@@ -221,18 +535,66 @@ def validate_job(job_name: str):
 # -----------------------------
 
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python -m src.ingest.validate <job_name>")
+    parser = argparse.ArgumentParser(prog="python -m src.ingest.validate")
+    parser.add_argument("jobs", nargs="*", help=f"Jobs to validate: {', '.join(JOBS.keys())}")
+    parser.add_argument("--all", action="store_true", help="Validate every job")
+    parser.add_argument(
+        "--parallel",
+        type=int,
+        default=DEFAULT_PARALLELISM,
+        help="Concurrent checks / pooled connections (default: VALIDATE_PARALLELISM or 4)",
+    )
+    scope_group = parser.add_argument_group("scope (default: full tables)")
+    scope_group.add_argument("--security-ids", help="Comma-separated security_ids")
+    scope_group.add_argument("--start-date", help="YYYY-MM-DD")
+    scope_group.add_argument("--end-date", help="YYYY-MM-DD")
+    scope_group.add_argument("--job-id", help="Rows written by this ingestion job")
+    parser.add_argument(
+        "--sample",
+        action="store_true",
+        help="Sample the large tables (estimates with 95%% bounds; exact re-check on any violation)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Re-run every check, ignoring cached results for unchanged tables",
+    )
+    args = parser.parse_args()
+
+    job_names = list(JOBS.keys()) if args.all else args.jobs
+    if not job_names:
+        parser.print_usage()
         sys.exit(1)
 
-    job_name = sys.argv[1]
+    scope = None
+    if args.security_ids or args.start_date or args.end_date:
+        scope = ValidationScope(
+            security_ids=(
+                [int(x) for x in args.security_ids.split(",") if x.strip()]
+                if args.security_ids else None
+            ),
+            start_date=args.start_date,
+            end_date=args.end_date,
+        )
 
     try:
-        validate_job(job_name)
+        t0 = time.perf_counter()
+        result = validate_jobs(
+            job_names, args.parallel, scope, args.job_id, args.sample,
+            use_cache=False if args.no_cache else None,
+        )
+        print_report(job_names, result, time.perf_counter() - t0, scope, args.job_id)
     except Exception as e:
         print(f"\n❌ VALIDATION FAILED: {e}\n")
         sys.exit(2)
 
+    if not result.ok:
+        failed = [c.name for c in result.checks if not c.passed]
+        print(f"\n❌ VALIDATION FAILED: {', '.join(failed)}\n")
+        sys.exit(2)
+
+    print(f"\nSAFE TO RUN: {', '.join(job_names)}\n")
+
 
 if __name__ == "__main__":
     main()
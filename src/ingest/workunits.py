@@ -0,0 +1,111 @@
+"""
+Date-window work units for long-range backfills.
+
+A job splits each symbol's [start, end] into windows (date_windows) and
+hands the resulting units to run_ordered, which fetches them on a thread
+pool while the caller writes results on its own thread (and connection)
+in submission order. Each unit is retried on its own, so a failure or a
+timeout costs one window, not the symbol's whole history. Permanent
+provider errors (unknown symbol, bad parameters) are not retried.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any, Callable, Iterable, Iterator, List, Tuple
+
+from src.providers.resilience import PermanentProviderError
+
+from .logging import get_logger
+
+logger = get_logger("workunits")
+
+WINDOWS = ("year", "quarter", "month", "none")
+
+
+@dataclass(frozen=True)
+class WorkUnit:
+    symbol: str
+    start: date
+    end: date
+
+    @property
+    def key(self) -> str:
+        return f"{self.start.isoformat()}..{self.end.isoformat()}"
+
+
+def _next_boundary(d: date, window: str) -> date:
+    if window == "year":
+        return date(d.year + 1, 1, 1)
+    months = 3 if window == "quarter" else 1
+    m0 = (d.month - 1) // months * months + months  # months since Jan of the next window start
+    return date(d.year + m0 // 12, m0 % 12 + 1, 1)
+
+
+def date_windows(start: date, end: date, window: str) -> List[Tuple[date, date]]:
+    """
+    [start, end] cut at calendar year / quarter / month boundaries
+    (inclusive windows). window="none" keeps the range whole.
+    """
+    if window not in WINDOWS:
+        raise ValueError(f"Unknown window {window}. Valid: {WINDOWS}")
+    if start > end:
+        return []
+    if window == "none":
+        return [(start, end)]
+
+    out = []
+    lo = start
+    while lo <= end:
+        hi = min(end, _next_boundary(lo, window) - timedelta(days=1))
+        out.append((lo, hi))
+        lo = hi + timedelta(days=1)
+    return out
+
+
+def run_ordered(
+    fn: Callable[[WorkUnit], Any],
+    units: Iterable[WorkUnit],
+    workers: int,
+    retries: int = 2,
+) -> Iterator[Tuple[WorkUnit, Any]]:
+    """
+    Yield (unit, fn(unit) or the final exception) in submission order.
+
+    Up to 2 x workers units run ahead of the consumer. A failed unit is
+    retried up to `retries` more times before its exception is yielded;
+    PermanentProviderError is yielded at once.
+    """
+    def attempt(unit: WorkUnit):
+        for i in range(retries + 1):
+            try:
+                return fn(unit)
+            except PermanentProviderError:
+                raise
+            except Exception as e:
+                if i == retries:
+                    raise
+                logger.warning(f"{unit.symbol} {unit.key}: attempt {i + 1} failed, retrying | {e}")
+
+    it = iter(units)
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="workunit") as pool:
+        pending: deque = deque()
+
+        def submit_next():
+            unit = next(it, None)
+            if unit is not None:
+                pending.append((unit, pool.submit(attempt, unit)))
+
+        for _ in range(2 * max(1, workers)):
+            submit_next()
+
+        while pending:
+            unit, future = pending.popleft()
+            submit_next()
+            try:
+                yield unit, future.result()
+            except Exception as e:
+                yield unit, e
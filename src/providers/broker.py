@@ -0,0 +1,177 @@
+"""
+In-run provider data broker above the response cache in
+common.requests_get_json.
+
+While a run scope is open (run.py / update.py open one around the whole
+run), every provider response is fetched at most once and handed to every
+job and thread that asks for the same request key (response_cache
+request_key: URL plus sorted params, credentials removed):
+
+  stored     a repeat request is served from memory
+  in flight  a request made while the same key is being fetched waits for
+             that fetch instead of sending its own
+  failed     the error goes to every waiter; nothing is stored, so a later
+             request fetches again
+
+Bodies are kept as encoded JSON, so each consumer decodes its own copy and
+one job mutating its rows cannot leak into another. Memory is capped by
+PROVIDER_BROKER_MAX_MB (default 512) with least-recently-used eviction; a
+single body above the cap is passed through unstored.
+
+Outside a run scope, or with PROVIDER_BROKER=off, requests pass straight
+through.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from .response_cache import request_key
+
+METRIC_KEYS = ("requests", "fetched", "served", "merged", "evicted", "unstored", "failed")
+
+
+class ProviderBroker:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._metrics = {k: 0 for k in METRIC_KEYS}
+
+    @classmethod
+    def from_env(cls) -> "ProviderBroker":
+        max_mb = float(os.getenv("PROVIDER_BROKER_MAX_MB", "512"))
+        return cls(int(max_mb * 1024 * 1024))
+
+    def get(self, url: str, params: Optional[Dict[str, Any]], fetch: Callable[[], Any]) -> Any:
+        """
+        The response for (url, params): from memory, from a fetch already
+        in flight, or from fetch() on this thread.
+        """
+        key = request_key(url, params)
+        with self._lock:
+            self._metrics["requests"] += 1
+            encoded = self._entries.get(key)
+            if encoded is not None:
+                self._entries.move_to_end(key)
+                self._metrics["served"] += 1
+                return json.loads(encoded)
+            pending = self._inflight.get(key)
+            if pending is None:
+                pending = self._inflight[key] = Future()
+                owner = True
+            else:
+                self._metrics["merged"] += 1
+                owner = False
+
+        if not owner:
+            return json.loads(pending.result())
+
+        try:
+            body = fetch()
+            encoded = json.dumps(body, separators=(",", ":")).encode()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+                self._metrics["failed"] += 1
+            pending.set_exception(e)
+            raise
+
+        with self._lock:
+            self._inflight.pop(key, None)
+            self._metrics["fetched"] += 1
+            self._store(key, encoded)
+        pending.set_result(encoded)
+        return body
+
+    def _store(self, key: str, encoded: bytes):
+        if len(encoded) > self.max_bytes:
+            self._metrics["unstored"] += 1
+            return
+        self._entries[key] = encoded
+        self.bytes += len(encoded)
+        while self.bytes > self.max_bytes:
+            _, old = self._entries.popitem(last=False)
+            self.bytes -= len(old)
+            self._metrics["evicted"] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._metrics)
+            out["entries"] = len(self._entries)
+            out["stored_mb"] = round(self.bytes / (1024 * 1024), 1)
+        return out
+
+
+_broker: Optional[ProviderBroker] = None
+_broker_lock = threading.Lock()
+
+
+def broker_enabled() -> bool:
+    return os.getenv("PROVIDER_BROKER", "on").lower() != "off"
+
+
+def get_broker() -> Optional[ProviderBroker]:
+    """
+    The open run scope's broker, or None outside one.
+    """
+    return _broker
+
+
+@contextmanager
+def run_scope() -> Iterator[Optional[ProviderBroker]]:
+    """
+    Share provider responses across everything run inside the block. A
+    nested scope joins the open one; the broker and its memory are
+    released when the outermost scope closes.
+    """
+    global _broker
+    if not broker_enabled():
+        yield None
+        return
+    with _broker_lock:
+        outer = _broker is not None
+        if not outer:
+            _broker = ProviderBroker.from_env()
+        broker = _broker
+    try:
+        yield broker
+    finally:
+        if not outer:
+            with _broker_lock:
+                _broker = None
+
+
+def fetch_shared(url: str, params: Optional[Dict[str, Any]], fetch: Callable[[], Any]) -> Any:
+    broker = get_broker()
+    if broker is None:
+        return fetch()
+    return broker.get(url, params, fetch)
+
+
+def snapshot() -> Optional[Dict[str, Any]]:
+    broker = get_broker()
+    return broker.metrics() if broker is not None else None
+
+
+def metrics_delta(before: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Broker counters accumulated since `before` (a metrics() snapshot),
+    for recording against one job.
+    """
+    broker = get_broker()
+    if broker is None:
+        return None
+    now = broker.metrics()
+    if before:
+        for k in METRIC_KEYS:
+            now[k] -= before.get(k, 0)
+    return now
@@ -0,0 +1,170 @@
+"""
+Columnar batch of Massive daily aggregates (o/h/l/c/v/vw/n/t).
+
+One BarBatch holds a ticker's bars as parallel numpy arrays, built
+straight from the JSON `results` of an aggregates page:
+
+  t                   int64   bar start, epoch ms
+  trade_date          datetime64[D]
+  open/high/low/close int64   price x PRICE_SCALE (prices_daily is
+  vwap                        NUMERIC(18,6)); NULL_PRICE when missing
+  volume              int64   truncated; 0 when missing
+  trades              int64   -1 when missing
+
+About 70 bytes per bar, against roughly 1 KB for a result dict or a
+DailyBar of Decimals. copy_payload() encodes the batch for a binary COPY
+into the prices staging table without creating a Python object per row.
+"""
+
+from __future__ import annotations
+
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+PRICE_SCALE = 1_000_000
+NULL_PRICE = np.iinfo(np.int64).min
+MS_PER_DAY = 86_400_000
+
+PRICE_FIELDS = ("open", "high", "low", "close")
+
+# PostgreSQL binary COPY: tuples of (int32 length, value) per field
+PG_EPOCH = np.datetime64("2000-01-01", "D")
+COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + (0).to_bytes(4, "big") + (0).to_bytes(4, "big")
+COPY_TRAILER = (-1).to_bytes(2, "big", signed=True)
+COPY_DTYPE = np.dtype([
+    ("nfields", ">i2"),
+    ("date_len", ">i4"), ("trade_date", ">i4"),
+    ("open_len", ">i4"), ("open", ">i8"),
+    ("high_len", ">i4"), ("high", ">i8"),
+    ("low_len", ">i4"), ("low", ">i8"),
+    ("close_len", ">i4"), ("close", ">i8"),
+    ("volume_len", ">i4"), ("volume", ">i8"),
+])
+
+# Staging table matching COPY_DTYPE; prices stay scaled integers until the
+# INSERT ... SELECT rescales them (exactly, in numeric).
+STAGE_DDL = """
+CREATE TEMP TABLE IF NOT EXISTS _prices_daily_stage (
+    trade_date DATE,
+    open_u     BIGINT,
+    high_u     BIGINT,
+    low_u      BIGINT,
+    close_u    BIGINT,
+    volume     BIGINT
+) ON COMMIT DELETE ROWS
+"""
+
+
+def _column(results: List[Dict[str, Any]], key: str) -> np.ndarray:
+    # missing keys and JSON nulls -> nan
+    return np.fromiter((r.get(key) for r in results), dtype=np.float64, count=len(results))
+
+
+def _scaled(x: np.ndarray) -> np.ndarray:
+    out = np.full(x.shape, NULL_PRICE, dtype=np.int64)
+    ok = ~np.isnan(x)
+    out[ok] = np.rint(x[ok] * PRICE_SCALE).astype(np.int64)
+    return out
+
+
+def _unscaled(x: np.ndarray) -> np.ndarray:
+    out = x.astype(np.float64) / PRICE_SCALE
+    out[x == NULL_PRICE] = np.nan
+    return out
+
+
+class BarBatch:
+    __slots__ = ("t", "trade_date", "open", "high", "low", "close", "vwap", "volume", "trades")
+
+    def __init__(self, t, open, high, low, close, vwap, volume, trades):
+        self.t = t
+        self.trade_date = (t // MS_PER_DAY).astype("datetime64[D]")
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.vwap = vwap
+        self.volume = volume
+        self.trades = trades
+
+    @classmethod
+    def from_results(cls, results: List[Dict[str, Any]]) -> "BarBatch":
+        t = _column(results, "t")
+        t = np.where(np.isnan(t), 0, t).astype(np.int64)
+        v = _column(results, "v")
+        n = _column(results, "n")
+        return cls(
+            t=t,
+            open=_scaled(_column(results, "o")),
+            high=_scaled(_column(results, "h")),
+            low=_scaled(_column(results, "l")),
+            close=_scaled(_column(results, "c")),
+            vwap=_scaled(_column(results, "vw")),
+            volume=np.where(np.isnan(v), 0, np.trunc(v)).astype(np.int64),
+            trades=np.where(np.isnan(n), -1, n).astype(np.int64),
+        )
+
+    @classmethod
+    def empty(cls) -> "BarBatch":
+        return cls.from_results([])
+
+    @classmethod
+    def concat(cls, batches: Iterable["BarBatch"]) -> "BarBatch":
+        batches = list(batches)
+        if not batches:
+            return cls.empty()
+        if len(batches) == 1:
+            return batches[0]
+        cols = {k: np.concatenate([getattr(b, k) for b in batches]) for k in cls.__slots__ if k != "trade_date"}
+        return cls(**cols)
+
+    def __len__(self) -> int:
+        return len(self.t)
+
+    def take(self, index) -> "BarBatch":
+        """
+        Subset by boolean mask or positions.
+        """
+        return BarBatch(**{k: getattr(self, k)[index] for k in self.__slots__ if k != "trade_date"})
+
+    def prices(self) -> np.ndarray:
+        """
+        (n, 4) float o/h/l/c, nan where missing (for checks).
+        """
+        return np.column_stack([_unscaled(getattr(self, k)) for k in PRICE_FIELDS]) if len(self) else np.empty((0, 4))
+
+    def row(self, i: int) -> Dict[str, Any]:
+        """
+        Bar i in the provider's shape, for reject payloads and logs.
+        """
+        out: Dict[str, Any] = {"t": int(self.t[i])}
+        for key, col in (("o", self.open), ("h", self.high), ("l", self.low), ("c", self.close), ("vw", self.vwap)):
+            if col[i] != NULL_PRICE:
+                out[key] = int(col[i]) / PRICE_SCALE
+        out["v"] = int(self.volume[i])
+        if self.trades[i] >= 0:
+            out["n"] = int(self.trades[i])
+        return out
+
+    def last_trade_date(self) -> Optional[date]:
+        return self.trade_date.max().astype(object) if len(self) else None
+
+    def copy_payload(self) -> bytes:
+        """
+        Binary COPY stream for _prices_daily_stage. Dates repeated in the
+        batch keep their last bar, as successive upserts would.
+        """
+        n = len(self)
+        _, last_rev = np.unique(self.t[::-1] // MS_PER_DAY, return_index=True)
+        keep = np.sort(n - 1 - last_rev)
+
+        rows = np.zeros(len(keep), dtype=COPY_DTYPE)
+        rows["nfields"] = 6
+        rows["date_len"] = 4
+        rows["trade_date"] = (self.trade_date[keep] - PG_EPOCH).astype(np.int32)
+        for k in PRICE_FIELDS + ("volume",):
+            rows[f"{k}_len"] = 8
+            rows[k] = getattr(self, k)[keep]
+        return COPY_HEADER + rows.tobytes() + COPY_TRAILER
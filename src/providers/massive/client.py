@@ -1,5 +1,8 @@
 import os
-import requests
+
+from src.providers import resilience
+from src.providers.broker import fetch_shared
+from src.providers.response_cache import read_through
 
 
 class MassiveClient:
@@ -12,7 +15,7 @@ class MassiveClient:
                 "Ensure .env is loaded before creating MassiveClient."
             )
 
-        self.base_url = "https://api.massive.com/v2"  # adjust if needed
+        self.base_url = os.getenv("MASSIVE_BASE_URL", "https://api.massive.com") + "/v2"
 
     def get_daily_bars(self, symbol: str) -> list[dict]:
         url = (
@@ -27,10 +30,9 @@ class MassiveClient:
             "apiKey": self.api_key,
         }
 
-        resp = requests.get(url, params=params, timeout=30)
-
-        resp.raise_for_status()
-
-        payload = resp.json()
+        payload = fetch_shared(
+            url,
+            params,
+            lambda: read_through(url, params, lambda: resilience.get_json(url, params, headers={})),
+        )
         return payload.get("results", [])
-
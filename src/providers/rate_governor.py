@@ -0,0 +1,231 @@
+"""
+Process-wide provider rate governor underneath common.requests_get_json.
+
+Every provider request takes a send slot from one shared schedule, so
+threads, job workers and concurrently running jobs on this host pace
+together instead of each backing off on its own and stampeding again.
+
+The schedule lives in a small JSON state file (PROVIDER_RATE_STATE,
+default .cache/rate_governor.json) updated under an exclusive flock:
+
+  rate_per_min    current allowed rate (AIMD)
+  next_slot       earliest send time of the next request
+  pause_until     shared pause set by a 429's Retry-After
+
+AIMD:
+  success         +PROVIDER_RATE_INCREASE_PER_MIN at most once per second,
+                  up to MASSIVE_RATE_LIMIT_PER_MIN (the plan limit; 0 =
+                  no ceiling), unless latency is above
+                  PROVIDER_LATENCY_TARGET_S
+  429             rate x 0.5 and every process pauses for Retry-After
+                  (or one interval at the new rate)
+  slow response   rate x 0.9
+Decreases are applied at most once per PROVIDER_RATE_COOLDOWN_S so a burst
+of in-flight requests throttled together counts once.
+
+RATE_GOVERNOR=off disables pacing entirely.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX: pace the threads of this process only
+    fcntl = None
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+DECREASE_ON_THROTTLE = 0.5
+DECREASE_ON_LATENCY = 0.9
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Seconds to wait from a Retry-After header (delta-seconds or HTTP-date).
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RateGovernor:
+    def __init__(
+        self,
+        state_path: Path,
+        max_per_min: float,
+        min_per_min: float,
+        initial_per_min: float,
+        increase_per_min: float,
+        latency_target_s: float,
+        cooldown_s: float,
+    ):
+        self.state_path = state_path
+        self.lock_path = state_path.with_suffix(".lock")
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_per_min = max_per_min if max_per_min > 0 else float("inf")
+        self.min_per_min = min_per_min
+        self.initial_per_min = min(initial_per_min, self.max_per_min)
+        self.increase_per_min = increase_per_min
+        self.latency_target_s = latency_target_s
+        self.cooldown_s = cooldown_s
+
+        self._lock = threading.Lock()
+        self._metrics = {"requests": 0, "throttle_events": 0, "slow_responses": 0, "wait_s": 0.0}
+
+    @classmethod
+    def from_env(cls) -> "RateGovernor":
+        max_per_min = float(os.getenv("MASSIVE_RATE_LIMIT_PER_MIN") or "0")
+        return cls(
+            state_path=(REPO_ROOT / os.getenv("PROVIDER_RATE_STATE", ".cache/rate_governor.json")).resolve(),
+            max_per_min=max_per_min,
+            min_per_min=float(os.getenv("PROVIDER_RATE_MIN_PER_MIN", "5")),
+            initial_per_min=float(os.getenv("PROVIDER_RATE_INITIAL_PER_MIN") or max_per_min or "300"),
+            increase_per_min=float(os.getenv("PROVIDER_RATE_INCREASE_PER_MIN", "5")),
+            latency_target_s=float(os.getenv("PROVIDER_LATENCY_TARGET_S", "10")),
+            cooldown_s=float(os.getenv("PROVIDER_RATE_COOLDOWN_S", "2")),
+        )
+
+    @contextmanager
+    def _shared_state(self):
+        """
+        Read-modify-write of the shared state under the thread lock and
+        an exclusive flock (flock alone does not exclude threads sharing
+        one open file).
+        """
+        with self._lock:
+            with open(self.lock_path, "a+") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    try:
+                        state = json.loads(self.state_path.read_text())
+                    except (OSError, ValueError):
+                        state = {}
+                    state.setdefault("rate_per_min", self.initial_per_min)
+                    state.setdefault("next_slot", 0.0)
+                    state.setdefault("pause_until", 0.0)
+                    state.setdefault("last_increase", 0.0)
+                    state.setdefault("last_decrease", 0.0)
+                    # the plan limit may have been lowered since the state was written
+                    state["rate_per_min"] = min(state["rate_per_min"], self.max_per_min)
+
+                    yield state
+
+                    tmp = self.state_path.with_suffix(f".{os.getpid()}.tmp")
+                    tmp.write_text(json.dumps(state))
+                    os.replace(tmp, self.state_path)
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def acquire(self) -> float:
+        """
+        Block until this caller's send slot. Returns seconds waited.
+        """
+        with self._shared_state() as state:
+            now = time.time()
+            slot = max(now, state["next_slot"], state["pause_until"])
+            state["next_slot"] = slot + 60.0 / state["rate_per_min"]
+        wait = slot - now
+        if wait > 0:
+            time.sleep(wait)
+        with self._lock:
+            self._metrics["requests"] += 1
+            self._metrics["wait_s"] += max(0.0, wait)
+        return max(0.0, wait)
+
+    def on_success(self, latency_s: float):
+        slow = latency_s > self.latency_target_s
+        with self._shared_state() as state:
+            now = time.time()
+            if slow:
+                self._decrease(state, now, DECREASE_ON_LATENCY)
+            elif now - state["last_increase"] >= 1.0:
+                state["rate_per_min"] = min(self.max_per_min, state["rate_per_min"] + self.increase_per_min)
+                state["last_increase"] = now
+        if slow:
+            with self._lock:
+                self._metrics["slow_responses"] += 1
+
+    def on_throttle(self, retry_after_s: Optional[float]):
+        with self._shared_state() as state:
+            now = time.time()
+            self._decrease(state, now, DECREASE_ON_THROTTLE)
+            pause = retry_after_s if retry_after_s is not None else 60.0 / state["rate_per_min"]
+            state["pause_until"] = max(state["pause_until"], now + pause)
+        with self._lock:
+            self._metrics["throttle_events"] += 1
+
+    def _decrease(self, state: Dict[str, Any], now: float, factor: float):
+        if now - state["last_decrease"] < self.cooldown_s:
+            return
+        state["rate_per_min"] = max(self.min_per_min, state["rate_per_min"] * factor)
+        state["last_decrease"] = now
+        state["last_increase"] = now
+
+    def current_rate_per_min(self) -> float:
+        with self._shared_state() as state:
+            return state["rate_per_min"]
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        This process's counters plus the shared current rate.
+        """
+        with self._lock:
+            m = dict(self._metrics)
+        m["wait_s"] = round(m["wait_s"], 3)
+        m["rate_per_min"] = round(self.current_rate_per_min(), 1)
+        return m
+
+
+_governor: Optional[RateGovernor] = None
+_governor_lock = threading.Lock()
+
+
+def get_governor() -> Optional[RateGovernor]:
+    """
+    Process-wide governor, or None when RATE_GOVERNOR=off.
+    """
+    global _governor
+    if os.getenv("RATE_GOVERNOR", "on").lower() == "off":
+        return None
+    with _governor_lock:
+        if _governor is None:
+            _governor = RateGovernor.from_env()
+        return _governor
+
+
+def snapshot() -> Optional[Dict[str, Any]]:
+    governor = get_governor()
+    return governor.metrics() if governor is not None else None
+
+
+def metrics_delta(before: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Governor counters accumulated since `before` (a metrics() snapshot),
+    for recording against one job.
+    """
+    governor = get_governor()
+    if governor is None:
+        return None
+    now = governor.metrics()
+    if before:
+        for k in ("requests", "throttle_events", "slow_responses", "wait_s"):
+            now[k] = round(now[k] - before.get(k, 0), 3)
+    return now
@@ -0,0 +1,326 @@
+"""
+Tail-latency controls for provider GETs (the network half of
+common.requests_get_json).
+
+Errors are classified before retrying:
+  throttled   429                      -> rate governor pause, retry
+  transient   408, 5xx, timeouts,      -> backoff, retry, counts against
+              connection errors,          the endpoint's circuit breaker
+              undecodable bodies
+  permanent   any other 4xx            -> PermanentProviderError at once
+                                          (dead symbol, bad params, auth)
+
+Per endpoint class (response_cache.classify) there is a latency budget
+(ENDPOINT_BUDGETS): a per-attempt timeout and a deadline for the request
+including every retry. Exceeding the deadline raises DeadlineExceeded.
+
+Circuit breaker, per endpoint class: PROVIDER_BREAKER_FAILURES consecutive
+transient failures (default 5) open it for PROVIDER_BREAKER_COOLDOWN_S
+(default 30). Callers wait for the cooldown within their deadline (or get
+CircuitOpen), then a single probe request decides whether it closes again.
+
+Hedging (PROVIDER_HEDGE=on, default off): when a request has not answered
+within the endpoint's observed p95 latency, one duplicate is sent and the
+first good response wins. Needs PROVIDER_HEDGE_MIN_SAMPLES latencies first.
+
+Counters for all of this are recorded per job (tracking.record_provider_metrics).
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Optional, Tuple
+
+from src.providers.rate_governor import get_governor, parse_retry_after
+from src.providers.response_cache import classify
+
+# endpoint class -> (per-attempt timeout s, whole-request deadline s)
+ENDPOINT_BUDGETS: Dict[str, Tuple[float, float]] = {
+    "aggs_range": (30.0, 120.0),
+    "aggs_grouped": (60.0, 240.0),
+    "ticker_overview": (10.0, 45.0),
+    "ticker_list": (30.0, 120.0),
+    "corporate_actions": (30.0, 120.0),
+    "financials": (30.0, 120.0),
+    "other": (30.0, 120.0),
+}
+
+TRANSIENT_STATUS = {408}
+LATENCY_WINDOW = 200
+
+
+class PermanentProviderError(RuntimeError):
+    def __init__(self, status: int, url: str, body: str = ""):
+        super().__init__(f"Permanent provider error {status} url={url} body={body[:200]}")
+        self.status = status
+
+
+class DeadlineExceeded(RuntimeError):
+    pass
+
+
+class CircuitOpen(RuntimeError):
+    pass
+
+
+class _TransientError(Exception):
+    pass
+
+
+_metrics: Dict[str, float] = {
+    "attempts": 0,
+    "transient_errors": 0,
+    "permanent_errors": 0,
+    "throttled": 0,
+    "deadline_exceeded": 0,
+    "breaker_opens": 0,
+    "breaker_waits": 0,
+    "breaker_rejections": 0,
+    "hedges_sent": 0,
+    "hedges_won": 0,
+}
+_metrics_lock = threading.Lock()
+
+
+def _count(name: str, n: float = 1):
+    with _metrics_lock:
+        _metrics[name] += n
+
+
+def snapshot() -> Dict[str, float]:
+    with _metrics_lock:
+        return dict(_metrics)
+
+
+def metrics_delta(before: Optional[Dict[str, float]]) -> Dict[str, float]:
+    now = snapshot()
+    return {k: v - (before or {}).get(k, 0) for k, v in now.items()}
+
+
+class LatencyTracker:
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, latency_s: float):
+        with self._lock:
+            self._samples.append(latency_s)
+
+    def p95(self, min_samples: int) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int, cooldown_s: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown_s = cooldown_s
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._open_until = 0.0
+        self._probing = False
+
+    def before_request(self, deadline: float):
+        """
+        Return when a request may be sent. While open, wait out the
+        cooldown (CircuitOpen if it outlasts the deadline); once it has
+        passed, one caller probes and the rest keep waiting for it.
+        """
+        waited = False
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if self._failures < self.failure_threshold:
+                    return
+                if now >= self._open_until and not self._probing:
+                    self._probing = True
+                    return
+                resume = max(self._open_until, now + 0.1)
+            if resume > deadline:
+                _count("breaker_rejections")
+                raise CircuitOpen(f"{self.name}: circuit open for another {resume - now:.1f}s")
+            if not waited:
+                _count("breaker_waits")
+                waited = True
+            time.sleep(min(resume - now, 1.0))
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            was_probe, self._probing = self._probing, False
+            if self._failures == self.failure_threshold or was_probe:
+                self._open_until = time.monotonic() + self.cooldown_s
+                _count("breaker_opens")
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_latency: Dict[str, LatencyTracker] = {}
+_registry_lock = threading.Lock()
+_hedge_pool: Optional[ThreadPoolExecutor] = None
+
+
+def _endpoint_state(endpoint: str) -> Tuple[CircuitBreaker, LatencyTracker]:
+    with _registry_lock:
+        if endpoint not in _breakers:
+            _breakers[endpoint] = CircuitBreaker(
+                endpoint,
+                failure_threshold=int(os.getenv("PROVIDER_BREAKER_FAILURES", "5")),
+                cooldown_s=float(os.getenv("PROVIDER_BREAKER_COOLDOWN_S", "30")),
+            )
+            _latency[endpoint] = LatencyTracker()
+        return _breakers[endpoint], _latency[endpoint]
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _hedge_pool
+    with _registry_lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="provider-hedge")
+        return _hedge_pool
+
+
+def _attempt(url: str, params: Dict[str, Any], headers: Dict[str, str], timeout: float):
+    """
+    One GET: (response, latency s). Network errors are transient.
+    """
+    import requests
+
+    t0 = time.monotonic()
+    try:
+        r = requests.get(url, params=params, headers=headers, timeout=timeout)
+    except requests.RequestException as e:
+        raise _TransientError(repr(e)) from e
+    return r, time.monotonic() - t0
+
+
+def _send(url, params, headers, timeout, tracker: LatencyTracker):
+    """
+    _attempt, hedged with one duplicate after the endpoint's p95 when
+    PROVIDER_HEDGE=on. The duplicate passes through the rate governor too.
+    """
+    min_samples = int(os.getenv("PROVIDER_HEDGE_MIN_SAMPLES", "20"))
+    p95 = tracker.p95(min_samples) if os.getenv("PROVIDER_HEDGE", "off").lower() == "on" else None
+    if p95 is None or p95 >= timeout:
+        return _attempt(url, params, headers, timeout)
+
+    pool = _pool()
+    primary = pool.submit(_attempt, url, params, headers, timeout)
+    done, _ = wait([primary], timeout=p95)
+    if done:
+        return primary.result()
+
+    governor = get_governor()
+    if governor is not None:
+        governor.acquire()
+    _count("hedges_sent")
+    hedge = pool.submit(_attempt, url, params, headers, timeout)
+
+    pending = {primary, hedge}
+    first_err: Optional[BaseException] = None
+    fallback = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for f in done:
+            try:
+                r, latency = f.result()
+            except _TransientError as e:
+                first_err = first_err or e
+                continue
+            if not r.ok:
+                fallback = fallback or (r, latency)
+                continue
+            if f is hedge:
+                _count("hedges_won")
+            # the loser finishes in the background within its timeout
+            return r, latency
+    if fallback is not None:
+        return fallback
+    raise first_err
+
+
+def get_json(url: str, params: Dict[str, Any], headers: Dict[str, str], max_retries: int = 6) -> Any:
+    """
+    GET and decode JSON under the endpoint's budget, breaker and the
+    shared rate governor.
+    """
+    endpoint = classify(url)[0]
+    timeout_s, deadline_s = ENDPOINT_BUDGETS.get(endpoint, ENDPOINT_BUDGETS["other"])
+    deadline = time.monotonic() + deadline_s
+    breaker, tracker = _endpoint_state(endpoint)
+    governor = get_governor()
+
+    backoff = 1.0
+    last_err = None
+
+    def pause(seconds: float):
+        time.sleep(max(0.0, min(seconds, deadline - time.monotonic())))
+
+    for _ in range(max_retries):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        breaker.before_request(deadline)
+        if governor is not None:
+            governor.acquire()
+        _count("attempts")
+
+        try:
+            r, latency = _send(url, params, headers, min(timeout_s, max(1.0, remaining)), tracker)
+            status = r.status_code
+
+            if status == 429:
+                _count("throttled")
+                breaker.record_success()  # the endpoint is up, we are just too fast
+                retry_after = parse_retry_after(r.headers.get("Retry-After"))
+                if governor is not None:
+                    # shared pause and rate cut; the next acquire() waits it out
+                    governor.on_throttle(retry_after)
+                else:
+                    pause(retry_after if retry_after is not None else backoff)
+                backoff = min(backoff * 2, 30.0)
+                last_err = "429"
+                continue
+
+            if status >= 500 or status in TRANSIENT_STATUS:
+                raise _TransientError(f"HTTP {status}")
+
+            if status >= 400:
+                breaker.record_success()
+                _count("permanent_errors")
+                raise PermanentProviderError(status, url, r.text)
+
+            try:
+                body = r.json()
+            except ValueError as e:
+                raise _TransientError(f"undecodable body: {e}") from e
+
+            breaker.record_success()
+            tracker.add(latency)
+            if governor is not None:
+                governor.on_success(latency)
+            return body
+
+        except _TransientError as e:
+            _count("transient_errors")
+            breaker.record_failure()
+            last_err = e
+            pause(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    if time.monotonic() >= deadline:
+        _count("deadline_exceeded")
+        raise DeadlineExceeded(f"{endpoint}: no response within {deadline_s:.0f}s url={url} last_err={last_err}")
+    raise RuntimeError(f"Failed after retries. url={url} params={params} last_err={last_err}")
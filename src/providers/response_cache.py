@@ -0,0 +1,288 @@
+"""
+On-disk provider response cache underneath common.requests_get_json.
+
+Layout (PROVIDER_CACHE_DIR, default .cache/responses):
+  index.sqlite          request key -> content hash, endpoint class, fetch
+                        and access times
+  objects/ab/<sha256>   gzip'd JSON bodies, addressed by the hash of their
+                        content (identical pages, e.g. empty results, are
+                        stored once)
+
+The request key is the URL plus sorted params with credentials removed,
+so a next_url page cursor is part of the key.
+
+PROVIDER_CACHE:
+  on      read-through: fresh entries are served, misses and expired
+          entries are fetched and stored (default)
+  off     no cache
+  replay  cache only, TTLs ignored; a miss raises CacheMiss and nothing
+          touches the network (python -m src.ingest.run --replay)
+
+TTLs by endpoint class (ENDPOINT_TTLS). Bars and grouped days whose
+window had closed, with SETTLE margin, when they were fetched never change
+and never expire. Size is capped by
+PROVIDER_CACHE_MAX_MB (default 4096) with least-recently-used eviction,
+checked against a running byte total that is re-read from the index every
+RESYNC_PUTS writes (other processes may share the directory).
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+HOUR = 3600.0
+DAY = 24 * HOUR
+FOREVER = float("inf")
+
+# a bar window counts as closed once it ended this long before the fetch
+# (late prints and posting delays settle within a session)
+SETTLE = timedelta(days=1)
+
+# (endpoint class, path pattern); first match wins
+ENDPOINT_CLASSES = [
+    ("aggs_range", re.compile(r"^/v2/aggs/ticker/[^/]+/range/\d+/\w+/[^/]+/(?P<end>\d{4}-\d{2}-\d{2})$")),
+    ("aggs_grouped", re.compile(r"^/v2/aggs/grouped/locale/\w+/market/\w+/(?P<end>\d{4}-\d{2}-\d{2})$")),
+    ("ticker_overview", re.compile(r"^/v3/reference/tickers/[^/]+$")),
+    ("ticker_list", re.compile(r"^/v3/reference/tickers$")),
+    ("corporate_actions", re.compile(r"^/stocks/v1/(splits|dividends)$")),
+    ("financials", re.compile(r"financials|statements")),
+]
+
+# Seconds an entry stays fresh. aggs_* use the closed-window rule below.
+ENDPOINT_TTLS: Dict[str, float] = {
+    "aggs_range": 6 * HOUR,
+    "aggs_grouped": 6 * HOUR,
+    "ticker_overview": 7 * DAY,
+    "ticker_list": 12 * HOUR,
+    "corporate_actions": 12 * HOUR,
+    "financials": 12 * HOUR,
+    "other": 12 * HOUR,
+}
+
+CREDENTIAL_PARAMS = {"apikey", "api_key"}
+
+RESYNC_PUTS = 1000
+EVICT_BATCH = 1000
+
+
+class CacheMiss(RuntimeError):
+    pass
+
+
+def cache_mode() -> str:
+    mode = os.getenv("PROVIDER_CACHE", "on").lower()
+    if mode not in ("on", "off", "replay"):
+        raise RuntimeError(f"Unknown PROVIDER_CACHE: {mode}")
+    return mode
+
+
+def request_key(url: str, params: Optional[Dict[str, Any]]) -> str:
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)]
+    query += [(k, str(v)) for k, v in (params or {}).items()]
+    query = sorted((k, v) for k, v in query if k.lower() not in CREDENTIAL_PARAMS)
+    return urlunsplit(("", "", parts.path, urlencode(query), ""))
+
+
+def classify(url: str, fetched_at: Optional[float] = None) -> Tuple[str, float]:
+    """
+    (endpoint class, TTL in seconds) for a response fetched at `fetched_at`
+    (default now)
+    """
+    fetched = date.fromtimestamp(time.time() if fetched_at is None else fetched_at)
+    path = urlsplit(url).path
+    for name, pattern in ENDPOINT_CLASSES:
+        m = pattern.search(path)
+        if m:
+            end = m.groupdict().get("end")
+            if end and end < (fetched - SETTLE).isoformat():
+                return name, FOREVER
+            return name, ENDPOINT_TTLS[name]
+    return "other", ENDPOINT_TTLS["other"]
+
+
+class ResponseCache:
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = root
+        self.objects = root / "objects"
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(root / "index.sqlite"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key          TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                endpoint     TEXT NOT NULL,
+                fetched_at   REAL NOT NULL,
+                accessed_at  REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at);
+            CREATE INDEX IF NOT EXISTS entries_content ON entries (content_hash);
+            CREATE TABLE IF NOT EXISTS objects (
+                content_hash TEXT PRIMARY KEY,
+                size         INTEGER NOT NULL
+            );
+            """
+        )
+        self._db.commit()
+        self._bytes = self._stored_bytes()
+        self._puts = 0
+
+    def _stored_bytes(self) -> int:
+        return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+
+    def _path(self, content_hash: str) -> Path:
+        return self.objects / content_hash[:2] / content_hash
+
+    def get(self, url: str, params: Optional[Dict[str, Any]], replay: bool = False) -> Optional[Any]:
+        key = request_key(url, params)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT content_hash, fetched_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        content_hash, fetched_at = row
+        if not replay and time.time() - fetched_at > classify(url, fetched_at)[1]:
+            return None
+
+        try:
+            with gzip.open(self._path(content_hash), "rb") as f:
+                body = json.loads(f.read())
+        except (OSError, ValueError):
+            return None
+
+        with self._lock:
+            self._db.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+        return body
+
+    def put(self, url: str, params: Optional[Dict[str, Any]], body: Any):
+        raw = json.dumps(body, sort_keys=True, separators=(",", ":")).encode()
+        content_hash = hashlib.sha256(raw).hexdigest()
+        path = self._path(content_hash)
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+            with gzip.open(tmp, "wb", compresslevel=6) as f:
+                f.write(raw)
+            os.replace(tmp, path)
+
+        now = time.time()
+        size = path.stat().st_size
+        with self._lock:
+            inserted = self._db.execute(
+                "INSERT OR IGNORE INTO objects (content_hash, size) VALUES (?, ?)",
+                (content_hash, size),
+            ).rowcount
+            self._bytes += size if inserted else 0
+            self._db.execute(
+                """
+                INSERT OR REPLACE INTO entries (key, content_hash, endpoint, fetched_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (request_key(url, params), content_hash, classify(url)[0], now, now),
+            )
+            self._db.commit()
+            self._puts += 1
+            if self._puts % RESYNC_PUTS == 0:
+                self._bytes = self._stored_bytes()
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """
+        Drop least-recently-used entries until stored objects fit in
+        90% of max_bytes. Caller holds the lock.
+        """
+        total = self._stored_bytes()
+        target = self.max_bytes * 0.9
+        while total > target:
+            batch = self._db.execute(
+                "SELECT key, content_hash FROM entries ORDER BY accessed_at LIMIT ?", (EVICT_BATCH,)
+            ).fetchall()
+            if not batch:
+                break
+            for key, content_hash in batch:
+                if total <= target:
+                    break
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                still_used = self._db.execute(
+                    "SELECT 1 FROM entries WHERE content_hash = ? LIMIT 1", (content_hash,)
+                ).fetchone()
+                if still_used is None:
+                    size = self._db.execute(
+                        "SELECT size FROM objects WHERE content_hash = ?", (content_hash,)
+                    ).fetchone()
+                    self._db.execute("DELETE FROM objects WHERE content_hash = ?", (content_hash,))
+                    self._path(content_hash).unlink(missing_ok=True)
+                    total -= size[0] if size else 0
+        self._db.commit()
+        self._bytes = total
+
+    def latest_fetch_date(self) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT MAX(fetched_at) FROM entries").fetchone()
+        return date.fromtimestamp(row[0]).isoformat() if row and row[0] else None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._db.execute("SELECT endpoint, COUNT(*) FROM entries GROUP BY endpoint").fetchall()
+            size = self._db.execute("SELECT COALESCE(SUM(size), 0), COUNT(*) FROM objects").fetchone()
+        return {"entries": dict(entries), "bytes": size[0], "objects": size[1]}
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Optional[ResponseCache]:
+    """
+    Process-wide cache, or None when PROVIDER_CACHE=off.
+    """
+    global _cache
+    if cache_mode() == "off":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            root = (REPO_ROOT / os.getenv("PROVIDER_CACHE_DIR", ".cache/responses")).resolve()
+            max_mb = float(os.getenv("PROVIDER_CACHE_MAX_MB", "4096"))
+            _cache = ResponseCache(root, int(max_mb * 1024 * 1024))
+        return _cache
+
+
+def read_through(url: str, params: Optional[Dict[str, Any]], fetch: Callable[[], Any]) -> Any:
+    """
+    The cached response for (url, params) when fresh, else fetch() and
+    store it. PROVIDER_CACHE=replay raises CacheMiss instead of fetching.
+    """
+    cache = get_cache()
+    if cache is not None:
+        replay = cache_mode() == "replay"
+        body = cache.get(url, params, replay=replay)
+        if body is not None:
+            return body
+        if replay:
+            raise CacheMiss(f"PROVIDER_CACHE=replay: no cached response for url={url} params={params}")
+
+    body = fetch()
+    if cache is not None:
+        cache.put(url, params, body)
+    return body